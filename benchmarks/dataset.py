@@ -0,0 +1,131 @@
+import os
+import random
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from books.models import Book
+from borrowings.models import Borrowing, rebuild_availability
+
+BENCH_EMAIL = "bench@library.test"
+BENCH_PASSWORD = "bench-password"
+BATCH_SIZE = 1000
+
+WORDS = (
+    "shadow", "river", "night", "garden", "empire", "winter", "secret",
+    "glass", "storm", "silent", "golden", "city", "dragon", "ocean",
+    "forest", "memory", "king", "queen", "machine", "star",
+)
+NAMES = (
+    "Anna", "Boris", "Clara", "Dmitri", "Elena", "Frank", "Grace",
+    "Hugo", "Irina", "James", "Karen", "Leo", "Maria", "Nikolai",
+)
+
+
+@contextmanager
+def throwaway_database():
+    """Run the block against a freshly migrated test database."""
+    with tempfile.TemporaryDirectory() as directory:
+        if connection.vendor == "sqlite":
+            # An in-memory database would hide journaling and locking
+            # costs, which are what the SQLite profiles differ in.
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(
+                directory, "benchmark.sqlite3"
+            )
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+
+def _title(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+
+
+def _author(rng):
+    return f"{rng.choice(NAMES)} {rng.choice(NAMES)}son"
+
+
+@transaction.atomic
+def seed_dataset(books=1000, users=100, borrowings=5000,
+                 bench_borrowings=0, seed=0):
+    """Fill the database with a reproducible catalog and loan history.
+
+    ``bench_borrowings`` active loans are created for the benchmark user so
+    that the return endpoint has something to return on every request.
+    Returns the benchmark user.
+    """
+    rng = random.Random(seed)
+    today = timezone.now().date()
+    password = make_password(BENCH_PASSWORD)
+
+    User = get_user_model()
+    bench_user = User.objects.create(email=BENCH_EMAIL, password=password)
+    User.objects.bulk_create(
+        (
+            User(email=f"reader{i}@library.test", password=password)
+            for i in range(users)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(
+        User.objects.exclude(pk=bench_user.pk).values_list("id", flat=True)
+    )
+
+    loans = borrowings + bench_borrowings
+    Book.objects.bulk_create(
+        (
+            Book(
+                # Numbered so that generated books never share a natural
+                # key.
+                title=f"{_title(rng)}, vol. {index + 1}",
+                author=_author(rng),
+                cover=rng.choice(Book.CoverChoices.values),
+                inventory=loans + rng.randint(1, 10),
+                daily_fee=Decimal(rng.randint(10, 300)) / 100,
+            )
+            for index in range(books)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    book_ids = list(Book.objects.values_list("id", flat=True))
+
+    def make_borrowing(user_id, active):
+        return Borrowing(
+            user_id=user_id,
+            book_id=rng.choice(book_ids),
+            expected_return_date=today + timedelta(days=rng.randint(1, 30)),
+            actual_return_date=None if active else today,
+        )
+
+    Borrowing.objects.bulk_create(
+        (
+            make_borrowing(rng.choice(user_ids), active=rng.random() < 0.3)
+            for _ in range(borrowings)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    Borrowing.objects.bulk_create(
+        (
+            make_borrowing(bench_user.id, active=True)
+            for _ in range(bench_borrowings)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    rebuild_availability()
+    return bench_user
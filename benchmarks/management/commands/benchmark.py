@@ -0,0 +1,170 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from benchmarks.dataset import seed_dataset, throwaway_database
+from benchmarks.runner import (
+    DRIVERS,
+    SCENARIOS,
+    compare_with_baseline,
+    format_comparison,
+    format_table,
+    run_benchmarks,
+)
+from benchmarks.stubs import offline_services
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure latency, throughput and query counts of the hot API "
+        "endpoints against a freshly seeded throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=1000)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--borrowings", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--requests", type=int, default=200,
+            help="Measured requests per endpoint.",
+        )
+        parser.add_argument("--warmup", type=int, default=20)
+        parser.add_argument(
+            "--server", choices=sorted(DRIVERS), default="inprocess",
+            help="Call Django in-process or through a local WSGI/ASGI server.",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=1,
+            help="Parallel clients (server modes only).",
+        )
+        parser.add_argument(
+            "--endpoints", default=",".join(SCENARIOS),
+            help=f"Comma-separated subset of: {', '.join(SCENARIOS)}.",
+        )
+        parser.add_argument(
+            "--save-baseline", metavar="PATH",
+            help="Write the results as a JSON baseline.",
+        )
+        parser.add_argument(
+            "--compare", metavar="PATH",
+            help="Fail when results regress against this baseline.",
+        )
+        parser.add_argument(
+            "--tolerance", type=float, default=0.2,
+            help="Allowed relative slowdown before a result counts as a "
+                 "regression (default 0.2 = 20%%).",
+        )
+        parser.add_argument(
+            "--profiles", metavar="NAMES",
+            help="Run once per comma-separated DATABASE_PROFILE and "
+                 "compare them side by side.",
+        )
+
+    def handle(self, *args, **options):
+        names = [name for name in options["endpoints"].split(",") if name]
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(unknown)}")
+
+        if options["profiles"]:
+            self.compare_profiles(names, options)
+            return
+
+        with throwaway_database():
+            results = self.run(names, options)
+
+        self.stdout.write(format_table(results))
+        report = {"meta": self.meta(options), "results": results}
+
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as baseline_file:
+                json.dump(report, baseline_file, indent=2)
+            self.stdout.write(f"Baseline saved to {options['save_baseline']}")
+
+        if options["compare"]:
+            with open(options["compare"]) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = compare_with_baseline(
+                results, baseline["results"], options["tolerance"]
+            )
+            if regressions:
+                raise CommandError(
+                    "Performance regressions:\n" + "\n".join(regressions)
+                )
+            self.stdout.write("No regressions against the baseline.")
+
+    def run(self, names, options):
+        bench_borrowings = 0
+        if "return" in names:
+            bench_borrowings = options["requests"] + options["warmup"]
+        user = seed_dataset(
+            books=options["books"],
+            users=options["users"],
+            borrowings=options["borrowings"],
+            bench_borrowings=bench_borrowings,
+            seed=options["seed"],
+        )
+        local_hosts = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "127.0.0.1"]
+        )
+        with local_hosts, offline_services(), \
+                DRIVERS[options["server"]]() as driver:
+            return run_benchmarks(
+                driver,
+                user,
+                names,
+                options["requests"],
+                warmup=options["warmup"],
+                concurrency=options["concurrency"],
+            )
+
+    def compare_profiles(self, names, options):
+        profiles = [name for name in options["profiles"].split(",") if name]
+        unknown = set(profiles) - set(settings.DATABASE_PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(unknown)}")
+
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in profiles:
+                path = os.path.join(directory, f"{profile}.json")
+                command = [
+                    sys.executable, "-m", "django", "benchmark",
+                    "--endpoints", ",".join(names),
+                    "--save-baseline", path,
+                ]
+                for key, value in self.meta(options).items():
+                    command += [f"--{key}", str(value)]
+                self.stdout.write(f"Benchmarking {profile}...")
+                finished = subprocess.run(
+                    command,
+                    cwd=settings.BASE_DIR,
+                    env={**os.environ, "DATABASE_PROFILE": profile},
+                    capture_output=True,
+                    text=True,
+                )
+                if finished.returncode:
+                    raise CommandError(
+                        f"{profile} failed:\n{finished.stderr}"
+                    )
+                with open(path) as baseline_file:
+                    results[profile] = json.load(baseline_file)["results"]
+
+        self.stdout.write(format_comparison(results))
+
+    @staticmethod
+    def meta(options):
+        return {
+            key: options[key]
+            for key in (
+                "books", "users", "borrowings", "seed", "requests",
+                "warmup", "server", "concurrency",
+            )
+        }
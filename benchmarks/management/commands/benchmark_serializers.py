@@ -0,0 +1,122 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+
+from benchmarks.dataset import seed_dataset, throwaway_database
+from books.models import Book
+from books.serializers import BookListSerializer
+from borrowings.models import Borrowing
+from borrowings.serializers import BorrowingListSerializer
+from library_service.renderers import ORJSONRenderer, orjson
+from library_service.serializers import values_rows
+from payments.models import Payment
+from payments.serializers import PaymentListSerializer
+
+PHASES = ("fetch", "serialize", "render")
+
+
+def best_of(repeat, run):
+    """Run ``run`` ``repeat`` times; keep the fastest time of each phase."""
+    best, output = None, None
+    for _ in range(repeat):
+        timings, output = run()
+        best = timings if best is None else [
+            min(pair) for pair in zip(best, timings)
+        ]
+    return best, output
+
+
+def timed(fetch, serialize, render):
+    started = time.perf_counter()
+    rows = fetch()
+    fetched = time.perf_counter()
+    data = serialize(rows)
+    serialized = time.perf_counter()
+    output = render(data)
+    rendered = time.perf_counter()
+    return [fetched - started, serialized - fetched, rendered - serialized], (
+        output
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the list serializers through DRF and through their compiled "
+        "values() counterparts on a freshly seeded throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            results = self.run(options)
+
+        self.stdout.write(
+            f"{'list':<12}{'path':<10}"
+            + "".join(f"{phase + '_ms':>14}" for phase in PHASES)
+            + f"{'total_ms':>12}{'speedup':>10}"
+        )
+        for name, (drf, compiled) in results.items():
+            for path, timings in (("drf", drf), ("compiled", compiled)):
+                speedup = sum(drf) / sum(timings)
+                self.stdout.write(
+                    f"{name:<12}{path:<10}"
+                    + "".join(f"{timing * 1000:>14.1f}" for timing in timings)
+                    + f"{sum(timings) * 1000:>12.1f}{speedup:>9.1f}x"
+                )
+        if orjson is None:
+            self.stdout.write(
+                "orjson is not installed; both paths rendered with the "
+                "standard JSON encoder."
+            )
+
+    def run(self, options):
+        rows = options["rows"]
+        seed_dataset(
+            books=rows, users=100, borrowings=rows, seed=options["seed"]
+        )
+        Payment.objects.bulk_create(
+            Payment(
+                borrowing_id=borrowing_id,
+                user_id=user_id,
+                money_to_pay=10,
+            )
+            for borrowing_id, user_id in Borrowing.objects.values_list(
+                "id", "user_id"
+            )
+        )
+
+        cases = {
+            "books": (Book.objects.order_by("id"), BookListSerializer),
+            "borrowings": (
+                Borrowing.objects.order_by("-id"), BorrowingListSerializer
+            ),
+            "payments": (
+                Payment.objects.select_related("borrowing__book")
+                .order_by("-id"),
+                PaymentListSerializer,
+            ),
+        }
+        results = {}
+        for name, (queryset, serializer_class) in cases.items():
+            drf, expected = best_of(options["repeat"], lambda: timed(
+                lambda: list(queryset.all()),
+                lambda rows: ListSerializer(
+                    rows, child=serializer_class()
+                ).data,
+                JSONRenderer().render,
+            ))
+            compiled, output = best_of(options["repeat"], lambda: timed(
+                lambda: list(values_rows(queryset, serializer_class)),
+                lambda rows: serializer_class(rows, many=True).data,
+                ORJSONRenderer().render,
+            ))
+            if output != expected:
+                raise CommandError(f"The compiled {name} output differs.")
+            results[name] = drf, compiled
+        return results
@@ -0,0 +1,392 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from benchmarks.dataset import BENCH_EMAIL, BENCH_PASSWORD
+from borrowings.models import Borrowing
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    authenticated: bool = False
+
+    def build(self, context, index):
+        """Return ``(path, data)`` for the ``index``-th request."""
+        raise NotImplementedError
+
+
+class BookListScenario(Scenario):
+    def build(self, context, index):
+        return reverse("books:book-list"), None
+
+
+class BorrowingListScenario(Scenario):
+    def build(self, context, index):
+        return reverse("borrowings:borrowing-list"), None
+
+
+class AsyncBookListScenario(Scenario):
+    def build(self, context, index):
+        return reverse("books:book-list-async"), None
+
+
+class AsyncBorrowingListScenario(Scenario):
+    def build(self, context, index):
+        return reverse("borrowings:borrowing-list-async"), None
+
+
+class ReturnBookScenario(Scenario):
+    def build(self, context, index):
+        pk = context.active_borrowings[index]
+        return reverse("borrowings:return-book", kwargs={"pk": pk}), None
+
+
+class TokenScenario(Scenario):
+    def build(self, context, index):
+        return (
+            reverse("users:token_obtain_pair"),
+            {"email": BENCH_EMAIL, "password": BENCH_PASSWORD},
+        )
+
+
+SCENARIOS = {
+    "books": BookListScenario("books", "get"),
+    "borrowings": BorrowingListScenario("borrowings", "get", True),
+    "books-async": AsyncBookListScenario("books-async", "get"),
+    "borrowings-async": AsyncBorrowingListScenario(
+        "borrowings-async", "get", True
+    ),
+    "return": ReturnBookScenario("return", "post", True),
+    "token": TokenScenario("token", "post"),
+}
+
+
+class BenchmarkContext:
+    def __init__(self, user):
+        self.user = user
+        self.active_borrowings = list(
+            Borrowing.objects.filter(
+                user=user, actual_return_date__isnull=True
+            ).order_by("id").values_list("id", flat=True)
+        )
+        self.access_token = None
+
+    def headers(self, scenario):
+        if scenario.authenticated:
+            return {"Authorization": f"Bearer {self.access_token}"}
+        return {}
+
+
+class InProcessDriver:
+    """Call the Django handler directly, counting SQL queries per request."""
+
+    name = "inprocess"
+    counts_queries = True
+
+    def __enter__(self):
+        self.client = Client()
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def request(self, method, path, data, headers):
+        kwargs = {"headers": headers}
+        if data is not None:
+            kwargs.update(data=data, content_type="application/json")
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, **kwargs)
+        return response.status_code, response.content, len(queries)
+
+
+class ASGIInProcessDriver:
+    """Call Django's ASGI handler from one event loop, without sockets.
+
+    Requests from every client thread are in flight on the same loop, as
+    they would be in an ASGI server process, so it measures the ASGI path
+    when no server is installed.
+    """
+
+    name = "asgi-inprocess"
+    counts_queries = False
+
+    def __enter__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, daemon=True
+        )
+        self.thread.start()
+        self.client = AsyncClient()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def request(self, method, path, data, headers):
+        return asyncio.run_coroutine_threadsafe(
+            self._request(method, path, data, headers), self.loop
+        ).result()
+
+    async def _request(self, method, path, data, headers):
+        kwargs = {"headers": headers}
+        if data is not None:
+            kwargs.update(data=data, content_type="application/json")
+        response = await getattr(self.client, method)(path, **kwargs)
+        return response.status_code, response.content, None
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class HTTPDriver:
+    counts_queries = False
+
+    def request(self, method, path, data, headers):
+        response = self.session.request(
+            method, self.base_url + path, json=data, headers=headers
+        )
+        return response.status_code, response.content, None
+
+
+class WSGIServerDriver(HTTPDriver):
+    """Serve the WSGI application from a threaded server on localhost."""
+
+    name = "wsgi"
+
+    def __enter__(self):
+        from library_service.wsgi import application
+
+        self.server = make_server(
+            "127.0.0.1", 0, application,
+            server_class=_ThreadingWSGIServer,
+            handler_class=_QuietHandler,
+        )
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.thread.start()
+        self.session = requests.Session()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ASGIServerDriver(HTTPDriver):
+    """Serve the ASGI application with uvicorn (optional dependency)."""
+
+    name = "asgi"
+
+    def __enter__(self):
+        try:
+            import uvicorn
+        except ImportError as exc:
+            raise RuntimeError(
+                "The ASGI driver requires uvicorn (pip install uvicorn)."
+            ) from exc
+        from library_service.asgi import application
+
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(
+            application, host="127.0.0.1", port=port, log_level="warning",
+            lifespan="off",
+        ))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.session = requests.Session()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.session.close()
+        self.server.should_exit = True
+        self.thread.join()
+
+
+DRIVERS = {
+    "inprocess": InProcessDriver,
+    "wsgi": WSGIServerDriver,
+    "asgi": ASGIServerDriver,
+    "asgi-inprocess": ASGIInProcessDriver,
+}
+
+
+def percentile(values, fraction):
+    """Linear-interpolated percentile of ``values`` (0 <= fraction <= 1)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+        position - lower
+    )
+
+
+def summarize(latencies, elapsed, errors, queries):
+    milliseconds = [latency * 1000 for latency in latencies]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(milliseconds, 0.50), 3),
+        "p95_ms": round(percentile(milliseconds, 0.95), 3),
+        "p99_ms": round(percentile(milliseconds, 0.99), 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "queries": (
+            round(sum(queries) / len(queries), 2) if queries else None
+        ),
+    }
+
+
+def obtain_access_token(driver):
+    status_code, content, _ = driver.request(
+        "post",
+        reverse("users:token_obtain_pair"),
+        {"email": BENCH_EMAIL, "password": BENCH_PASSWORD},
+        {},
+    )
+    if status_code != 200:
+        raise RuntimeError(f"Could not obtain a token: {content!r}")
+    return json.loads(content)["access"]
+
+
+def run_scenario(driver, scenario, context, requests_count, warmup=0,
+                 concurrency=1):
+    def call(index):
+        path, data = scenario.build(context, index)
+        started = time.perf_counter()
+        status_code, _, queries = driver.request(
+            scenario.method, path, data, context.headers(scenario)
+        )
+        return time.perf_counter() - started, status_code, queries
+
+    for index in range(warmup):
+        call(index)
+
+    indexes = range(warmup, warmup + requests_count)
+    started = time.perf_counter()
+    if concurrency > 1 and not driver.counts_queries:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(call, indexes))
+    else:
+        samples = [call(index) for index in indexes]
+    elapsed = time.perf_counter() - started
+
+    return summarize(
+        [latency for latency, _, _ in samples],
+        elapsed,
+        sum(1 for _, status_code, _ in samples if status_code >= 400),
+        [queries for _, _, queries in samples if queries is not None],
+    )
+
+
+def run_benchmarks(driver, user, scenario_names, requests_count, warmup=0,
+                   concurrency=1):
+    context = BenchmarkContext(user)
+    context.access_token = obtain_access_token(driver)
+    return {
+        name: run_scenario(
+            driver, SCENARIOS[name], context, requests_count,
+            warmup=warmup, concurrency=concurrency,
+        )
+        for name in scenario_names
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """List human-readable regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms"
+            )
+        if previous["rps"] and current["rps"] < previous["rps"] * (
+                1 - tolerance):
+            regressions.append(
+                f"{name}: rps {previous['rps']} -> {current['rps']}"
+            )
+        if current["queries"] is not None \
+                and previous["queries"] is not None \
+                and current["queries"] > previous["queries"]:
+            regressions.append(
+                f"{name}: queries {previous['queries']} -> "
+                f"{current['queries']}"
+            )
+    return regressions
+
+
+def format_table(results):
+    columns = ("requests", "errors", "p50_ms", "p95_ms", "p99_ms", "rps",
+               "queries")
+    lines = [
+        f"{'endpoint':<18}" + "".join(f"{column:>10}" for column in columns)
+    ]
+    for name, result in results.items():
+        lines.append(f"{name:<18}" + "".join(
+            f"{'-' if result[column] is None else result[column]:>10}"
+            for column in columns
+        ))
+    return "\n".join(lines)
+
+
+def format_comparison(results_by_profile):
+    """Tabulate runs of the same endpoints under several profiles.
+
+    Throughput is also shown relative to the first profile.
+    """
+    columns = ("errors", "p50_ms", "p95_ms", "rps")
+    lines = [
+        f"{'endpoint':<18}{'profile':<12}"
+        + "".join(f"{column:>10}" for column in columns)
+        + f"{'vs first':>10}"
+    ]
+    profiles = list(results_by_profile)
+    first = results_by_profile[profiles[0]]
+    for name in first:
+        for profile in profiles:
+            result = results_by_profile[profile].get(name)
+            if result is None:
+                continue
+            speedup = "-"
+            if result["rps"] and first[name]["rps"]:
+                speedup = f"{result['rps'] / first[name]['rps']:.2f}x"
+            lines.append(
+                f"{name:<18}{profile:<12}"
+                + "".join(f"{result[column]:>10}" for column in columns)
+                + f"{speedup:>10}"
+            )
+    return "\n".join(lines)
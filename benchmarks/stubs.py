@@ -0,0 +1,15 @@
+from contextlib import ExitStack, contextmanager
+from unittest.mock import patch
+
+from payments.fake_stripe import FakeStripeServer
+
+
+@contextmanager
+def offline_services():
+    """Serve Stripe from a local fake and silence Telegram calls."""
+    with ExitStack() as stack:
+        stack.enter_context(FakeStripeServer())
+        stack.enter_context(patch(
+            "borrowings.telegram_helper.send_telegram_message"
+        ))
+        yield
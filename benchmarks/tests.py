@@ -0,0 +1,75 @@
+from django.test import TestCase
+
+from benchmarks.dataset import seed_dataset
+from benchmarks.runner import (
+    InProcessDriver,
+    compare_with_baseline,
+    format_comparison,
+    percentile,
+    run_benchmarks,
+)
+from benchmarks.stubs import offline_services
+from books.models import Book
+from borrowings.models import Borrowing
+
+
+class PercentileTest(TestCase):
+    def test_percentile_interpolates(self):
+        values = [1, 2, 3, 4, 5]
+
+        self.assertEqual(percentile(values, 0.5), 3)
+        self.assertEqual(percentile(values, 0.95), 4.8)
+        self.assertIsNone(percentile([], 0.5))
+
+
+class BaselineComparisonTest(TestCase):
+    baseline = {
+        "books": {"p95_ms": 10.0, "rps": 100.0, "queries": 1.0},
+    }
+
+    def test_within_tolerance(self):
+        results = {"books": {"p95_ms": 11.0, "rps": 95.0, "queries": 1.0}}
+
+        self.assertEqual(
+            compare_with_baseline(results, self.baseline, 0.2), []
+        )
+
+    def test_regressions_are_reported(self):
+        results = {"books": {"p95_ms": 20.0, "rps": 50.0, "queries": 3.0}}
+
+        regressions = compare_with_baseline(results, self.baseline, 0.2)
+
+        self.assertEqual(len(regressions), 3)
+
+
+class ProfileComparisonTest(TestCase):
+    def test_throughput_relative_to_first_profile(self):
+        result = {"errors": 0, "p50_ms": 1.0, "p95_ms": 2.0}
+        table = format_comparison({
+            "sqlite": {"books": {**result, "rps": 100.0}},
+            "sqlite-wal": {"books": {**result, "rps": 150.0}},
+        })
+
+        lines = table.splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith("1.00x"))
+        self.assertTrue(lines[2].endswith("1.50x"))
+
+
+class BenchmarkRunTest(TestCase):
+    def test_in_process_run(self):
+        user = seed_dataset(
+            books=5, users=3, borrowings=10, bench_borrowings=4
+        )
+        self.assertEqual(Book.objects.count(), 5)
+        self.assertEqual(Borrowing.objects.filter(user=user).count(), 4)
+
+        with offline_services(), InProcessDriver() as driver:
+            results = run_benchmarks(
+                driver, user, ["books", "borrowings", "return"], 3, warmup=1
+            )
+
+        for name, result in results.items():
+            self.assertEqual(result["requests"], 3, name)
+            self.assertEqual(result["errors"], 0, name)
+            self.assertIsNotNone(result["queries"], name)
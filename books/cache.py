@@ -0,0 +1,112 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_KEY = "catalog:version"
+MODIFIED_KEY = "catalog:modified"
+HITS_KEY = "catalog:hits"
+MISSES_KEY = "catalog:misses"
+LIST_PARAMS = ("title", "author", "cover", "cursor", "page_size")
+# Filters match regardless of case; cursors are case-sensitive base64.
+CASE_INSENSITIVE_PARAMS = ("title", "author", "cover")
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def get_catalog_version():
+    """Return ``(version, modified)`` where ``modified`` is a Unix time.
+
+    A missing version (cold or evicted cache) restarts from the current
+    time in milliseconds, so entries stored under older versions are never
+    served again.
+    """
+    cache = get_cache()
+    values = cache.get_many((VERSION_KEY, MODIFIED_KEY))
+    if VERSION_KEY in values and MODIFIED_KEY in values:
+        return values[VERSION_KEY], values[MODIFIED_KEY]
+    now = time.time()
+    cache.add(VERSION_KEY, int(now * 1000), timeout=None)
+    cache.add(MODIFIED_KEY, int(now), timeout=None)
+    return cache.get(VERSION_KEY), cache.get(MODIFIED_KEY)
+
+
+def _bump():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+    cache.set(MODIFIED_KEY, int(time.time()), timeout=None)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response.
+
+    The version is bumped right away, so this process stops serving stale
+    pages, and again on commit, so pages cached from a snapshot taken
+    before the commit are dropped as well.
+    """
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def _normalize(name, values):
+    if name in CASE_INSENSITIVE_PARAMS:
+        return ",".join(sorted(value.strip().lower() for value in values))
+    return ",".join(values)
+
+
+def list_cache_key(request, version):
+    params = request.query_params
+    normalized = "&".join(
+        f"{name}={_normalize(name, values)}"
+        for name in LIST_PARAMS
+        if (values := params.getlist(name))
+    )
+    digest = hashlib.sha1(
+        f"{request.build_absolute_uri(request.path)}?{normalized}".encode()
+    ).hexdigest()
+    return f"catalog:list:{version}:{digest}"
+
+
+def list_etag(key):
+    return '"{}"'.format(key.removeprefix("catalog:list:").replace(":", "-"))
+
+
+def get_cached(key):
+    cache = get_cache()
+    data = cache.get(key)
+    counter = MISSES_KEY if data is None else HITS_KEY
+    try:
+        cache.incr(counter)
+    except ValueError:
+        cache.add(counter, 1, timeout=None)
+    return data
+
+
+def set_cached(key, data):
+    get_cache().set(key, data, timeout=settings.CATALOG_CACHE_TIMEOUT)
+
+
+def catalog_cache_stats():
+    cache = get_cache()
+    values = cache.get_many((HITS_KEY, MISSES_KEY))
+    hits, misses = values.get(HITS_KEY, 0), values.get(MISSES_KEY, 0)
+    version, modified = get_catalog_version()
+    return {
+        "backend": settings.CACHES[settings.CATALOG_CACHE_ALIAS]["BACKEND"],
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+        "version": version,
+        "modified": modified,
+    }
+
+
+def reset_catalog_cache_stats():
+    get_cache().delete_many((HITS_KEY, MISSES_KEY))
@@ -0,0 +1,168 @@
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import empty
+
+from books.cache import bump_catalog_version
+from books.models import Book, BookAvailability
+from books.serializers import BookSerializer
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+NATURAL_KEY = ("title", "author", "cover")
+# Inventory is applied separately: the file counts copies owned, the
+# column copies on the shelf.
+UPDATE_FIELDS = ("daily_fee",)
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self):
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def read_rows(stream, input_format):
+    """Yield ``(line, row)`` pairs from a text stream.
+
+    ``row`` is a dict, or a ``ValidationError`` for a line that could not
+    be parsed at all.
+    """
+    if input_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as exc:
+            yield line, ValidationError({"non_field_errors": [str(exc)]})
+            continue
+        if not isinstance(row, dict):
+            row = ValidationError(
+                {"non_field_errors": ["Expected a JSON object."]}
+            )
+        yield line, row
+
+
+def validate_batch(rows):
+    """Validate a batch column by column with BookSerializer's fields.
+
+    Each distinct raw value of a column is validated once, so repeated
+    covers, fees and inventories cost a dictionary lookup. Model-level
+    uniqueness is left to the upsert. Returns ``(data, errors)`` lists
+    aligned with ``rows``.
+    """
+    data = [{} for _ in rows]
+    errors = [{} for _ in rows]
+    for name, serializer_field in BookSerializer().fields.items():
+        seen = {}
+        for index, row in enumerate(rows):
+            raw = row.get(name, empty)
+            # Keyed by type too: 1, 1.0 and True are equal but validate
+            # differently.
+            key = (type(raw), raw)
+            try:
+                result = seen[key]
+            except (KeyError, TypeError):
+                try:
+                    result = (serializer_field.run_validation(raw), None)
+                except ValidationError as exc:
+                    result = (None, exc.detail)
+                try:
+                    seen[key] = result
+                except TypeError:
+                    pass
+            value, detail = result
+            if detail is None:
+                data[index][name] = value
+            else:
+                errors[index][name] = detail
+    return data, errors
+
+
+def _upsert(books):
+    totals = [book.inventory for book in books]
+    Book.objects.bulk_create(
+        books,
+        update_conflicts=True,
+        unique_fields=NATURAL_KEY,
+        update_fields=UPDATE_FIELDS,
+    )
+    # Copies on loan or reserved for a hold are off the shelf. Locking the
+    # books holds off borrows and returns until the new counts are set;
+    # only the books, as PostgreSQL cannot lock the nullable side of the
+    # outer join to their availability.
+    away = dict(Book.objects.select_for_update(of=("self",)).filter(
+        pk__in=[book.pk for book in books]
+    ).values_list(
+        "pk",
+        Coalesce(F("availability__on_loan"), 0)
+        + Coalesce(F("availability__reserved"), 0),
+    ))
+    for book, total in zip(books, totals):
+        book.inventory = max(total - away[book.pk], 0)
+    Book.objects.bulk_update(books, ["inventory"])
+    # bulk_create() skips the post_save signal that creates these.
+    BookAvailability.objects.bulk_create(
+        [BookAvailability(book_id=book.pk) for book in books],
+        ignore_conflicts=True,
+    )
+
+
+def import_books(rows, batch_size=BATCH_SIZE):
+    """Validate and upsert ``(line, row)`` pairs in batches.
+
+    Books are matched on title, author and cover; existing ones get the
+    imported daily fee, and the imported inventory less the copies out
+    on loan or reserved. Invalid rows are reported by line
+    and do not stop the import.
+    """
+    report = ImportReport()
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        parsed = []
+        for line, row in batch:
+            if isinstance(row, ValidationError):
+                report.add_error(line, row.detail)
+            else:
+                parsed.append((line, row))
+
+        data, errors = validate_batch([row for _, row in parsed])
+        books = {}
+        for (line, _), values, detail in zip(parsed, data, errors):
+            if detail:
+                report.add_error(line, detail)
+            else:
+                key = tuple(values[name] for name in NATURAL_KEY)
+                books[key] = Book(**values)
+
+        if books:
+            with transaction.atomic():
+                _upsert(list(books.values()))
+            report.imported += len(books)
+
+    if report.imported:
+        bump_catalog_version()
+    return report
@@ -0,0 +1,63 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.importer import BATCH_SIZE, import_books, read_rows
+from books.serializers import INPUT_FORMATS
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert books from a CSV or JSON Lines file, matching existing "
+        "books by title, author and cover."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            help="File to import, or - to read standard input.",
+        )
+        parser.add_argument(
+            "--format",
+            dest="input_format",
+            choices=INPUT_FORMATS,
+            help="Input format; defaults to the file extension.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Rows validated and written per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["input_format"] or path.rpartition(".")[2]
+        if input_format not in INPUT_FORMATS:
+            raise CommandError(
+                "Cannot infer the input format; pass --format."
+            )
+
+        if path == "-":
+            stream = sys.stdin
+        else:
+            try:
+                stream = open(path, encoding="utf-8-sig", newline="")
+            except OSError as exc:
+                raise CommandError(exc)
+
+        with stream:
+            report = import_books(
+                read_rows(stream, input_format),
+                batch_size=options["batch_size"],
+            )
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        if report.failed > len(report.errors):
+            self.stderr.write(
+                f"... {report.failed - len(report.errors)} more errors"
+            )
+        self.stdout.write(
+            f"Imported {report.imported} books, {report.failed} rows failed."
+        )
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.2 on 2026-10-18 04:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+from books.search import create_search_index
+
+
+def merge_duplicate_books(apps, schema_editor):
+    """Fold books sharing title, author and cover into the oldest one."""
+    Book = apps.get_model("books", "Book")
+    Borrowing = apps.get_model("borrowings", "Borrowing")
+    duplicates = Book.objects.values("title", "author", "cover").annotate(
+        copies=Count("id"),
+        keep=Min("id"),
+        inventory_total=Sum("inventory"),
+    ).filter(copies__gt=1)
+
+    for group in duplicates:
+        extra = Book.objects.filter(
+            title=group["title"],
+            author=group["author"],
+            cover=group["cover"],
+        ).exclude(id=group["keep"])
+        Borrowing.objects.filter(book__in=extra).update(book=group["keep"])
+        extra.delete()
+        Book.objects.filter(id=group["keep"]).update(
+            inventory=group["inventory_total"]
+        )
+
+
+def restore_search_index(apps, schema_editor):
+    # Adding the constraint rebuilds books_book on SQLite, dropping the
+    # full-text triggers.
+    create_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+    # PostgreSQL refuses to alter a table with pending trigger events, so
+    # the constraint cannot share a transaction with the merge.
+    atomic = False
+
+    dependencies = [
+        ('books', '0002_book_search_index'),
+        ('borrowings', '0003_borrowing_access_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_books, migrations.RunPython.noop, atomic=True
+        ),
+        migrations.AddConstraint(
+            model_name='book',
+            constraint=models.UniqueConstraint(fields=('title', 'author', 'cover'), name='book_natural_key'),
+        ),
+        migrations.RunPython(
+            restore_search_index, migrations.RunPython.noop, atomic=True
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-18 05:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_book_natural_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookAvailability',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='availability', serialize=False, to='books.book')),
+                ('on_loan', models.PositiveIntegerField(default=0)),
+                ('next_return_date', models.DateField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_book_availability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookavailability',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -14,5 +14,36 @@ class Book(models.Model):
     inventory = models.PositiveIntegerField()
     daily_fee = models.DecimalField(max_digits=5, decimal_places=2)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["title", "author", "cover"],
+                name="book_natural_key",
+            ),
+        ]
+
     def __str__(self):
         return self.title
+
+
+class BookAvailability(models.Model):
+    """Loan counters of a book, kept in step with its borrowings.
+
+    ``book.inventory`` counts the copies on the shelf and ``reserved``
+    the copies set aside for holds. The counters are updated by the
+    borrowings app in the same transaction that lends, returns or
+    reserves a copy.
+    """
+
+    book = models.OneToOneField(
+        Book,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="availability",
+    )
+    on_loan = models.PositiveIntegerField(default=0)
+    reserved = models.PositiveIntegerField(default=0)
+    next_return_date = models.DateField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.on_loan} copies of {self.book} on loan"
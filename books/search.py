@@ -0,0 +1,252 @@
+import re
+import sqlite3
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_COLUMNS = ("title", "author")
+FTS_TABLE = "books_book_fts"
+TOKEN_RE = re.compile(r"\w+")
+
+SQLITE_INDEX_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, author, content='books_book', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON books_book "
+    f"BEGIN INSERT INTO {FTS_TABLE}(rowid, title, author) "
+    "VALUES (new.id, new.title, new.author); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON books_book "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author) "
+    "VALUES ('delete', old.id, old.title, old.author); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+    "AFTER UPDATE OF title, author ON books_book "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author) "
+    "VALUES ('delete', old.id, old.title, old.author); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, author) "
+    "VALUES (new.id, new.title, new.author); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+SQLITE_DROP_SQL = (
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+)
+
+POSTGRES_DOCUMENT = "coalesce(title, '') || ' ' || coalesce(author, '')"
+
+POSTGRES_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS books_book_title_tsv ON books_book "
+    "USING GIN (to_tsvector('simple', title))",
+    "CREATE INDEX IF NOT EXISTS books_book_author_tsv ON books_book "
+    "USING GIN (to_tsvector('simple', author))",
+    "CREATE INDEX IF NOT EXISTS books_book_document_tsv ON books_book "
+    f"USING GIN (to_tsvector('simple', {POSTGRES_DOCUMENT}))",
+)
+
+POSTGRES_DROP_SQL = (
+    "DROP INDEX IF EXISTS books_book_title_tsv",
+    "DROP INDEX IF EXISTS books_book_author_tsv",
+    "DROP INDEX IF EXISTS books_book_document_tsv",
+)
+
+
+@lru_cache
+def sqlite_has_fts5():
+    probe = sqlite3.connect(":memory:")
+    try:
+        probe.execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def create_search_index(schema_editor):
+    """Create the full-text index for Book and the triggers keeping it in sync.
+
+    Safe to call repeatedly, e.g. after a migration that rebuilds the
+    books_book table on SQLite and thereby drops its triggers.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite" and sqlite_has_fts5():
+        statements = SQLITE_INDEX_SQL
+    elif vendor == "postgresql":
+        statements = POSTGRES_INDEX_SQL
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        statements = SQLITE_DROP_SQL
+    elif vendor == "postgresql":
+        statements = POSTGRES_DROP_SQL
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def tokenize(value):
+    return TOKEN_RE.findall(value.lower())
+
+
+class SearchBackend:
+    """Translate search terms into a Book queryset filter.
+
+    Every value is split into tokens that must all match as word prefixes;
+    several values for the same column are alternatives. Columns are
+    combined with AND.
+    """
+
+    def filter(self, queryset, terms):
+        raise NotImplementedError
+
+    def ranked(self, queryset, query):
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(SearchBackend):
+    @staticmethod
+    def _phrase(tokens):
+        return " AND ".join(f'"{token}"*' for token in tokens)
+
+    def _match_expression(self, terms):
+        clauses = []
+        for column, values in terms.items():
+            alternatives = [
+                f"({self._phrase(tokens)})"
+                for tokens in map(tokenize, values) if tokens
+            ]
+            if alternatives:
+                clauses.append(f"{column} : ({' OR '.join(alternatives)})")
+        return " AND ".join(clauses)
+
+    def _matching(self, queryset, expression):
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            (expression,),
+        ))
+
+    def filter(self, queryset, terms):
+        expression = self._match_expression(terms)
+        if not expression:
+            return queryset
+        return self._matching(queryset, expression)
+
+    def ranked(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        # Join the index once; bm25() needs the row of the MATCH itself.
+        return queryset.extra(
+            select={"search_rank": f"bm25({FTS_TABLE})"},
+            tables=[FTS_TABLE],
+            where=[
+                f"{FTS_TABLE} MATCH %s",
+                f"{FTS_TABLE}.rowid = books_book.id",
+            ],
+            params=[self._phrase(tokens)],
+            order_by=["search_rank", "id"],
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    @staticmethod
+    def _tsquery(tokens):
+        return " & ".join(f"{token}:*" for token in tokens)
+
+    def filter(self, queryset, terms):
+        for column, values in terms.items():
+            alternatives = [
+                f"({self._tsquery(tokens)})"
+                for tokens in map(tokenize, values) if tokens
+            ]
+            if alternatives:
+                queryset = queryset.filter(id__in=RawSQL(
+                    f"SELECT id FROM books_book "
+                    f"WHERE to_tsvector('simple', {column}) "
+                    f"@@ to_tsquery('simple', %s)",
+                    (" | ".join(alternatives),),
+                ))
+        return queryset
+
+    def ranked(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        tsquery = self._tsquery(tokens)
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT id FROM books_book "
+            f"WHERE to_tsvector('simple', {POSTGRES_DOCUMENT}) "
+            f"@@ to_tsquery('simple', %s)",
+            (tsquery,),
+        )).alias(search_rank=RawSQL(
+            f"ts_rank(to_tsvector('simple', {POSTGRES_DOCUMENT}), "
+            f"to_tsquery('simple', %s))",
+            (tsquery,),
+        )).order_by("-search_rank", "id")
+
+
+class FallbackSearchBackend(SearchBackend):
+    """Token-wise ``icontains`` matching for databases without an index."""
+
+    @staticmethod
+    def _all_tokens(field, tokens):
+        condition = Q()
+        for token in tokens:
+            condition &= Q(**{f"{field}__icontains": token})
+        return condition
+
+    def filter(self, queryset, terms):
+        for column, values in terms.items():
+            condition = Q()
+            for tokens in map(tokenize, values):
+                if tokens:
+                    condition |= self._all_tokens(column, tokens)
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def ranked(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        condition = Q()
+        for token in tokens:
+            condition &= (
+                Q(title__icontains=token) | Q(author__icontains=token)
+            )
+        return queryset.filter(condition).order_by("id")
+
+
+def get_search_backend():
+    if connection.vendor == "sqlite" and sqlite_has_fts5():
+        return SQLiteSearchBackend()
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    return FallbackSearchBackend()
+
+
+def search_books(queryset, **terms):
+    """Filter books by column, e.g. ``search_books(qs, title=["it"])``."""
+    terms = {
+        column: [value for value in terms.get(column) or () if value]
+        for column in SEARCH_COLUMNS
+    }
+    terms = {column: values for column, values in terms.items() if values}
+    if not terms:
+        return queryset
+    return get_search_backend().filter(queryset, terms)
+
+
+def rank_books(queryset, query):
+    """Return books matching ``query`` in title or author, best first."""
+    return get_search_backend().ranked(queryset, query)
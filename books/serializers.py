@@ -1,6 +1,10 @@
+from django.conf import settings
 from rest_framework import serializers
 
-from books.models import Book
+from books.models import Book, BookAvailability
+from library_service.serializers import CompiledListSerializer
+
+INPUT_FORMATS = ("csv", "jsonl")
 
 
 class BookSerializer(serializers.ModelSerializer):
@@ -12,3 +16,50 @@ class BookSerializer(serializers.ModelSerializer):
 class BookListSerializer(BookSerializer):
     class Meta(BookSerializer.Meta):
         fields = ("title", "author", "cover")
+        list_serializer_class = CompiledListSerializer
+
+
+class BookAvailabilitySerializer(serializers.ModelSerializer):
+    # Annotated by BookViewSet from the book's inventory.
+    total_copies = serializers.IntegerField(read_only=True)
+    available = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = BookAvailability
+        fields = (
+            "book",
+            "total_copies",
+            "available",
+            "on_loan",
+            "reserved",
+            "next_return_date",
+        )
+        list_serializer_class = CompiledListSerializer
+
+
+class BookAvailabilityQuerySerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=settings.PAGINATION_MAX_PAGE_SIZE,
+        help_text="Book ids; repeat the parameter for each book.",
+    )
+
+
+class BookImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    input_format = serializers.ChoiceField(
+        choices=INPUT_FORMATS,
+        required=False,
+        help_text="Defaults to the file extension.",
+    )
+
+    def validate(self, attrs):
+        if "input_format" not in attrs:
+            extension = attrs["file"].name.rpartition(".")[2].lower()
+            if extension not in INPUT_FORMATS:
+                raise serializers.ValidationError(
+                    {"input_format": ["Cannot infer it from the file name."]}
+                )
+            attrs["input_format"] = extension
+        return attrs
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from books.cache import bump_catalog_version
+from books.models import Book, BookAvailability
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_catalog(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Book)
+def create_availability(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        BookAvailability.objects.create(book=instance)
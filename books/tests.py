@@ -1,11 +1,32 @@
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
 
-from books.models import Book
+from books.cache import (
+    catalog_cache_stats,
+    get_cache,
+    get_catalog_version,
+    list_cache_key,
+)
+from books.importer import import_books, read_rows
+from books.models import Book, BookAvailability
 from books.serializers import BookListSerializer
+from borrowings.models import Borrowing, rebuild_availability
+from library_service.pagination import BookCursorPagination
 
 BOOK_URL = reverse("books:book-list")
 
@@ -50,7 +71,7 @@ class AuthenticatedUserTest(TestCase):
         serializer = BookListSerializer(books, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_filter_books_by_author(self):
         res = self.api_client.get(reverse("books:book-list"), {"author": "Test Author"})
@@ -58,7 +79,7 @@ class AuthenticatedUserTest(TestCase):
         serializer = BookListSerializer(books, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_filter_books_by_cover(self):
         res = self.api_client.get(reverse("books:book-list"), {"cover": "Hard"})
@@ -66,7 +87,7 @@ class AuthenticatedUserTest(TestCase):
         serializer = BookListSerializer(books, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_filter_books_by_multiple_params(self):
         res = self.api_client.get(reverse("books:book-list"), {"title": "Book", "author": "Test Author"})
@@ -74,4 +95,458 @@ class AuthenticatedUserTest(TestCase):
         serializer = BookListSerializer(books, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
+
+
+class BookPaginationTest(TestCase):
+    def setUp(self):
+        self.api_client = APIClient()
+        for i in range(5):
+            sample_book(title=f"Book {i}")
+
+    def test_book_list_is_cursor_paginated(self):
+        res = self.api_client.get(BOOK_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertIn("cursor=", res.data["next"])
+        self.assertNotIn("offset", res.data["next"])
+
+    def test_pages_are_stable_under_concurrent_inserts(self):
+        first_page = self.api_client.get(BOOK_URL, {"page_size": 2})
+        sample_book(title="Inserted between requests")
+
+        titles = [book["title"] for book in first_page.data["results"]]
+        next_url = first_page.data["next"]
+        while next_url:
+            page = self.api_client.get(next_url)
+            titles += [book["title"] for book in page.data["results"]]
+            next_url = page.data["next"]
+
+        self.assertEqual(
+            titles,
+            [f"Book {i}" for i in range(5)] + ["Inserted between requests"]
+        )
+
+    def test_page_size_is_capped(self):
+        with patch.object(BookCursorPagination, "max_page_size", 3):
+            res = self.api_client.get(BOOK_URL, {"page_size": 1000})
+
+        self.assertEqual(len(res.data["results"]), 3)
+
+
+class BookSearchTest(TestCase):
+    def setUp(self):
+        self.api_client = APIClient()
+        self.it = sample_book(title="It", author="Stephen King")
+        self.shining = sample_book(title="The Shining", author="Stephen King")
+        self.dune = sample_book(title="Dune", author="Frank Herbert")
+
+    def titles(self, res):
+        return sorted(book["title"] for book in res.data["results"])
+
+    def test_filter_by_word_prefix(self):
+        res = self.api_client.get(BOOK_URL, {"title": "shin"})
+
+        self.assertEqual(self.titles(res), ["The Shining"])
+
+    def test_filter_by_several_titles(self):
+        res = self.api_client.get(BOOK_URL, {"title": ["dune", "it"]})
+
+        self.assertEqual(self.titles(res), ["Dune", "It"])
+
+    def test_filter_by_title_and_author(self):
+        res = self.api_client.get(
+            BOOK_URL, {"title": "the", "author": "stephen king"}
+        )
+
+        self.assertEqual(self.titles(res), ["The Shining"])
+
+    def test_index_follows_book_changes(self):
+        self.dune.title = "Children of Dune"
+        self.dune.save()
+        self.it.delete()
+
+        self.assertEqual(
+            self.titles(self.api_client.get(BOOK_URL, {"title": "children"})),
+            ["Children of Dune"]
+        )
+        self.assertEqual(
+            self.titles(self.api_client.get(BOOK_URL, {"title": "it"})),
+            []
+        )
+
+    def test_ranked_search(self):
+        sample_book(title="King Rat", author="James Clavell")
+
+        res = self.api_client.get(
+            reverse("books:book-search"), {"q": "stephen king"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(book["title"] for book in res.data),
+            ["It", "The Shining"]
+        )
+
+
+class AsyncBookViewTest(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        for i in range(3):
+            sample_book(title=f"Book {i}")
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@mail.com", password="<PASSWORD>"
+        )
+
+    async def test_list_matches_sync_list(self):
+        sync_res = await self.async_client.get(
+            BOOK_URL, {"page_size": 2}
+        )
+        url = reverse("books:book-list-async")
+
+        res = await self.async_client.get(url, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.content,
+            sync_res.content.replace(BOOK_URL.encode(), url.encode()),
+        )
+        next_page = await self.async_client.get(res.json()["next"])
+        self.assertEqual(
+            [book["title"] for book in next_page.json()["results"]],
+            ["Book 2"],
+        )
+
+    async def test_retrieve_is_admin_only(self):
+        book = await Book.objects.afirst()
+        url = reverse("books:book-detail-async", args=[book.id])
+        self.assertEqual(
+            (await self.async_client.get(url)).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+        token = AccessToken.for_user(self.admin)
+        res = await self.async_client.get(
+            url, headers={"Authorization": f"Bearer {token}"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["title"], book.title)
+
+    async def test_only_reads_are_allowed(self):
+        res = await self.async_client.post(reverse("books:book-list-async"))
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class BookListCacheTest(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.api_client = APIClient()
+        self.book = sample_book(title="Cached Book")
+
+    def test_repeated_list_is_served_from_cache(self):
+        self.api_client.get(BOOK_URL)
+
+        with self.assertNumQueries(0):
+            res = self.api_client.get(BOOK_URL)
+
+        self.assertEqual(res.data["results"][0]["title"], "Cached Book")
+        stats = catalog_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_filters_are_cached_separately(self):
+        self.api_client.get(BOOK_URL, {"title": "cached"})
+
+        res = self.api_client.get(BOOK_URL, {"title": "missing"})
+
+        self.assertEqual(res.data["results"], [])
+
+    def test_only_filters_are_normalized_in_the_key(self):
+        def key(**params):
+            return list_cache_key(
+                Request(APIRequestFactory().get(BOOK_URL, params)), 1
+            )
+
+        self.assertEqual(key(title=" Cached"), key(title="cached"))
+        self.assertNotEqual(key(cursor="cD0x"), key(cursor="Cd0X"))
+
+    def test_book_write_invalidates_cache(self):
+        self.api_client.get(BOOK_URL)
+        self.book.title = "Renamed Book"
+        self.book.save()
+
+        res = self.api_client.get(BOOK_URL)
+
+        self.assertEqual(res.data["results"][0]["title"], "Renamed Book")
+
+    def test_inventory_change_bumps_version(self):
+        user = get_user_model().objects.create_user(email="test@mail.com")
+        version, _ = get_catalog_version()
+
+        Borrowing.objects.create(
+            book=self.book,
+            user=user,
+            expected_return_date=timezone.now().date() + timedelta(days=2),
+        )
+
+        self.assertNotEqual(get_catalog_version()[0], version)
+
+    def test_conditional_request_returns_not_modified(self):
+        res = self.api_client.get(BOOK_URL)
+
+        etag_res = self.api_client.get(
+            BOOK_URL, headers={"If-None-Match": res["ETag"]}
+        )
+        date_res = self.api_client.get(
+            BOOK_URL, headers={"If-Modified-Since": res["Last-Modified"]}
+        )
+
+        self.assertEqual(etag_res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(date_res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cache_stats_are_admin_only(self):
+        url = reverse("books:book-cache-stats")
+        self.assertEqual(
+            self.api_client.get(url).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+        admin = get_user_model().objects.create_superuser(
+            email="admin@mail.com", password="<PASSWORD>"
+        )
+        self.api_client.force_authenticate(user=admin)
+
+        res = self.api_client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("hit_ratio", res.data)
+
+
+class BookAvailabilityTest(TestCase):
+    def setUp(self):
+        self.api_client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="reader@mail.com", password="<PASSWORD>"
+        )
+        self.book = sample_book(inventory=3)
+        self.other_book = sample_book(title="Other", inventory=1)
+        self.today = timezone.now().date()
+
+    def borrow(self, book, days):
+        return Borrowing.objects.create(
+            book=book,
+            user=self.user,
+            expected_return_date=self.today + timedelta(days=days),
+        )
+
+    def availability(self, book):
+        return self.api_client.get(
+            reverse("books:book-availability", args=[book.id])
+        )
+
+    def test_availability_follows_borrows_and_returns(self):
+        late = self.borrow(self.book, 10)
+        early = self.borrow(self.book, 3)
+
+        res = self.availability(self.book)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {
+            "book": self.book.id,
+            "total_copies": 3,
+            "available": 1,
+            "on_loan": 2,
+            "reserved": 0,
+            "next_return_date": str(self.today + timedelta(days=3)),
+        })
+
+        early.actual_return_date = self.today
+        early.save()
+        res = self.availability(self.book)
+        self.assertEqual(res.data["on_loan"], 1)
+        self.assertEqual(
+            res.data["next_return_date"], str(self.today + timedelta(days=10))
+        )
+
+        late.actual_return_date = self.today
+        late.save()
+        res = self.availability(self.book)
+        self.assertEqual(res.data["available"], 3)
+        self.assertIsNone(res.data["next_return_date"])
+
+    def test_missing_book(self):
+        res = self.api_client.get(
+            reverse("books:book-availability", args=[999])
+        )
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_availability_keeps_requested_order(self):
+        self.borrow(self.other_book, 5)
+
+        with self.assertNumQueries(1):
+            res = self.api_client.get(
+                reverse("books:book-bulk-availability"),
+                {"ids": [self.other_book.id, 999, self.book.id]},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row["book"] for row in res.data],
+            [self.other_book.id, self.book.id],
+        )
+        self.assertEqual(res.json()[0], {
+            "book": self.other_book.id,
+            "total_copies": 1,
+            "available": 0,
+            "on_loan": 1,
+            "reserved": 0,
+            "next_return_date": str(self.today + timedelta(days=5)),
+        })
+
+    def test_bulk_availability_requires_ids(self):
+        res = self.api_client.get(reverse("books:book-bulk-availability"))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_matches_maintained_counters(self):
+        self.borrow(self.book, 4)
+        self.borrow(self.book, 2)
+        maintained = list(BookAvailability.objects.order_by("book").values())
+        BookAvailability.objects.all().delete()
+
+        rebuild_availability()
+
+        self.assertEqual(
+            list(BookAvailability.objects.order_by("book").values()),
+            maintained,
+        )
+
+
+class BookImportTest(TestCase):
+    csv_data = (
+        "title,author,cover,inventory,daily_fee\n"
+        "Dune,Frank Herbert,HARD,4,1.50\n"
+        "Emma,Jane Austen,SOFT,many,0.80\n"
+        "Dune,Frank Herbert,SOFT,2,1.20\n"
+        "Ulysses,James Joyce,PAPER,1,0.999\n"
+    )
+
+    def setUp(self):
+        self.api_client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@mail.com", password="<PASSWORD>"
+        )
+        self.api_client.force_authenticate(user=self.admin)
+        self.existing = sample_book(
+            title="Dune",
+            author="Frank Herbert",
+            cover="HARD",
+            inventory=1,
+            daily_fee=Decimal("1.00"),
+        )
+        self.url = reverse("books:book-import-catalog")
+
+    def upload(self, content, name="books.csv", **data):
+        return self.api_client.post(
+            self.url,
+            {"file": SimpleUploadedFile(name, content.encode()), **data},
+            format="multipart",
+        )
+
+    def test_csv_upload_upserts_and_reports_errors(self):
+        version, _ = get_catalog_version()
+
+        res = self.upload(self.csv_data)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual((res.data["imported"], res.data["failed"]), (2, 2))
+        self.assertEqual(
+            [(error["line"], sorted(error["errors"]))
+             for error in res.data["errors"]],
+            [(3, ["inventory"]), (5, ["cover", "daily_fee"])]
+        )
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.inventory, 4)
+        self.assertEqual(self.existing.daily_fee, Decimal("1.50"))
+        self.assertEqual(Book.objects.filter(title="Dune").count(), 2)
+        self.assertGreater(get_catalog_version()[0], version)
+
+    def test_reimport_keeps_copies_on_loan_off_the_shelf(self):
+        user = get_user_model().objects.create_user(email="user@mail.com")
+        Borrowing.objects.create(
+            book=self.existing,
+            user=user,
+            expected_return_date=timezone.now().date() + timedelta(days=2),
+        )
+
+        self.upload(self.csv_data)
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.inventory, 3)
+        self.assertEqual(self.existing.availability.on_loan, 1)
+
+    def test_json_lines_upload(self):
+        res = self.upload(
+            '{"title": "Emma", "author": "Jane Austen", "cover": "SOFT",'
+            ' "inventory": 3, "daily_fee": "0.80"}\n'
+            "not json\n"
+            '["a list"]\n',
+            name="books.txt",
+            input_format="jsonl",
+        )
+
+        self.assertEqual(res.data["imported"], 1)
+        self.assertEqual(
+            [error["line"] for error in res.data["errors"]], [2, 3]
+        )
+        self.assertTrue(
+            BookAvailability.objects.filter(book__title="Emma").exists()
+        )
+
+    def test_unknown_extension_needs_format(self):
+        res = self.upload(self.csv_data, name="books.dat")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("input_format", res.data)
+
+    def test_import_requires_admin(self):
+        user = get_user_model().objects.create_user(email="user@mail.com")
+        self.api_client.force_authenticate(user=user)
+
+        res = self.upload(self.csv_data)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_duplicates_in_one_batch_keep_last_row(self):
+        rows = read_rows(StringIO(
+            "title,author,cover,inventory,daily_fee\n"
+            "Emma,Jane Austen,SOFT,1,0.80\n"
+            "Emma,Jane Austen,SOFT,7,0.90\n"
+        ), "csv")
+
+        report = import_books(rows, batch_size=10)
+
+        self.assertEqual(report.imported, 1)
+        self.assertEqual(Book.objects.get(title="Emma").inventory, 7)
+
+    def test_imported_books_are_searchable(self):
+        self.upload(self.csv_data)
+
+        res = self.api_client.get(
+            reverse("books:book-search"), {"q": "herbert"}
+        )
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_command_imports_file(self):
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", delete=False
+        ) as handle:
+            handle.write(self.csv_data)
+        self.addCleanup(os.remove, handle.name)
+        out, err = StringIO(), StringIO()
+
+        call_command("import_books", handle.name, stdout=out, stderr=err)
+
+        self.assertIn("Imported 2 books, 2 rows failed.", out.getvalue())
+        self.assertIn("line 3:", err.getvalue())
@@ -1,3 +1,4 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
 from books.views import BookViewSet
@@ -9,4 +10,15 @@ router.register("books", BookViewSet)
 
 app_name = "books"
 
-urlpatterns = router.urls
+urlpatterns = [
+    path(
+        "async/books/",
+        BookViewSet.as_async_view("list"),
+        name="book-list-async",
+    ),
+    path(
+        "async/books/<int:pk>/",
+        BookViewSet.as_async_view("retrieve"),
+        name="book-detail-async",
+    ),
+] + router.urls
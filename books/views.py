@@ -1,64 +1,271 @@
+import codecs
+
+from django.db.models import F
+from django.shortcuts import get_object_or_404
+from django.utils.http import http_date, parse_http_date_safe
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
 
-from books.models import Book
-from books.serializers import BookSerializer, BookListSerializer
+from books.cache import (
+    catalog_cache_stats,
+    get_cached,
+    get_catalog_version,
+    list_cache_key,
+    list_etag,
+    set_cached,
+)
+from books.importer import import_books, read_rows
+from books.models import Book, BookAvailability
+from books.search import search_books, rank_books
+from books.serializers import (
+    BookSerializer,
+    BookListSerializer,
+    BookAvailabilitySerializer,
+    BookAvailabilityQuerySerializer,
+    BookImportSerializer,
+)
+from library_service.async_views import AsyncReadMixin
+from library_service.pagination import BookCursorPagination
+from library_service.renderers import ListRendererMixin
+from library_service.serializers import values_rows
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(
+    AsyncReadMixin, ListRendererMixin, viewsets.ModelViewSet
+):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    pagination_class = BookCursorPagination
 
     def get_queryset(self):
         queryset = self.queryset
 
-        title = self.request.query_params.get("title", None)
-        author = self.request.query_params.get("author", None)
         cover = self.request.query_params.get("cover", None)
-        if title:
-            queryset = queryset.filter(title__icontains=title)
-
-        if author:
-            queryset = queryset.filter(author__icontains=author)
+        queryset = search_books(
+            queryset,
+            title=self.request.query_params.getlist("title"),
+            author=self.request.query_params.getlist("author"),
+        )
 
         if cover:
             queryset = queryset.filter(cover__icontains=cover)
 
-        return queryset.distinct()
+        if self.action == "list":
+            queryset = values_rows(queryset, BookListSerializer)
+
+        return queryset
 
     def get_serializer_class(self):
-        if self.action == "list":
+        if self.action in ("list", "search"):
             return BookListSerializer
+        if self.action == "import_catalog":
+            return BookImportSerializer
+        if self.action in ("availability", "bulk_availability"):
+            return BookAvailabilitySerializer
         return BookSerializer
 
     def get_permissions(self):
-        if self.action == "list":
+        if self.action in (
+            "list", "search", "availability", "bulk_availability"
+        ):
             return (permissions.AllowAny(),)
         return (permissions.IsAdminUser(),)
 
     @extend_schema(
         summary="Get list of books",
-        description="Return list of books, "
-                    "filtered by title, author and cover",
+        description="Return a page of books, "
+                    "filtered by title, author and cover. "
+                    "Follow the `next` link to get the next page.",
         responses={200: BookListSerializer(many=True)},
         parameters=[
             OpenApiParameter(
                 name="title",
                 type={"type": "array", "items": {"type": "string"}},
-                description="Filter books by title (ex. ?title=It)",
+                description="Filter books by words or word prefixes in "
+                            "the title (ex. ?title=It). Repeat the "
+                            "parameter to match any of several titles",
             ),
             OpenApiParameter(
                 name="author",
                 type={"type": "array", "items": {"type": "string"}},
-                description="Filter books by author "
-                            "(ex. ?author=Stephen King)",
+                description="Filter books by words or word prefixes in "
+                            "the author name (ex. ?author=Stephen King). "
+                            "Repeat the parameter to match any of "
+                            "several authors",
             ),
             OpenApiParameter(
                 name="cover",
                 type={"type": "string", "enum": ["Hard", "Soft"]},
                 description="Filter books by cover (ex. ?cover=Hard)",
-            )
+            ),
+            OpenApiParameter(
+                name="page_size",
+                type=int,
+                description="Number of books per page "
+                            "(capped by the server)",
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        key, headers, response = self.cached_list(request)
+        if response is None:
+            data = super().list(request, *args, **kwargs).data
+            set_cached(key, data)
+            response = Response(data, headers=headers)
+        return response
+
+    async def alist(self, request, *args, **kwargs):
+        # The catalog cache stays synchronous: it is either in process or
+        # one round trip to the cache server.
+        key, headers, response = self.cached_list(request)
+        if response is None:
+            data = (await super().alist(request, *args, **kwargs)).data
+            set_cached(key, data)
+            response = Response(data, headers=headers)
+        return response
+
+    def cached_list(self, request):
+        """Return ``(key, headers, response)`` for a list request.
+
+        ``response`` is a 304 or a cached page, or None on a cache miss.
+        """
+        version, modified = get_catalog_version()
+        key = list_cache_key(request, version)
+        headers = {
+            "ETag": list_etag(key),
+            "Last-Modified": http_date(modified),
+        }
+        if self.is_not_modified(request, headers["ETag"], modified):
+            return key, headers, Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+
+        data = get_cached(key)
+        if data is not None:
+            return key, headers, Response(data, headers=headers)
+        return key, headers, None
+
+    @staticmethod
+    def is_not_modified(request, etag, modified):
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in (tag.strip() for tag in if_none_match.split(","))
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        return if_modified_since is not None and modified <= if_modified_since
+
+    @extend_schema(
+        summary="Catalog cache statistics",
+        description="Return hit/miss counters and the current catalog "
+                    "version of the book list cache.",
+    )
+    @action(detail=False, methods=["get"], url_path="cache-stats")
+    def cache_stats(self, request):
+        return Response(catalog_cache_stats())
+
+    @extend_schema(
+        summary="Search books",
+        description="Return the best matching books for a free-text query "
+                    "over title and author, most relevant first.",
+        responses={200: BookListSerializer(many=True)},
+        parameters=[
+            OpenApiParameter(
+                name="q",
+                type=str,
+                description="Words or word prefixes to look for "
+                            "(ex. ?q=king shin)",
+            ),
+        ]
+    )
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        books = rank_books(self.queryset, request.query_params.get("q", ""))
+        page_size = self.paginator.get_page_size(request)
+        serializer = self.get_serializer(books[:page_size], many=True)
+        return Response(serializer.data)
+
+    @staticmethod
+    def availability_queryset():
+        return BookAvailability.objects.annotate(
+            available=F("book__inventory"),
+            total_copies=(
+                F("book__inventory") + F("on_loan") + F("reserved")
+            ),
+        )
+
+    @extend_schema(
+        summary="Book availability",
+        description="Return the total, available, lent and reserved "
+                    "copies of a book and the earliest expected return of "
+                    "a lent copy.",
+    )
+    @action(detail=True, methods=["get"])
+    def availability(self, request, pk=None):
+        availability = get_object_or_404(
+            self.availability_queryset(), book_id=pk
+        )
+        return Response(self.get_serializer(availability).data)
+
+    @extend_schema(
+        summary="Availability of several books",
+        description="Return the availability of every listed book that "
+                    "exists, in the order the ids were given "
+                    "(ex. ?ids=1&ids=2).",
+        parameters=[BookAvailabilityQuerySerializer],
+        responses={200: BookAvailabilitySerializer(many=True)},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="availability",
+        pagination_class=None,
+    )
+    def bulk_availability(self, request):
+        params = BookAvailabilityQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ids = params.validated_data["ids"]
+
+        rows = {
+            row.book: row for row in values_rows(
+                self.availability_queryset().filter(book_id__in=ids),
+                BookAvailabilitySerializer,
+            )
+        }
+        serializer = self.get_serializer(
+            [rows[pk] for pk in dict.fromkeys(ids) if pk in rows], many=True
+        )
+        return Response(serializer.data)
+
+    @extend_schema(
+        summary="Import books",
+        description="Upload a CSV or JSON Lines file of books (admins only)."
+                    " Rows are validated and upserted in batches, matching"
+                    " existing books by title, author and cover; invalid rows"
+                    " are reported by line number.",
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=(MultiPartParser,),
+    )
+    def import_catalog(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["file"]
+
+        try:
+            report = import_books(read_rows(
+                codecs.iterdecode(upload, "utf-8-sig"),
+                serializer.validated_data["input_format"],
+            ))
+        except UnicodeDecodeError:
+            return Response(
+                {"file": ["The file must be UTF-8 encoded."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
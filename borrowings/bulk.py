@@ -0,0 +1,192 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from books.cache import bump_catalog_version
+from books.models import Book, BookAvailability
+from borrowings.models import (
+    BOOK_UNAVAILABLE_MESSAGE,
+    Borrowing,
+    Hold,
+    record_loans,
+    record_returns,
+    shelve_copies,
+)
+from borrowings.notifications import enqueue_telegram_message
+from events.feed import borrowing_event, publish
+from reports.rollups import count_loans, count_returns
+from borrowings.serializers import BorrowingBulkItemSerializer
+from payments.checkout import enqueue_checkout
+
+
+def _error(index, detail):
+    return {"index": index, "status": "error", "errors": detail}
+
+
+def _shift_inventory(books, counts, delta):
+    """Apply ``delta`` per counted copy to ``books`` in one UPDATE."""
+    for book in books:
+        book.inventory = F("inventory") + delta * counts[book.pk]
+    Book.objects.bulk_update(books, ["inventory"])
+
+
+def borrow_many(user, items):
+    """Borrow several books at once for ``user``.
+
+    Returns one result per item, in order. Items that fail validation or
+    hit an exhausted book are reported without affecting the others.
+    """
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        serializer = BorrowingBulkItemSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = _error(index, serializer.errors)
+
+    with transaction.atomic():
+        reservation = Hold.objects.filter(
+            book=OuterRef("pk"),
+            user=user,
+            status=Hold.StatusChoices.RESERVED,
+            reserved_until__gt=timezone.now(),
+        )
+        books = Book.objects.select_for_update().annotate(
+            reserved_for_user=Exists(reservation)
+        ).in_bulk({data["book"] for _, data in valid})
+        available = {pk: book.inventory for pk, book in books.items()}
+        taken = Counter()
+        collected = set()
+        pending = []
+        for index, data in valid:
+            book_id = data["book"]
+            if book_id not in books:
+                results[index] = _error(index, {"book": ["Book not found."]})
+            elif books[book_id].reserved_for_user \
+                    and book_id not in collected:
+                collected.add(book_id)
+                pending.append((index, Borrowing(
+                    book=books[book_id],
+                    user=user,
+                    expected_return_date=data["expected_return_date"],
+                )))
+            elif available[book_id] <= taken[book_id]:
+                results[index] = _error(index, [BOOK_UNAVAILABLE_MESSAGE])
+            else:
+                taken[book_id] += 1
+                pending.append((index, Borrowing(
+                    book=books[book_id],
+                    user=user,
+                    expected_return_date=data["expected_return_date"],
+                )))
+
+        if pending:
+            Borrowing.objects.bulk_create(
+                [borrowing for _, borrowing in pending]
+            )
+            _shift_inventory(
+                [books[book_id] for book_id in taken], taken, -1
+            )
+            if collected:
+                Hold.objects.filter(
+                    book_id__in=collected,
+                    user=user,
+                    status=Hold.StatusChoices.RESERVED,
+                ).update(status=Hold.StatusChoices.FULFILLED)
+                BookAvailability.objects.filter(
+                    book_id__in=collected
+                ).update(reserved=F("reserved") - 1)
+            loans = defaultdict(list)
+            for _, borrowing in pending:
+                loans[borrowing.book_id].append(
+                    borrowing.expected_return_date
+                )
+            record_loans(loans)
+            bump_catalog_version()
+            count_loans([borrowing for _, borrowing in pending])
+            publish([
+                borrowing_event("created", borrowing)
+                for _, borrowing in pending
+            ])
+            enqueue_telegram_message(
+                f"<b>New borrowings</b>\n"
+                f"<b>User:</b> {user.email}\n"
+                f"<b>Books:</b> "
+                f"{', '.join(b.book.title for _, b in pending)}\n"
+                f"<b>Date of borrowing:</b> {timezone.now().date()}\n"
+            )
+
+    for index, borrowing in pending:
+        results[index] = {
+            "index": index, "status": "created", "id": borrowing.pk
+        }
+    return results
+
+
+def return_many(queryset, ids, request):
+    """Return several borrowings visible through ``queryset`` at once.
+
+    Queues one aggregated payment session per borrowing user.
+    """
+    results = []
+    payments = []
+    today = timezone.now().date()
+
+    with transaction.atomic():
+        borrowings = queryset.select_for_update().select_related(
+            "book", "user"
+        ).in_bulk(ids)
+        returning = []
+        for index, pk in enumerate(ids):
+            borrowing = borrowings.get(pk)
+            if borrowing is None:
+                results.append(_error(index, ["Borrowing not found."]))
+            elif borrowing.actual_return_date is not None:
+                results.append(
+                    _error(index, ["This book has already been returned."])
+                )
+            else:
+                borrowing.actual_return_date = today
+                returning.append(borrowing)
+                results.append(
+                    {"index": index, "status": "returned", "id": pk}
+                )
+
+        if returning:
+            Borrowing.objects.filter(
+                pk__in=[borrowing.pk for borrowing in returning]
+            ).update(actual_return_date=today)
+            counts = Counter(borrowing.book_id for borrowing in returning)
+            record_returns(counts)
+            shelve_copies(counts)
+            bump_catalog_version()
+            count_returns(returning)
+            publish([
+                borrowing_event("returned", borrowing)
+                for borrowing in returning
+            ])
+
+            by_user = defaultdict(list)
+            for borrowing in returning:
+                by_user[borrowing.user].append(borrowing)
+            for user, user_borrowings in by_user.items():
+                payment = enqueue_checkout(user_borrowings, request)
+                payments.append({
+                    "user": user.pk,
+                    "payment": payment.pk,
+                    "status": payment.status,
+                })
+
+            enqueue_telegram_message(
+                f"<b>Books have been returned</b>\n"
+                f"<b>Books:</b> "
+                f"{', '.join(b.book.title for b in returning)}\n"
+                f"<b>Users:</b> "
+                f"{', '.join(user.email for user in by_user)}\n"
+                f"<b>Return Date:</b> {today}\n"
+            )
+
+    return results, payments
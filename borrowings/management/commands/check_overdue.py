@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from borrowings.overdue import CHUNK_SIZE, notify_overdue, sweep_overdue
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute accrued fines for overdue borrowings, store them as fine "
+        "snapshots and queue a summary notification."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Borrowings processed per database round trip.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Run forever, sweeping every --interval seconds.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=3600,
+            help="Seconds between sweeps in --loop mode.",
+        )
+        parser.add_argument(
+            "--quiet",
+            action="store_true",
+            help="Do not queue a Telegram summary.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.sweep(options)
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    def sweep(self, options):
+        today = timezone.now().date()
+        started = time.monotonic()
+        processed, total = sweep_overdue(
+            today, chunk_size=options["chunk_size"]
+        )
+        if processed and not options["quiet"]:
+            notify_overdue(today, processed, total)
+        self.stdout.write(
+            f"{today}: {processed} overdue borrowings, {total} USD accrued "
+            f"({time.monotonic() - started:.1f}s)"
+        )
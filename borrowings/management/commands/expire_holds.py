@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from borrowings.models import expire_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        "Expire reservations nobody collected in time and hand their copies "
+        "to the next holds in line, or back to the shelf."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Run forever, sweeping every --interval seconds.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=300,
+            help="Seconds between sweeps in --loop mode.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            now = timezone.now()
+            expired = expire_reservations(now)
+            self.stdout.write(f"{now:%Y-%m-%d %H:%M}: {expired} expired")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
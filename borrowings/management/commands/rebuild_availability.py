@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from borrowings.models import rebuild_availability
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the availability counters of every book from the "
+        "borrowings table, e.g. after loading borrowings in bulk."
+    )
+
+    def handle(self, *args, **options):
+        rebuild_availability()
+        self.stdout.write("Book availability rebuilt.")
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from borrowings.notifications import BATCH_SIZE, dispatch_notifications
+from borrowings.telegram_helper import create_telegram_session
+
+
+class Command(BaseCommand):
+    help = "Deliver queued Telegram notifications from the outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Maximum number of outbox rows claimed at once.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting when it is empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep between polls when the outbox is empty.",
+        )
+
+    def handle(self, *args, **options):
+        session = create_telegram_session()
+        total = 0
+        while True:
+            delivered = dispatch_notifications(
+                session=session, batch_size=options["batch_size"]
+            )
+            total += delivered
+            if delivered:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(f"Delivered {total} notifications.")
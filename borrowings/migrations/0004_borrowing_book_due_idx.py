@@ -0,0 +1,50 @@
+# Generated by Django 5.1.2 on 2026-10-18 05:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_availability(apps, schema_editor):
+    Book = apps.get_model("books", "Book")
+    BookAvailability = apps.get_model("books", "BookAvailability")
+    Borrowing = apps.get_model("borrowings", "Borrowing")
+
+    BookAvailability.objects.bulk_create(
+        (
+            BookAvailability(book_id=pk)
+            for pk in Book.objects.values_list("pk", flat=True)
+        ),
+        batch_size=1000,
+    )
+    active = Borrowing.objects.filter(
+        book=OuterRef("book"), actual_return_date__isnull=True
+    ).order_by()
+    on_loan = active.values("book").annotate(count=Count("pk"))
+    next_return = active.order_by("expected_return_date")
+    BookAvailability.objects.update(
+        on_loan=Coalesce(Subquery(on_loan.values("count")), 0),
+        next_return_date=Subquery(
+            next_return.values("expected_return_date")[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_book_availability'),
+        ('borrowings', '0003_borrowing_access_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='borrowing',
+            index=models.Index(condition=models.Q(('actual_return_date__isnull', True)), fields=['book', 'expected_return_date'], name='borrowing_book_due_idx'),
+        ),
+        migrations.RunPython(
+            backfill_availability, migrations.RunPython.noop
+        ),
+    ]
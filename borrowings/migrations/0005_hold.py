@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-18 05:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_bookavailability_reserved'),
+        ('borrowings', '0004_borrowing_book_due_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('priority', models.SmallIntegerField(default=0)),
+                ('status', models.CharField(choices=[('WAITING', 'Waiting'), ('RESERVED', 'Reserved'), ('FULFILLED', 'Fulfilled'), ('CANCELLED', 'Cancelled'), ('EXPIRED', 'Expired')], default='WAITING', max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reserved_until', models.DateTimeField(blank=True, null=True)),
+                ('book', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='books.book')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='holds', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'WAITING')), fields=['book', '-priority', 'created_at', 'id'], name='hold_queue_idx'), models.Index(condition=models.Q(('status', 'RESERVED')), fields=['reserved_until'], name='hold_reserved_until_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['WAITING', 'RESERVED'])), fields=('user', 'book'), name='hold_user_book_active')],
+            },
+        ),
+    ]
@@ -1,8 +1,23 @@
-from django.db import models
+from collections import Counter
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
-from books.models import Book
+from books.cache import bump_catalog_version
+from books.models import Book, BookAvailability
+from events.feed import borrowing_event, publish
+from reports.rollups import count_loans, count_returns
 from library_service import settings
+from library_service.waiters import Waiters
+
+BOOK_UNAVAILABLE_MESSAGE = "This book is currently not available."
+
+# Wakes long-polls on a hold, keyed by hold id, when its status changes.
+hold_waiters = Waiters()
 
 
 class Borrowing(models.Model):
@@ -17,10 +32,33 @@ class Borrowing(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
-        related_name="borrowings"
+        related_name="borrowings",
+        # Covered by the leading column of borrowing_user_return_idx.
+        db_index=False,
     )
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=["-id"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_active_idx",
+            ),
+            models.Index(
+                fields=["user", "actual_return_date"],
+                name="borrowing_user_return_idx",
+            ),
+            models.Index(
+                fields=["expected_return_date"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_overdue_idx",
+            ),
+            models.Index(
+                fields=["book", "expected_return_date"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_book_due_idx",
+            ),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=models.Q(
@@ -38,8 +76,8 @@ class Borrowing(models.Model):
         ]
 
     def clean(self):
-        if self.book.inventory <= 0:
-            raise ValidationError("This book is currently not available.")
+        if self.book.inventory <= 0 and not self._reservation().exists():
+            raise ValidationError(BOOK_UNAVAILABLE_MESSAGE)
 
         if self.expected_return_date \
                 and self.expected_return_date <= self.borrow_date:
@@ -58,14 +96,298 @@ class Borrowing(models.Model):
 
 
     def save(self, *args, **kwargs):
-        if self.actual_return_date:
-            self.book.inventory += 1
+        with transaction.atomic():
+            created = not self.pk
+            if created:
+                self._take_copy()
+            elif self.actual_return_date:
+                self._return_copy()
+            super().save(*args, **kwargs)
+            if created:
+                count_loans([self])
+                publish([borrowing_event("created", self)])
+
+    def _reservation(self):
+        return Hold.objects.filter(
+            book_id=self.book_id,
+            user_id=self.user_id,
+            status=Hold.StatusChoices.RESERVED,
+            reserved_until__gt=timezone.now(),
+        )
 
-        elif not self.pk:
-            self.book.inventory -= 1
+    def _take_copy(self):
+        if self._reservation().update(status=Hold.StatusChoices.FULFILLED):
+            BookAvailability.objects.filter(book_id=self.book_id).update(
+                reserved=F("reserved") - 1
+            )
+            record_loans({self.book_id: [self.expected_return_date]})
+            bump_catalog_version()
+            return
+        taken = Book.objects.filter(
+            pk=self.book_id, inventory__gt=0
+        ).update(inventory=F("inventory") - 1)
+        if not taken:
+            raise ValidationError(BOOK_UNAVAILABLE_MESSAGE)
+        record_loans({self.book_id: [self.expected_return_date]})
+        bump_catalog_version()
 
-        self.book.save()
-        super().save(*args, **kwargs)
+    def _return_copy(self):
+        returned = Borrowing.objects.filter(
+            pk=self.pk, actual_return_date__isnull=True
+        ).update(actual_return_date=self.actual_return_date)
+        if returned:
+            record_returns({self.book_id: 1})
+            shelve_copies({self.book_id: 1})
+            bump_catalog_version()
+            count_returns([self])
+            publish([borrowing_event("returned", self)])
 
     def __str__(self):
         return f"{self.user} borrowed {self.book} on {self.borrow_date}"
+
+
+class Hold(models.Model):
+    """A user's place in a book's queue, or the copy set aside for them."""
+
+    class StatusChoices(models.TextChoices):
+        WAITING = "WAITING", "Waiting"
+        RESERVED = "RESERVED", "Reserved"
+        FULFILLED = "FULFILLED", "Fulfilled"
+        CANCELLED = "CANCELLED", "Cancelled"
+        EXPIRED = "EXPIRED", "Expired"
+
+    ACTIVE_STATUSES = (StatusChoices.WAITING, StatusChoices.RESERVED)
+    # Higher priority first, then first come, first served.
+    QUEUE_ORDER = ("-priority", "created_at", "id")
+
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name="holds",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="holds",
+    )
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(
+        max_length=10,
+        choices=StatusChoices.choices,
+        default=StatusChoices.WAITING,
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    reserved_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["book", "-priority", "created_at", "id"],
+                condition=models.Q(status="WAITING"),
+                name="hold_queue_idx",
+            ),
+            models.Index(
+                fields=["reserved_until"],
+                condition=models.Q(status="RESERVED"),
+                name="hold_reserved_until_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "book"],
+                condition=models.Q(status__in=["WAITING", "RESERVED"]),
+                name="hold_user_book_active",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.status} hold of {self.user} on {self.book}"
+
+
+def shelve_copies(counts):
+    """Put freed copies, ``{book_id: copies}``, back into circulation.
+
+    Each copy is reserved for the next waiting hold on its book until
+    HOLD_RESERVATION_TTL seconds from now; copies nobody waits for go
+    back on the shelf. Returns the ids of the promoted holds.
+    """
+    promoted = []
+    reserved = Counter()
+    for book_id, count in counts.items():
+        ids = list(
+            Hold.objects.filter(
+                book_id=book_id, status=Hold.StatusChoices.WAITING
+            ).order_by(*Hold.QUEUE_ORDER).select_for_update(
+                skip_locked=True
+            ).values_list("pk", flat=True)[:count]
+        )
+        promoted += ids
+        reserved[book_id] = len(ids)
+
+    if promoted:
+        Hold.objects.filter(pk__in=promoted).update(
+            status=Hold.StatusChoices.RESERVED,
+            reserved_until=timezone.now() + timedelta(
+                seconds=settings.HOLD_RESERVATION_TTL
+            ),
+        )
+        BookAvailability.objects.bulk_update(
+            [
+                BookAvailability(
+                    book_id=book_id, reserved=F("reserved") + count
+                )
+                for book_id, count in reserved.items() if count
+            ],
+            ["reserved"],
+        )
+        transaction.on_commit(lambda: hold_waiters.notify(*promoted))
+
+    shelved = [
+        Book(pk=book_id, inventory=F("inventory") + count - reserved[book_id])
+        for book_id, count in counts.items() if count > reserved[book_id]
+    ]
+    Book.objects.bulk_update(shelved, ["inventory"])
+    return promoted
+
+
+def release_holds(holds, status):
+    """End reserved or waiting ``holds`` with ``status``.
+
+    The copies set aside for reserved ones go to the next holds in line.
+    Call it inside a transaction with the holds locked.
+    """
+    freed = Counter(
+        hold.book_id for hold in holds
+        if hold.status == Hold.StatusChoices.RESERVED
+    )
+    Hold.objects.filter(pk__in=[hold.pk for hold in holds]).update(
+        status=status
+    )
+    if freed:
+        BookAvailability.objects.bulk_update(
+            [
+                BookAvailability(
+                    book_id=book_id, reserved=F("reserved") - count
+                )
+                for book_id, count in freed.items()
+            ],
+            ["reserved"],
+        )
+        shelve_copies(freed)
+        bump_catalog_version()
+    ids = [hold.pk for hold in holds]
+    transaction.on_commit(lambda: hold_waiters.notify(*ids))
+
+
+def expire_reservations(now=None):
+    """Expire reservations nobody collected; return how many expired."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        holds = list(
+            Hold.objects.filter(
+                status=Hold.StatusChoices.RESERVED, reserved_until__lte=now
+            ).select_for_update(skip_locked=True).only(
+                "id", "book_id", "status"
+            )
+        )
+        if holds:
+            release_holds(holds, Hold.StatusChoices.EXPIRED)
+    return len(holds)
+
+
+def _next_return_date():
+    return Subquery(
+        Borrowing.objects.filter(
+            book=OuterRef("book"), actual_return_date__isnull=True
+        ).order_by("expected_return_date").values("expected_return_date")[:1]
+    )
+
+
+def record_loans(loans):
+    """Count new loans into their books' availability.
+
+    ``loans`` maps book ids to the expected return dates of the books'
+    new borrowings. Runs one UPDATE.
+    """
+    rows = []
+    for book_id, dates in loans.items():
+        earliest = Value(min(dates), output_field=models.DateField())
+        rows.append(BookAvailability(
+            book_id=book_id,
+            on_loan=F("on_loan") + len(dates),
+            next_return_date=Least(
+                Coalesce("next_return_date", earliest), earliest
+            ),
+        ))
+    BookAvailability.objects.bulk_update(
+        rows, ["on_loan", "next_return_date"]
+    )
+
+
+def record_returns(counts):
+    """Count returned copies, ``{book_id: copies}``, out of availability.
+
+    Call it once the borrowings are marked returned: the next return
+    date is looked up among the books' remaining loans.
+    """
+    rows = [
+        BookAvailability(book_id=book_id, on_loan=F("on_loan") - count)
+        for book_id, count in counts.items()
+    ]
+    BookAvailability.objects.bulk_update(rows, ["on_loan"])
+    BookAvailability.objects.filter(book_id__in=counts).update(
+        next_return_date=_next_return_date()
+    )
+
+
+def rebuild_availability():
+    """Recompute every book's availability from the borrowings table."""
+    with transaction.atomic():
+        BookAvailability.objects.bulk_create(
+            (
+                BookAvailability(book_id=pk)
+                for pk in Book.objects.filter(
+                    availability=None
+                ).values_list("pk", flat=True)
+            ),
+            batch_size=1000,
+        )
+        on_loan = Borrowing.objects.filter(
+            book=OuterRef("book"), actual_return_date__isnull=True
+        ).order_by().values("book").annotate(count=Count("pk"))
+        BookAvailability.objects.update(
+            on_loan=Coalesce(Subquery(on_loan.values("count")), 0),
+            next_return_date=_next_return_date(),
+        )
+
+
+class Notification(models.Model):
+    """Outgoing Telegram message waiting to be delivered by the dispatcher."""
+
+    class StatusChoices(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SENT = "SENT", "Sent"
+        FAILED = "FAILED", "Failed"
+
+    message = models.TextField()
+    status = models.CharField(
+        max_length=10,
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"],
+                name="notification_due_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.status} notification #{self.pk}"
@@ -0,0 +1,128 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from borrowings.models import Notification
+from borrowings.telegram_helper import (
+    TELEGRAM_MESSAGE_LIMIT,
+    TelegramError,
+    create_telegram_session,
+    send_telegram_message,
+)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = timedelta(seconds=5)
+BACKOFF_MAX = timedelta(minutes=30)
+CLAIM_LEASE = timedelta(minutes=5)
+SEPARATOR = "\n\n"
+
+
+def enqueue_telegram_message(message):
+    """Store a message in the outbox; call inside the business transaction."""
+    return Notification.objects.create(message=message)
+
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def claim_due_notifications(batch_size=BATCH_SIZE):
+    """Lease a batch of due messages so parallel dispatchers skip them."""
+    now = timezone.now()
+    due = Notification.objects.filter(
+        status=Notification.StatusChoices.PENDING,
+        next_attempt_at__lte=now,
+    ).order_by("next_attempt_at", "id")
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        notifications = list(due[:batch_size])
+        Notification.objects.filter(
+            id__in=[notification.id for notification in notifications]
+        ).update(next_attempt_at=now + CLAIM_LEASE)
+    return notifications
+
+
+def coalesce(notifications, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Group messages into as few Telegram messages as the size limit allows.
+
+    Yields ``(text, notifications)`` pairs in the original order.
+    """
+    group, length = [], 0
+    for notification in notifications:
+        size = len(notification.message) + (len(SEPARATOR) if group else 0)
+        if group and length + size > limit:
+            yield SEPARATOR.join(n.message for n in group), group
+            group, length = [], 0
+            size = len(notification.message)
+        group.append(notification)
+        length += size
+    if group:
+        yield SEPARATOR.join(n.message for n in group), group
+
+
+def _mark_sent(notifications):
+    Notification.objects.filter(
+        id__in=[notification.id for notification in notifications]
+    ).update(
+        status=Notification.StatusChoices.SENT,
+        sent_at=timezone.now(),
+        last_error="",
+    )
+
+
+def _mark_failed(notifications, error):
+    now = timezone.now()
+    for notification in notifications:
+        notification.attempts += 1
+        notification.last_error = str(error)
+        if notification.attempts >= MAX_ATTEMPTS:
+            notification.status = Notification.StatusChoices.FAILED
+        else:
+            notification.next_attempt_at = (
+                now + backoff(notification.attempts)
+            )
+    Notification.objects.bulk_update(
+        notifications,
+        ["attempts", "last_error", "status", "next_attempt_at"],
+    )
+
+
+def _send(text, notifications, session):
+    try:
+        send_telegram_message(text, session=session)
+    except Exception as error:
+        _mark_failed(notifications, error)
+        return 0
+    _mark_sent(notifications)
+    return len(notifications)
+
+
+def dispatch_notifications(session=None, batch_size=BATCH_SIZE):
+    """Deliver one batch of due messages.
+
+    When Telegram rejects a coalesced message, its members are sent one
+    by one, so that only the offending messages are retried later. On
+    network errors, rate limits and server errors the whole group backs
+    off instead. Returns the number of outbox rows that were delivered.
+    """
+    session = session or create_telegram_session()
+    delivered = 0
+    for text, group in coalesce(claim_due_notifications(batch_size)):
+        try:
+            send_telegram_message(text, session=session)
+        except Exception as error:
+            rejected = isinstance(error, TelegramError) and error.rejected
+            if len(group) == 1 or not rejected:
+                _mark_failed(group, error)
+                continue
+            for notification in group:
+                delivered += _send(
+                    notification.message, [notification], session
+                )
+        else:
+            _mark_sent(group)
+            delivered += len(group)
+    return delivered
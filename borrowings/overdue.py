@@ -0,0 +1,88 @@
+from decimal import Decimal
+
+from django.db.models import Count, F, Sum, Value
+from django.utils import timezone
+
+from borrowings.models import Borrowing
+from borrowings.notifications import enqueue_telegram_message
+from payments.expressions import DaysBetween
+from payments.models import FineSnapshot
+from payments.pricing import charge_annotations, from_cents
+
+CENT = Decimal("0.01")
+CHUNK_SIZE = 5000
+TOP_DEBTORS = 20
+
+
+def overdue_borrowings(today):
+    """Active overdue borrowings annotated with their accrued fine."""
+    return Borrowing.objects.filter(
+        actual_return_date__isnull=True,
+        expected_return_date__lt=today,
+    ).annotate(
+        overdue_days=DaysBetween(F("expected_return_date"), Value(today)),
+        fine_cents=charge_annotations(today)["fine_cents"],
+    )
+
+
+def sweep_overdue(today=None, chunk_size=CHUNK_SIZE):
+    """Upsert a FineSnapshot for every overdue borrowing.
+
+    Walks the overdue set in primary-key order one chunk at a time, so
+    memory stays bounded by ``chunk_size`` however many loans are overdue.
+    Returns ``(borrowings, total_fine)``.
+    """
+    today = today or timezone.now().date()
+    queryset = overdue_borrowings(today).order_by("id").values_list(
+        "id", "overdue_days", "fine_cents"
+    )
+    processed, total = 0, Decimal("0.00")
+    last_id = 0
+    while True:
+        snapshots = [
+            FineSnapshot(
+                borrowing_id=pk,
+                overdue_days=days,
+                amount=from_cents(fine),
+                computed_on=today,
+            )
+            for pk, days, fine in queryset.filter(id__gt=last_id)[
+                :chunk_size
+            ].iterator(chunk_size=chunk_size)
+        ]
+        if not snapshots:
+            break
+        FineSnapshot.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=["borrowing"],
+            update_fields=["overdue_days", "amount", "computed_on"],
+        )
+        processed += len(snapshots)
+        total += sum(snapshot.amount for snapshot in snapshots)
+        last_id = snapshots[-1].borrowing_id
+    return processed, total
+
+
+def notify_overdue(today, processed, total):
+    """Queue one summary message listing the largest debtors."""
+    debtors = FineSnapshot.objects.filter(
+        computed_on=today,
+        borrowing__actual_return_date__isnull=True,
+    ).values("borrowing__user__email").annotate(
+        loans=Count("id"),
+        amount=Sum("amount"),
+    ).order_by("-amount")[:TOP_DEBTORS]
+
+    lines = [
+        f"{debtor['borrowing__user__email']}: {debtor['loans']} overdue, "
+        f"{debtor['amount'].quantize(CENT)} USD"
+        for debtor in debtors
+    ]
+    enqueue_telegram_message(
+        f"<b>Overdue borrowings</b>\n"
+        f"<b>Date:</b> {today}\n"
+        f"<b>Overdue loans:</b> {processed}\n"
+        f"<b>Accrued fines:</b> {total} USD\n"
+        + "\n".join(lines)
+    )
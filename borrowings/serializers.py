@@ -1,7 +1,12 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 
 from books.serializers import BookSerializer
-from borrowings.models import Borrowing
+from borrowings.models import Borrowing, Hold
+from library_service.serializers import CompiledListSerializer
+
+BULK_MAX_ITEMS = 100
 
 
 class BorrowingSerializer(serializers.ModelSerializer):
@@ -25,6 +30,7 @@ class BorrowingListSerializer(BorrowingSerializer):
             "borrow_date",
             "expected_return_date",
         )
+        list_serializer_class = CompiledListSerializer
 
 
 class BorrowingDetailSerializer(BorrowingSerializer):
@@ -37,3 +43,81 @@ class BorrowingDetailSerializer(BorrowingSerializer):
             "actual_return_date",
             "book",
         )
+
+
+class BorrowingBulkItemSerializer(serializers.Serializer):
+    book = serializers.IntegerField(min_value=1)
+    expected_return_date = serializers.DateField()
+
+    def validate_expected_return_date(self, value):
+        if value <= timezone.now().date():
+            raise serializers.ValidationError(
+                "Expected return date must be later than borrowing date."
+            )
+        return value
+
+
+class BorrowingBulkCreateSerializer(serializers.Serializer):
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=BULK_MAX_ITEMS,
+    )
+
+
+class BorrowingBulkReturnSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_MAX_ITEMS,
+    )
+
+
+class HoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Hold
+        fields = (
+            "id",
+            "book",
+            "user",
+            "priority",
+            "status",
+            "created_at",
+            "reserved_until",
+        )
+        read_only_fields = ("user", "status", "created_at", "reserved_until")
+        # Checked in validate() with a clearer message.
+        validators = []
+
+    def validate(self, attrs):
+        user = self.context["request"].user
+        if attrs.get("priority") and not user.is_staff:
+            raise serializers.ValidationError(
+                {"priority": ["Only staff can set a priority."]}
+            )
+        if attrs["book"].inventory > 0:
+            raise serializers.ValidationError(
+                "This book is available; borrow it instead."
+            )
+        if Hold.objects.filter(
+            user=user,
+            book=attrs["book"],
+            status__in=Hold.ACTIVE_STATUSES,
+        ).exists():
+            raise serializers.ValidationError(
+                "You already hold this book."
+            )
+        return attrs
+
+
+class HoldWatchQuerySerializer(serializers.Serializer):
+    status = serializers.ChoiceField(
+        choices=Hold.StatusChoices.choices,
+        required=False,
+        help_text="Status the client knows; defaults to the current one.",
+    )
+    timeout = serializers.FloatField(
+        min_value=0,
+        max_value=settings.HOLD_LONG_POLL_TIMEOUT,
+        default=settings.HOLD_LONG_POLL_TIMEOUT,
+    )
@@ -1,23 +1,45 @@
 import os
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 
 load_dotenv()
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", 5))
+TELEGRAM_MESSAGE_LIMIT = 4096
 
-def send_telegram_message(message):
+
+class TelegramError(Exception):
+    """Telegram answered a message with an error status."""
+
+    def __init__(self, status_code, text):
+        super().__init__("Error when sending a message to Telegram", text)
+        self.status_code = status_code
+
+    @property
+    def rejected(self):
+        """Whether Telegram refused the message itself, e.g. its markup."""
+        return 400 <= self.status_code < 500 and self.status_code != 429
+
+
+def create_telegram_session():
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+    return session
+
+
+def send_telegram_message(message, session=None):
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {
         "chat_id": TELEGRAM_CHAT_ID,
         "text": message,
         "parse_mode": "HTML"
     }
-    response = requests.post(url, data=payload)
+    response = (session or requests).post(
+        url, data=payload, timeout=TELEGRAM_TIMEOUT
+    )
     if response.status_code != 200:
-        raise Exception(
-            "Error when sending a message to Telegram",
-            response.text
-        )
+        raise TelegramError(response.status_code, response.text)
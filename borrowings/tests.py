@@ -1,24 +1,49 @@
+import asyncio
+import csv
+import json
+import threading
+import time
 from datetime import timedelta
-from unittest.mock import patch
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import Mock, patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-from books.models import Book
-from borrowings.models import Borrowing
+from books.models import Book, BookAvailability
+from borrowings.models import (
+    Borrowing,
+    Hold,
+    Notification,
+    expire_reservations,
+    hold_waiters,
+)
+from borrowings.notifications import (
+    coalesce,
+    dispatch_notifications,
+    enqueue_telegram_message,
+)
+from borrowings.overdue import sweep_overdue
 from borrowings.serializers import BorrowingListSerializer
-from payments.models import Payment
+from payments.models import FineSnapshot, Payment
 
 BORROWING_URL = reverse("borrowings:borrowing-list")
 
 
 def sample_borrowing(user, book, **params):
     defaults = {
-        "expected_return_date": "2024-10-29",
+        "expected_return_date": timezone.now().date() + timedelta(days=2),
         "book": book.id,
         "user": user.id
     }
@@ -57,7 +82,7 @@ class AuthenticatedBorrowingTest(TestCase):
         borrowings = Borrowing.objects.all()
         serializer = BorrowingListSerializer(borrowings, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_filter_borrowing_list(self):
         borrowing_payload = sample_borrowing(user=self.user, book=self.book)
@@ -68,7 +93,7 @@ class AuthenticatedBorrowingTest(TestCase):
         serializer = BorrowingListSerializer(borrowings, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_create_borrowing(self):
         borrowing_url = reverse("borrowings:borrowing-list")
@@ -119,14 +144,25 @@ class AuthenticatedBorrowingTest(TestCase):
         self.book.refresh_from_db()
 
 
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
 
         self.assertIsNotNone(borrowing.actual_return_date)
 
         self.assertEqual(self.book.inventory, 2)
 
-    @patch("borrowings.views.create_stripe_session")
-    def test_return_book_with_stripe_called(self, mock_create_stripe_session):
+    def test_borrowing_list_is_limited_to_own_borrowings(self):
+        other = get_user_model().objects.create_user(email="other@mail.com")
+        Borrowing.objects.create(
+            book=self.book,
+            user=other,
+            expected_return_date=timezone.now().date() + timedelta(days=2),
+        )
+
+        res = self.api_client.get(BORROWING_URL)
+
+        self.assertEqual(res.data["results"], [])
+
+    def test_return_book_queues_checkout_job(self):
         borrowing_payload = sample_borrowing(
             user=self.user,
             book=self.book,
@@ -139,36 +175,40 @@ class AuthenticatedBorrowingTest(TestCase):
 
         self.assertEqual(create_res.status_code, status.HTTP_201_CREATED)
 
-        borrowing = Borrowing.objects.filter(
-            user=self.user,
-            book=self.book
-        ).first()
-        self.assertIsNotNone(
-            borrowing,
-            "Borrowing should exist for the user and book."
-        )
-
+        borrowing = Borrowing.objects.get(user=self.user, book=self.book)
         return_url = reverse(
             "borrowings:return-book",
             kwargs={"pk": borrowing.pk}
         )
 
-        mock_create_stripe_session.return_value = (
-            "session_url",
-            "session_id"
-        )
+        with patch(
+            "payments.checkout.create_checkout_session"
+        ) as create_session:
+            res = self.api_client.post(return_url)
 
-        res = self.api_client.post(return_url)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        create_session.assert_not_called()
 
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        payment = Payment.objects.get(pk=res.data["id"])
+        self.assertEqual(payment.status, Payment.StatusChoices.PENDING)
+        self.assertEqual(payment.idempotency_key, f"return:{borrowing.pk}")
+        self.assertEqual(res.data["session_url"], "")
+        self.assertEqual(
+            res["Location"],
+            reverse("payments:payment-detail", kwargs={"pk": payment.pk})
+        )
+        self.assertIn(
+            f"/payments/{payment.pk}/success/",
+            payment.checkout_job.success_url
+        )
 
-        self.assertTrue(mock_create_stripe_session.called)
+        retry = self.api_client.post(return_url)
 
-        borrowing.refresh_from_db()
+        self.assertEqual(retry.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(retry.data["id"], payment.pk)
+        self.assertEqual(retry["Location"], res["Location"])
+        self.assertEqual(Payment.objects.count(), 1)
         self.book.refresh_from_db()
-
-        self.assertIsNotNone(borrowing.actual_return_date)
-
         self.assertEqual(self.book.inventory, 2)
 
 class AdminBorrowingTest(TestCase):
@@ -201,7 +241,814 @@ class AdminBorrowingTest(TestCase):
         serializer2 = BorrowingListSerializer(borrowings2, many=True)
 
         self.assertEqual(res_is_active.status_code, status.HTTP_200_OK)
-        self.assertEqual(res_is_active.data, serializer1.data)
+        self.assertEqual(res_is_active.data["results"], serializer1.data)
 
         self.assertEqual(res_user_id.status_code, status.HTTP_200_OK)
-        self.assertEqual(res_user_id.data, serializer2.data)
+        self.assertEqual(res_user_id.data["results"], serializer2.data)
+
+
+class AsyncBorrowingViewTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@mail.com", password="<PASSWORD>"
+        )
+        other = get_user_model().objects.create_user(
+            email="other@mail.com", password="<PASSWORD>"
+        )
+        self.book = Book.objects.create(
+            title="Book", author="Author", cover="HARD",
+            inventory=5, daily_fee=Decimal("1.00"),
+        )
+        expected = timezone.now().date() + timedelta(days=2)
+        self.borrowing = Borrowing.objects.create(
+            user=self.user, book=self.book, expected_return_date=expected
+        )
+        self.other_borrowing = Borrowing.objects.create(
+            user=other, book=self.book, expected_return_date=expected
+        )
+        self.headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(self.user)}"
+        }
+
+    async def test_list_shows_own_borrowings(self):
+        res = await self.async_client.get(
+            reverse("borrowings:borrowing-list-async"), headers=self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["id"] for item in res.json()["results"]],
+            [self.borrowing.id],
+        )
+
+    async def test_retrieve_matches_sync_detail(self):
+        sync_res = await self.async_client.get(
+            reverse("borrowings:borrowing-detail", args=[self.borrowing.id]),
+            headers=self.headers,
+        )
+
+        res = await self.async_client.get(
+            reverse(
+                "borrowings:borrowing-detail-async", args=[self.borrowing.id]
+            ),
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, sync_res.content)
+        self.assertEqual(res.json()["book"]["title"], "Book")
+
+    async def test_other_users_borrowing_is_not_found(self):
+        res = await self.async_client.get(
+            reverse(
+                "borrowings:borrowing-detail-async",
+                args=[self.other_borrowing.id],
+            ),
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_invalid_token_is_rejected(self):
+        res = await self.async_client.get(
+            reverse("borrowings:borrowing-list-async"),
+            headers={"Authorization": "Bearer invalid"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res.json()["code"], "token_not_valid")
+
+
+class NotificationOutboxTest(TestCase):
+    def setUp(self):
+        self.api_client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@mail.com",
+            password="<PASSWORD>",
+        )
+        self.book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            cover="Hard",
+            inventory=2,
+            daily_fee=0.3
+        )
+        self.api_client.force_authenticate(user=self.user)
+
+    @patch("borrowings.telegram_helper.requests.post")
+    def test_create_borrowing_only_queues_message(self, mock_post):
+        res = self.api_client.post(
+            BORROWING_URL, sample_borrowing(user=self.user, book=self.book)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(mock_post.called)
+        notification = Notification.objects.get()
+        self.assertEqual(
+            notification.status, Notification.StatusChoices.PENDING
+        )
+        self.assertIn("Test Book", notification.message)
+
+    def test_dispatch_coalesces_pending_messages(self):
+        for i in range(3):
+            enqueue_telegram_message(f"message {i}")
+        session = Mock()
+        session.post.return_value = Mock(status_code=200)
+
+        delivered = dispatch_notifications(session=session)
+
+        self.assertEqual(delivered, 3)
+        self.assertEqual(session.post.call_count, 1)
+        self.assertEqual(
+            session.post.call_args.kwargs["data"]["text"],
+            "message 0\n\nmessage 1\n\nmessage 2"
+        )
+        self.assertFalse(
+            Notification.objects.exclude(
+                status=Notification.StatusChoices.SENT
+            ).exists()
+        )
+
+    def test_failed_group_is_resent_one_by_one(self):
+        for i in range(3):
+            enqueue_telegram_message(f"message {i}")
+        session = Mock()
+
+        def post(url, data, **kwargs):
+            if "bad" in data["text"] or "\n\n" in data["text"]:
+                return Mock(status_code=400, text="Bad Request")
+            return Mock(status_code=200)
+
+        session.post.side_effect = post
+        Notification.objects.filter(message="message 1").update(
+            message="message bad"
+        )
+
+        delivered = dispatch_notifications(session=session)
+
+        self.assertEqual(delivered, 2)
+        self.assertEqual(session.post.call_count, 4)
+        self.assertEqual(
+            list(Notification.objects.exclude(
+                status=Notification.StatusChoices.SENT
+            ).values_list("message", "attempts")),
+            [("message bad", 1)],
+        )
+
+    def test_failed_group_backs_off_on_server_errors(self):
+        for i in range(3):
+            enqueue_telegram_message(f"message {i}")
+        session = Mock()
+        session.post.return_value = Mock(status_code=502, text="Bad Gateway")
+
+        delivered = dispatch_notifications(session=session)
+
+        self.assertEqual(delivered, 0)
+        self.assertEqual(session.post.call_count, 1)
+        self.assertEqual(
+            set(Notification.objects.values_list("attempts", flat=True)),
+            {1},
+        )
+
+    def test_coalesce_respects_message_limit(self):
+        notifications = [Notification(message="x" * 6) for _ in range(3)]
+
+        groups = [group for _, group in coalesce(notifications, limit=14)]
+
+        self.assertEqual([len(group) for group in groups], [2, 1])
+
+    def test_failed_dispatch_is_retried_with_backoff(self):
+        notification = enqueue_telegram_message("message")
+        session = Mock()
+        session.post.return_value = Mock(status_code=502, text="Bad Gateway")
+
+        delivered = dispatch_notifications(session=session)
+
+        notification.refresh_from_db()
+        self.assertEqual(delivered, 0)
+        self.assertEqual(notification.attempts, 1)
+        self.assertEqual(
+            notification.status, Notification.StatusChoices.PENDING
+        )
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        self.assertEqual(dispatch_notifications(session=session), 0)
+        self.assertEqual(session.post.call_count, 1)
+
+
+class ConcurrentBorrowingTest(TransactionTestCase):
+    borrowers = 12
+    inventory = 3
+
+    def setUp(self):
+        self.book = Book.objects.create(
+            title="Popular Book",
+            author="Test Author",
+            cover="Hard",
+            inventory=self.inventory,
+            daily_fee=0.3
+        )
+        self.users = [
+            get_user_model().objects.create_user(email=f"reader{i}@mail.com")
+            for i in range(self.borrowers)
+        ]
+
+    def borrow(self, user, barrier, results):
+        barrier.wait()
+        try:
+            while True:
+                try:
+                    Borrowing(
+                        book=self.book,
+                        user=user,
+                        expected_return_date=(
+                            timezone.now().date() + timedelta(days=2)
+                        ),
+                    ).save()
+                except OperationalError:
+                    # Shared-cache SQLite reports lock contention instead
+                    # of waiting for the writer; other databases block.
+                    time.sleep(0.001)
+                    continue
+                results.append(True)
+                break
+        except ValidationError:
+            results.append(False)
+        finally:
+            connection.close()
+
+    def test_parallel_borrowers_never_oversell(self):
+        barrier = threading.Barrier(self.borrowers)
+        results = []
+        threads = [
+            threading.Thread(target=self.borrow, args=(user, barrier, results))
+            for user in self.users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.book.refresh_from_db()
+        self.assertEqual(results.count(True), self.inventory)
+        self.assertEqual(results.count(False), self.borrowers - self.inventory)
+        self.assertEqual(self.book.inventory, 0)
+        self.assertEqual(
+            Borrowing.objects.filter(book=self.book).count(), self.inventory
+        )
+
+
+class ReturnBorrowingTest(TestCase):
+    def test_saving_a_returned_borrowing_twice_returns_one_copy(self):
+        user = get_user_model().objects.create_user(
+            email="test@mail.com",
+            password="<PASSWORD>",
+        )
+        book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            cover="Hard",
+            inventory=1,
+            daily_fee=0.3
+        )
+        borrowing = Borrowing.objects.create(
+            book=book,
+            user=user,
+            expected_return_date=timezone.now().date() + timedelta(days=2),
+        )
+
+        borrowing.actual_return_date = timezone.now().date()
+        borrowing.save()
+        borrowing.save()
+
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 1)
+
+
+class BulkBorrowingTest(TestCase):
+    def setUp(self):
+        self.api_client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@mail.com",
+            password="<PASSWORD>",
+        )
+        self.book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            cover="Hard",
+            inventory=2,
+            daily_fee=0.3
+        )
+        self.other_book = Book.objects.create(
+            title="Other Book",
+            author="Test Author",
+            cover="Soft",
+            inventory=1,
+            daily_fee=0.5
+        )
+        self.api_client.force_authenticate(user=self.user)
+        self.return_date = timezone.now().date() + timedelta(days=2)
+
+    def bulk_borrow(self, *book_ids):
+        return self.api_client.post(
+            reverse("borrowings:borrowing-bulk-create"),
+            {"items": [
+                {"book": book_id, "expected_return_date": self.return_date}
+                for book_id in book_ids
+            ]},
+            format="json",
+        )
+
+    def test_bulk_borrow_reports_each_item(self):
+        res = self.bulk_borrow(
+            self.book.id, self.other_book.id, self.other_book.id, 999
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["status"] for item in res.data["results"]],
+            ["created", "created", "error", "error"]
+        )
+        self.book.refresh_from_db()
+        self.other_book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+        self.assertEqual(self.other_book.inventory, 0)
+        self.assertEqual(Borrowing.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_bulk_borrow_uses_constant_queries(self):
+        with self.assertNumQueries(11):
+            self.bulk_borrow(*[self.book.id] * 2, self.other_book.id)
+
+    def test_invalid_item_does_not_block_others(self):
+        res = self.api_client.post(
+            reverse("borrowings:borrowing-bulk-create"),
+            {"items": [
+                {"book": self.book.id, "expected_return_date": "2000-01-01"},
+                {"book": self.book.id,
+                 "expected_return_date": self.return_date},
+            ]},
+            format="json",
+        )
+
+        self.assertEqual(res.data["results"][0]["status"], "error")
+        self.assertIn(
+            "expected_return_date", res.data["results"][0]["errors"]
+        )
+        self.assertEqual(res.data["results"][1]["status"], "created")
+
+    def test_bulk_return(self):
+        created = self.bulk_borrow(self.book.id, self.other_book.id)
+        ids = [item["id"] for item in created.data["results"]]
+
+        res = self.api_client.post(
+            reverse("borrowings:borrowing-bulk-return"),
+            {"ids": ids + [ids[0]]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["status"] for item in res.data["results"]],
+            ["returned", "returned", "error"]
+        )
+        payment = Payment.objects.get()
+        self.assertEqual(
+            res.data["payments"],
+            [{
+                "user": self.user.id,
+                "payment": payment.id,
+                "status": Payment.StatusChoices.PENDING,
+            }]
+        )
+        self.assertEqual(len(payment.checkout_job.line_items), 2)
+        self.assertTrue(
+            payment.idempotency_key.startswith(f"bulk-return:{self.user.id}:")
+        )
+        self.book.refresh_from_db()
+        self.other_book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 2)
+        self.assertEqual(self.other_book.inventory, 1)
+        self.assertFalse(
+            Borrowing.objects.filter(actual_return_date__isnull=True).exists()
+        )
+
+
+class HoldQueueTest(TestCase):
+    def setUp(self):
+        self.api_client = APIClient()
+        User = get_user_model()
+        self.lender, self.first, self.second = (
+            User.objects.create_user(email=email, password="<PASSWORD>")
+            for email in ("lender@mail.com", "a@mail.com", "b@mail.com")
+        )
+        self.book = Book.objects.create(
+            title="Popular", author="Author", cover="HARD",
+            inventory=1, daily_fee=Decimal("1.00"),
+        )
+        self.loan = Borrowing.objects.create(
+            user=self.lender,
+            book=self.book,
+            expected_return_date=timezone.now().date() + timedelta(days=3),
+        )
+
+    def place_hold(self, user, **data):
+        self.api_client.force_authenticate(user=user)
+        return self.api_client.post(
+            reverse("borrowings:hold-list"), {"book": self.book.id, **data}
+        )
+
+    def return_loan(self, borrowing=None):
+        borrowing = borrowing or self.loan
+        borrowing.actual_return_date = timezone.now().date()
+        borrowing.save()
+
+    def borrow(self, user):
+        self.api_client.force_authenticate(user=user)
+        return self.api_client.post(BORROWING_URL, {
+            "book": self.book.id,
+            "user": user.id,
+            "expected_return_date": timezone.now().date()
+            + timedelta(days=2),
+        })
+
+    def test_hold_requires_an_unavailable_book(self):
+        self.return_loan()
+
+        res = self.place_hold(self.first)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_one_active_hold_per_user_and_book(self):
+        self.assertEqual(
+            self.place_hold(self.first).status_code, status.HTTP_201_CREATED
+        )
+        res = self.place_hold(self.first)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_staff_set_priority(self):
+        res = self.place_hold(self.first, priority=5)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("priority", res.data)
+
+    def test_return_reserves_copy_for_next_in_line(self):
+        Hold.objects.create(user=self.first, book=self.book)
+        urgent = Hold.objects.create(
+            user=self.second, book=self.book, priority=1
+        )
+
+        self.return_loan()
+
+        urgent.refresh_from_db()
+        self.book.refresh_from_db()
+        self.assertEqual(urgent.status, Hold.StatusChoices.RESERVED)
+        self.assertIsNotNone(urgent.reserved_until)
+        self.assertEqual(self.book.inventory, 0)
+        self.assertEqual(
+            BookAvailability.objects.get(book=self.book).reserved, 1
+        )
+        self.assertEqual(
+            self.borrow(self.first).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self.borrow(self.second).status_code, status.HTTP_201_CREATED
+        )
+        urgent.refresh_from_db()
+        self.assertEqual(urgent.status, Hold.StatusChoices.FULFILLED)
+        self.assertEqual(
+            BookAvailability.objects.get(book=self.book).reserved, 0
+        )
+
+    def test_bulk_return_promotes_holds(self):
+        hold = Hold.objects.create(user=self.first, book=self.book)
+        self.api_client.force_authenticate(user=self.lender)
+
+        self.api_client.post(
+            reverse("borrowings:borrowing-bulk-return"),
+            {"ids": [self.loan.id]},
+            format="json",
+        )
+
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, Hold.StatusChoices.RESERVED)
+
+    def test_bulk_borrow_collects_reservation(self):
+        hold = Hold.objects.create(user=self.first, book=self.book)
+        self.return_loan()
+        self.api_client.force_authenticate(user=self.first)
+
+        res = self.api_client.post(
+            reverse("borrowings:borrowing-bulk-create"),
+            {"items": [{
+                "book": self.book.id,
+                "expected_return_date": timezone.now().date()
+                + timedelta(days=2),
+            }] * 2},
+            format="json",
+        )
+
+        self.assertEqual(
+            [item["status"] for item in res.data["results"]],
+            ["created", "error"],
+        )
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, Hold.StatusChoices.FULFILLED)
+
+    def test_expired_reservation_moves_down_the_queue(self):
+        first = Hold.objects.create(user=self.first, book=self.book)
+        second = Hold.objects.create(user=self.second, book=self.book)
+        self.return_loan()
+
+        expire_reservations(timezone.now() + timedelta(days=30))
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, Hold.StatusChoices.EXPIRED)
+        self.assertEqual(second.status, Hold.StatusChoices.RESERVED)
+
+        expire_reservations(timezone.now() + timedelta(days=30))
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+        self.assertEqual(
+            BookAvailability.objects.get(book=self.book).reserved, 0
+        )
+
+    def test_cancelling_reservation_passes_copy_on(self):
+        first = Hold.objects.create(user=self.first, book=self.book)
+        second = Hold.objects.create(user=self.second, book=self.book)
+        self.return_loan()
+        self.api_client.force_authenticate(user=self.first)
+
+        res = self.api_client.delete(
+            reverse("borrowings:hold-detail", args=[first.id])
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, Hold.StatusChoices.CANCELLED)
+        self.assertEqual(second.status, Hold.StatusChoices.RESERVED)
+        res = self.api_client.delete(
+            reverse("borrowings:hold-detail", args=[first.id])
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class HoldWatchTest(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="reader@mail.com", password="<PASSWORD>"
+        )
+        book = Book.objects.create(
+            title="Popular", author="Author", cover="HARD",
+            inventory=0, daily_fee=Decimal("1.00"),
+        )
+        self.hold = Hold.objects.create(user=user, book=book)
+        self.url = reverse("borrowings:hold-watch", args=[self.hold.id])
+        self.headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(user)}"
+        }
+
+    async def test_returns_at_once_when_status_differs(self):
+        res = await self.async_client.get(
+            self.url, {"status": "RESERVED"}, headers=self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["status"], "WAITING")
+
+    async def test_wakes_up_on_promotion(self):
+        async def promote():
+            await asyncio.sleep(0.05)
+            await Hold.objects.filter(pk=self.hold.pk).aupdate(
+                status=Hold.StatusChoices.RESERVED
+            )
+            hold_waiters.notify(self.hold.pk)
+
+        started = time.monotonic()
+        res, _ = await asyncio.gather(
+            self.async_client.get(
+                self.url, {"timeout": 10}, headers=self.headers
+            ),
+            promote(),
+        )
+
+        self.assertEqual(res.json()["status"], "RESERVED")
+        self.assertLess(time.monotonic() - started, 1)
+
+    async def test_times_out_with_current_state(self):
+        res = await self.async_client.get(
+            self.url, {"timeout": 0.05}, headers=self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["status"], "WAITING")
+
+
+@skipUnless(connection.vendor == "sqlite", "Query plans are SQLite specific")
+class BorrowingIndexTest(TestCase):
+    def setUp(self):
+        self.api_client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@mail.com",
+            password="<PASSWORD>",
+        )
+        self.api_client.force_authenticate(user=self.user)
+
+    def query_plan(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            self.api_client.get(BORROWING_URL, params)
+        sql = next(
+            query["sql"] for query in queries
+            if 'FROM "borrowings_borrowing"' in query["sql"]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return " ".join(row[-1] for row in cursor.fetchall())
+
+    def test_active_list_uses_partial_index(self):
+        plan = self.query_plan({"is_active": "true"})
+
+        self.assertIn("borrowing_active_idx", plan)
+
+    def test_user_filter_uses_composite_index(self):
+        self.assertIn(
+            "borrowing_user_return_idx", self.query_plan({"user_id": 1})
+        )
+        self.assertIn(
+            "borrowing_user_return_idx",
+            self.query_plan({"user_id": 1, "is_active": "true"})
+        )
+
+    def test_overdue_scan_uses_index(self):
+        overdue = Borrowing.objects.filter(
+            actual_return_date__isnull=True,
+            expected_return_date__lt=timezone.now().date(),
+        ).values_list("id", flat=True)
+
+        self.assertIn("borrowing_overdue_idx", overdue.explain())
+
+
+class OverdueSweepTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="late@mail.com"
+        )
+        self.book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            cover="Hard",
+            inventory=5,
+            daily_fee=Decimal("0.35")
+        )
+        self.today = timezone.now().date()
+
+    def borrowing(self, overdue_days, returned=False):
+        borrowing = Borrowing.objects.create(
+            book=self.book,
+            user=self.user,
+            expected_return_date=self.today + timedelta(days=1),
+        )
+        expected = self.today - timedelta(days=overdue_days)
+        Borrowing.objects.filter(pk=borrowing.pk).update(
+            borrow_date=expected - timedelta(days=7),
+            expected_return_date=expected,
+            actual_return_date=self.today if returned else None,
+        )
+        return borrowing
+
+    def test_sweep_snapshots_overdue_fines(self):
+        late = self.borrowing(overdue_days=3)
+        very_late = self.borrowing(overdue_days=10)
+        self.borrowing(overdue_days=-2)
+        self.borrowing(overdue_days=4, returned=True)
+
+        processed, total = sweep_overdue(self.today, chunk_size=1)
+
+        self.assertEqual(processed, 2)
+        self.assertEqual(total, Decimal("9.10"))
+        snapshots = {
+            snapshot.borrowing_id: snapshot
+            for snapshot in FineSnapshot.objects.all()
+        }
+        self.assertEqual(set(snapshots), {late.pk, very_late.pk})
+        self.assertEqual(snapshots[late.pk].overdue_days, 3)
+        self.assertEqual(
+            snapshots[late.pk].amount,
+            Payment().calculate_fine(
+                self.today - timedelta(days=3),
+                self.today,
+                Decimal("0.35"),
+            )
+        )
+
+    def test_sweep_updates_existing_snapshots(self):
+        borrowing = self.borrowing(overdue_days=3)
+        sweep_overdue(self.today - timedelta(days=1))
+
+        sweep_overdue(self.today)
+
+        snapshot = FineSnapshot.objects.get(borrowing=borrowing)
+        self.assertEqual(snapshot.overdue_days, 3)
+        self.assertEqual(snapshot.computed_on, self.today)
+
+    def test_command_queues_one_summary(self):
+        self.borrowing(overdue_days=3)
+        self.borrowing(overdue_days=5)
+
+        call_command("check_overdue", stdout=StringIO())
+
+        notification = Notification.objects.get()
+        self.assertIn(
+            "late@mail.com: 2 overdue, 5.60 USD", notification.message
+        )
+
+
+class BorrowingExportTest(TestCase):
+    def setUp(self):
+        self.api_client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@mail.com", password="<PASSWORD>"
+        )
+        self.user = get_user_model().objects.create_user(
+            email="reader@mail.com", password="<PASSWORD>"
+        )
+        self.book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            cover="Hard",
+            inventory=10,
+            daily_fee=Decimal("0.50"),
+        )
+        today = timezone.now().date()
+        self.borrowings = []
+        for days_ago in (30, 20, 10):
+            borrowing = Borrowing.objects.create(
+                book=self.book,
+                user=self.user,
+                expected_return_date=today + timedelta(days=1),
+            )
+            Borrowing.objects.filter(pk=borrowing.pk).update(
+                borrow_date=today - timedelta(days=days_ago)
+            )
+            self.borrowings.append(borrowing)
+        Borrowing.objects.filter(pk=self.borrowings[0].pk).update(
+            actual_return_date=today
+        )
+        self.url = reverse("borrowings:borrowing-export")
+        self.api_client.force_authenticate(user=self.admin)
+
+    def export(self, **params):
+        res = self.api_client.get(self.url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return b"".join(res.streaming_content).decode()
+
+    def test_csv_export_streams_all_rows(self):
+        with self.assertNumQueries(1):
+            rows = list(csv.reader(self.export().splitlines()))
+
+        self.assertEqual(rows[0][:3], ["id", "user_id", "user__email"])
+        self.assertEqual(
+            [int(row[0]) for row in rows[1:]],
+            [borrowing.pk for borrowing in self.borrowings]
+        )
+        self.assertEqual(rows[2][-1], "")
+
+    def test_ndjson_export_applies_filters(self):
+        since = timezone.now().date() - timedelta(days=25)
+
+        lines = self.export(
+            export_format="ndjson",
+            is_active="true",
+            user_id=self.user.pk,
+            date_from=since.isoformat(),
+        ).splitlines()
+
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [record["id"] for record in records],
+            [borrowing.pk for borrowing in self.borrowings[1:]]
+        )
+        self.assertEqual(records[0]["book__title"], "Test Book")
+        self.assertIsNone(records[0]["actual_return_date"])
+
+    def test_invalid_date_is_rejected(self):
+        res = self.api_client.get(self.url, {"date_to": "yesterday"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_requires_admin(self):
+        self.api_client.force_authenticate(user=self.user)
+
+        res = self.api_client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_malformed_user_id_is_rejected(self):
+        res = self.api_client.get(self.url, {"user_id": "abc"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("user_id", res.data)
@@ -1,14 +1,30 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path
 
-from borrowings.views import BorrowingViewSet
+from borrowings.views import BorrowingViewSet, HoldViewSet
 
 router = DefaultRouter()
 router.register("borrowings", BorrowingViewSet)
+router.register("holds", HoldViewSet)
 
 app_name = "borrowings"
 
 urlpatterns = [
+    path(
+        "async/borrowings/",
+        BorrowingViewSet.as_async_view("list"),
+        name="borrowing-list-async",
+    ),
+    path(
+        "async/borrowings/<int:pk>/",
+        BorrowingViewSet.as_async_view("retrieve"),
+        name="borrowing-detail-async",
+    ),
+    path(
+        "holds/<int:pk>/watch/",
+        HoldViewSet.as_async_view("watch"),
+        name="hold-watch",
+    ),
     path(
         "borrowings/<int:pk>/return/",
         BorrowingViewSet.as_view({"post": "return_book"}),
@@ -1,31 +1,71 @@
+import asyncio
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
 from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
-from rest_framework import viewsets, permissions, status
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
-from borrowings.models import Borrowing
+from borrowings.bulk import borrow_many, return_many
+from borrowings.models import Borrowing, Hold, hold_waiters, release_holds
 from borrowings.serializers import (
     BorrowingSerializer,
     BorrowingListSerializer,
-    BorrowingDetailSerializer
+    BorrowingDetailSerializer,
+    BorrowingBulkCreateSerializer,
+    BorrowingBulkReturnSerializer,
+    HoldSerializer,
+    HoldWatchQuerySerializer,
+)
+from borrowings.notifications import enqueue_telegram_message
+from library_service.async_views import AsyncReadMixin
+from library_service.export import (
+    ExportQuerySerializer,
+    export_response,
+    filter_date_range,
 )
-from borrowings.telegram_helper import send_telegram_message
+from library_service.pagination import (
+    BorrowingCursorPagination,
+    LibraryCursorPagination,
+)
+from library_service.renderers import ListRendererMixin
+from library_service.serializers import values_rows
+from payments.checkout import enqueue_checkout, return_idempotency_key
 from payments.models import Payment
-from payments.stripe_helper import create_stripe_session
+from payments.serializers import PaymentSerializer
+
+EXPORT_COLUMNS = (
+    "id",
+    "user_id",
+    "user__email",
+    "book_id",
+    "book__title",
+    "borrow_date",
+    "expected_return_date",
+    "actual_return_date",
+)
 
 
-class BorrowingViewSet(viewsets.ModelViewSet):
+class BorrowingViewSet(
+    AsyncReadMixin, ListRendererMixin, viewsets.ModelViewSet
+):
     queryset = Borrowing.objects.all()
     serializer_class = BorrowingSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = BorrowingCursorPagination
 
     @extend_schema(
         summary="Create new borrowing",
         description="Creates a new borrowing record for the currently"
-                    " authorized user and sends a message to Telegram.",
+                    " authorized user and queues a message to Telegram.",
         responses={201: BorrowingSerializer}
     )
+    @transaction.atomic
     def perform_create(self, serializer):
         borrowing = serializer.save(user=self.request.user)
 
@@ -37,13 +77,16 @@ class BorrowingViewSet(viewsets.ModelViewSet):
             f"<b>Expected return date:</b> {borrowing.expected_return_date}\n"
         )
 
-        send_telegram_message(message)
+        enqueue_telegram_message(message)
 
     def get_queryset(self):
         queryset = self.queryset
 
+        if self.action == "retrieve":
+            queryset = queryset.select_related("book")
+
         if not self.request.user.is_superuser:
-            queryset.filter(user=self.request.user)
+            queryset = queryset.filter(user=self.request.user)
 
         is_active = self.request.query_params.get("is_active", None)
         user_id = self.request.query_params.get("user_id", None)
@@ -52,11 +95,18 @@ class BorrowingViewSet(viewsets.ModelViewSet):
             if is_active.lower() == "true":
                 queryset = queryset.filter(actual_return_date__isnull=True)
             elif is_active.lower() == "false":
-                queryset = queryset.filter(actual_return_date__isnull=True)
+                queryset = queryset.filter(actual_return_date__isnull=False)
 
         if self.request.user.is_superuser and user_id:
+            if not user_id.isdigit():
+                raise ValidationError(
+                    {"user_id": "A valid integer is required."}
+                )
             queryset = queryset.filter(user_id=user_id)
 
+        if self.action == "list":
+            queryset = values_rows(queryset, BorrowingListSerializer)
+
         return queryset
 
     def get_serializer_class(self):
@@ -64,19 +114,27 @@ class BorrowingViewSet(viewsets.ModelViewSet):
             return BorrowingListSerializer
         if self.action == "retrieve":
             return BorrowingDetailSerializer
+        if self.action == "bulk_create":
+            return BorrowingBulkCreateSerializer
+        if self.action == "bulk_return":
+            return BorrowingBulkReturnSerializer
         return BorrowingSerializer
 
     @extend_schema(
         summary="Return book",
-        description="Marks the book as returned. If returned late, a penalty"
-                    " payment is generated through Stripe.",
+        description="Marks the book as returned and queues a Stripe checkout"
+                    " session for the payment, including any penalty for a"
+                    " late return. The pending payment is returned at once;"
+                    " poll it until its `session_url` is filled in. A"
+                    " retried return answers with the same payment.",
         responses={
-            200: OpenApiResponse(
-                response=BorrowingSerializer,
-                description="Info about borrowing"
+            202: OpenApiResponse(
+                response=PaymentSerializer,
+                description="Pending payment for the borrowing"
             ),
             400: OpenApiResponse(
-                description="Book already returned or doesn't exist"
+                description="Book already returned without a payment"
+                            " of its own, or doesn't exist"
             )
         },
     )
@@ -85,18 +143,20 @@ class BorrowingViewSet(viewsets.ModelViewSet):
         try:
             borrowing = self.get_object()
             if borrowing.actual_return_date is not None:
-                return Response(
-                    {"detail": "This book has already been returned."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+                # A retried return answers with the payment it created.
+                payment = Payment.objects.filter(
+                    idempotency_key=return_idempotency_key([borrowing])
+                ).first()
+                if payment is None:
+                    return Response(
+                        {"detail": "This book has already been returned."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                return self.payment_accepted(payment)
 
             actual_return_date = timezone.now().date()
             borrowing.actual_return_date = actual_return_date
 
-            session_url, session_id = create_stripe_session(borrowing, request)
-
-            borrowing.save()
-
             message = (
                 f"<b>Book has been returned</b>\n"
                 f"<b>Book:</b> {borrowing.book.title}\n"
@@ -104,17 +164,28 @@ class BorrowingViewSet(viewsets.ModelViewSet):
                 f"<b>Return Date:</b> {borrowing.actual_return_date}\n"
             )
 
-            send_telegram_message(message)
+            with transaction.atomic():
+                borrowing.save()
+                payment = enqueue_checkout([borrowing], request)
+                enqueue_telegram_message(message)
 
-            return Response(
-                {"session_url": session_url},
-                status=status.HTTP_200_OK
-            )
+            return self.payment_accepted(payment)
         except Borrowing.DoesNotExist:
             return Response(
                 {"detail": "This book does not exist."},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+    @staticmethod
+    def payment_accepted(payment):
+        return Response(
+            PaymentSerializer(payment).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": reverse(
+                "payments:payment-detail", kwargs={"pk": payment.pk}
+            )},
+        )
+
     @extend_schema(
         summary="Get list of borrowings",
         description="Returns a list of borrowings. For ordinary users - only"
@@ -132,8 +203,162 @@ class BorrowingViewSet(viewsets.ModelViewSet):
             ),
             OpenApiParameter("user_id", int, description=(
                     "Filter by user ID (superusers only)"
-            ))
+            )),
+            OpenApiParameter("page_size", int, description=(
+                    "Number of borrowings per page (capped by the server)"
+            )),
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
\ No newline at end of file
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        summary="Borrow several books",
+        description="Creates borrowings for the currently authorized user in"
+                    " one transaction. Every item is validated up front and"
+                    " reported separately; one Telegram summary is queued.",
+        responses={200: OpenApiResponse(
+            description="Per-item results, in request order"
+        )},
+    )
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = borrow_many(
+            request.user, serializer.validated_data["items"]
+        )
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        summary="Return several books",
+        description="Marks several borrowings as returned in one transaction"
+                    " and queues one Stripe payment session per user.",
+        responses={200: OpenApiResponse(
+            description="Per-item results and the pending payments"
+        )},
+    )
+    @action(detail=False, methods=["post"], url_path="bulk-return")
+    def bulk_return(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results, payments = return_many(
+            self.get_queryset(), serializer.validated_data["ids"], request
+        )
+
+        return Response(
+            {"results": results, "payments": payments},
+            status=status.HTTP_200_OK
+        )
+
+    @extend_schema(
+        summary="Export borrowings",
+        description="Streams borrowings as CSV or NDJSON (admins only)."
+                    " Accepts the `is_active` and `user_id` filters of the"
+                    " list endpoint plus a range of borrow dates.",
+        parameters=[
+            OpenApiParameter("export_format", str, enum=["csv", "ndjson"]),
+            OpenApiParameter("is_active", bool),
+            OpenApiParameter("user_id", int),
+            OpenApiParameter("date_from", OpenApiTypes.DATE, description=(
+                    "Earliest borrow date"
+            )),
+            OpenApiParameter("date_to", OpenApiTypes.DATE, description=(
+                    "Latest borrow date"
+            )),
+        ],
+        responses={200: OpenApiResponse(description="Exported borrowings")},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def export(self, request):
+        params = ExportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        queryset = filter_date_range(
+            self.get_queryset().order_by("id"),
+            "borrow_date",
+            params.validated_data,
+        )
+        return export_response(
+            queryset,
+            EXPORT_COLUMNS,
+            params.validated_data["export_format"],
+            "borrowings",
+        )
+
+
+class HoldViewSet(
+    AsyncReadMixin,
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    queryset = Hold.objects.all()
+    serializer_class = HoldSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = LibraryCursorPagination
+
+    def get_queryset(self):
+        queryset = self.queryset
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(user=self.request.user)
+        return queryset
+
+    @extend_schema(
+        summary="Place a hold",
+        description="Queues the current user for a book with no copy on "
+                    "the shelf. When a copy comes back it is reserved for "
+                    "the next hold in line, by priority and then age, until "
+                    "`reserved_until`. Long-poll "
+                    "`/borrowings/holds/{id}/watch/` to learn when that "
+                    "happens.",
+    )
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @extend_schema(
+        summary="Cancel a hold",
+        description="Leaves the queue, or gives up a reserved copy, which "
+                    "goes to the next hold in line.",
+    )
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        hold = Hold.objects.select_for_update().get(pk=instance.pk)
+        if hold.status not in Hold.ACTIVE_STATUSES:
+            raise ValidationError("This hold has already ended.")
+        release_holds([hold], Hold.StatusChoices.CANCELLED)
+
+    async def awatch(self, request, *args, **kwargs):
+        # Served by as_async_view("watch") so that waiting clients hold
+        # no worker thread.
+        params = HoldWatchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        hold = await self.aget_object()
+        known = params.validated_data.get("status", hold.status)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + params.validated_data["timeout"]
+        while hold.status == known:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await hold_waiters.wait(
+                hold.pk, min(remaining, settings.HOLD_LONG_POLL_INTERVAL)
+            )
+            hold = await self.aget_object()
+        return Response(self.get_serializer(hold).data)
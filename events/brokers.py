@@ -0,0 +1,145 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Returned by Subscription.get() after messages were dropped.
+LAGGED = object()
+
+
+class Subscription:
+    """A bounded queue of the messages published to one channel.
+
+    When the consumer falls ``maxsize`` messages behind, the queue is
+    emptied and the subscription reports LAGGED once, so that the
+    consumer catches up from the event table instead of making the
+    publisher wait or buffer without limit.
+    """
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.lagged = False
+
+    def put(self, message):
+        # Runs on the subscriber's event loop.
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.lagged = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+    async def get(self, timeout):
+        """Return the next message, LAGGED, or None after ``timeout``."""
+        if self.lagged and self.queue.empty():
+            self.lagged = False
+            return LAGGED
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process pub/sub: publishers reach subscribers of this process.
+
+    ``shared`` is False, so streams also poll the event table now and
+    then to pick up events published by other processes.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+
+    def subscribe(self, channel):
+        subscription = Subscription(
+            self, channel, settings.EVENTS_QUEUE_SIZE
+        )
+        with self.lock:
+            self.subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.channel, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self.subscribers.pop(subscription.channel, None)
+
+    def publish(self, channel, message):
+        """Deliver ``message``; safe to call from any thread."""
+        self.deliver(channel, message)
+
+    def deliver(self, channel, message):
+        with self.lock:
+            subscribers = list(self.subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(
+                subscription.put, message
+            )
+
+
+class RedisBroker(LocalBroker):
+    """Relays messages through Redis pub/sub to every process."""
+
+    shared = True
+    prefix = "library-events:"
+
+    def __init__(self, url):
+        if redis is None:
+            raise ImproperlyConfigured(
+                "EVENTS_BROKER = 'redis' requires the redis package."
+            )
+        super().__init__()
+        self.client = redis.Redis.from_url(url)
+        self.listener = None
+
+    def subscribe(self, channel):
+        with self.lock:
+            if self.listener is None:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(**{f"{self.prefix}*": self.on_message})
+                self.listener = pubsub.run_in_thread(
+                    sleep_time=1, daemon=True
+                )
+        return super().subscribe(channel)
+
+    def publish(self, channel, message):
+        self.client.publish(
+            self.prefix + channel, json.dumps(message, cls=DjangoJSONEncoder)
+        )
+
+    def on_message(self, item):
+        channel = item["channel"].decode()[len(self.prefix):]
+        self.deliver(channel, json.loads(item["data"]))
+
+
+@cache
+def get_broker():
+    if settings.EVENTS_BROKER == "local":
+        return LocalBroker()
+    if settings.EVENTS_BROKER == "redis":
+        return RedisBroker(settings.EVENTS_BROKER_URL)
+    raise ImproperlyConfigured(
+        f"Unknown EVENTS_BROKER {settings.EVENTS_BROKER!r}."
+    )
@@ -0,0 +1,175 @@
+import json
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from events.brokers import LAGGED, get_broker
+from events.models import Event
+
+
+def channel_for(user_id):
+    return f"user:{user_id}"
+
+
+def publish(events):
+    """Store ``events`` and push them to their users' streams.
+
+    Call it inside the transaction making the change: the events are
+    stored with it and pushed once it commits.
+    """
+    events = [event for event in events if event.user_id is not None]
+    if not events:
+        return
+    Event.objects.bulk_create(events)
+    broker = get_broker()
+    transaction.on_commit(lambda: [
+        broker.publish(channel_for(event.user_id), event.as_message())
+        for event in events
+    ])
+
+
+def borrowing_event(kind, borrowing):
+    return Event(
+        user_id=borrowing.user_id,
+        type=f"borrowing.{kind}",
+        data={
+            "id": borrowing.pk,
+            "book": borrowing.book_id,
+            "expected_return_date": borrowing.expected_return_date,
+            "actual_return_date": borrowing.actual_return_date,
+        },
+    )
+
+
+def payment_event(kind, payment_id, user_id, **data):
+    return Event(
+        user_id=user_id,
+        type=f"payment.{kind}",
+        data={"id": payment_id, **data},
+    )
+
+
+def format_message(message):
+    data = json.dumps(message["data"], cls=DjangoJSONEncoder)
+    return f"id: {message['id']}\nevent: {message['type']}\ndata: {data}\n\n"
+
+
+async def replay(user_id, after, since=None):
+    """Yield the user's stored events with ids above ``after``.
+
+    With ``since``, events created from then on are included whatever
+    their id.
+    """
+    events = Event.objects.filter(user_id=user_id)
+    if since is None:
+        events = events.filter(id__gt=after)
+        after = 0
+    else:
+        events = events.filter(Q(id__gt=after) | Q(created_at__gte=since))
+        after = -1
+    while True:
+        batch = [
+            event async for event in events.filter(
+                id__gt=after
+            ).order_by("id")[:settings.EVENTS_REPLAY_BATCH]
+        ]
+        for event in batch:
+            yield event.as_message()
+        if len(batch) < settings.EVENTS_REPLAY_BATCH:
+            return
+        after = batch[-1].id
+
+
+class Delivered:
+    """Ids of the events a stream sent within the last ``window`` seconds.
+
+    Event ids are assigned before commit, so transactions of one user
+    that commit out of order publish a lower id after a higher one. The
+    stream therefore delivers any id it has not sent yet, and catches up
+    over the recent window as well as above its highest id.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.sent = OrderedDict()
+        self.highest = 0
+
+    def __contains__(self, event_id):
+        return event_id in self.sent
+
+    def add(self, event_id):
+        self.sent[event_id] = time.monotonic()
+        self.highest = max(self.highest, event_id)
+        # Kept twice as long as the window, so that every id replay can
+        # return again is still known.
+        expired = time.monotonic() - 2 * self.window
+        while self.sent and next(iter(self.sent.values())) < expired:
+            self.sent.popitem(last=False)
+
+    def since(self):
+        return timezone.now() - timedelta(seconds=self.window)
+
+
+async def event_stream(user_id, last_event_id=None):
+    """Yield the user's events as server-sent event chunks, forever.
+
+    With ``last_event_id`` the stream first replays the stored events
+    that came after it. Otherwise it starts with the next event. A
+    comment line goes out after EVENTS_HEARTBEAT idle seconds so that
+    proxies keep the connection open.
+    """
+    broker = get_broker()
+    delivered = Delivered(settings.EVENTS_REORDER_WINDOW)
+    # Subscribed before reading the table, so nothing falls in between.
+    subscription = broker.subscribe(channel_for(user_id))
+    try:
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n\n"
+        # Recent events already committed count as delivered: they came
+        # before the stream, or before the client's last event.
+        known = Event.objects.filter(
+            user_id=user_id, created_at__gte=delivered.since()
+        )
+        if last_event_id is not None:
+            known = known.filter(id__lte=last_event_id)
+        async for event_id in known.values_list("id", flat=True):
+            delivered.add(event_id)
+        if last_event_id is None:
+            latest = await Event.objects.filter(
+                user_id=user_id
+            ).order_by("-id").values_list("id", flat=True).afirst()
+            delivered.highest = max(delivered.highest, latest or 0)
+        else:
+            delivered.highest = max(delivered.highest, last_event_id)
+            async for message in replay(user_id, last_event_id):
+                yield format_message(message)
+                delivered.add(message["id"])
+
+        while True:
+            message = await subscription.get(settings.EVENTS_HEARTBEAT)
+            if message is not None and message is not LAGGED:
+                if message["id"] not in delivered:
+                    yield format_message(message)
+                    delivered.add(message["id"])
+                continue
+
+            idle = True
+            if message is LAGGED or not broker.shared:
+                # Dropped messages, or events published by processes
+                # this broker does not hear from.
+                async for missed in replay(
+                    user_id, delivered.highest, delivered.since()
+                ):
+                    if missed["id"] not in delivered:
+                        yield format_message(missed)
+                        delivered.add(missed["id"])
+                        idle = False
+            if idle:
+                yield ": heartbeat\n\n"
+    finally:
+        subscription.close()
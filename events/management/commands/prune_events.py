@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stream events older than the retention period; streams "
+        "cannot resume from before it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            default=settings.EVENTS_RETENTION_HOURS,
+            help="Age in hours of the oldest event to keep.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        deleted, _ = Event.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(f"Deleted {deleted} events.")
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class Event(models.Model):
+    """A state change pushed to its user's event stream.
+
+    Rows are kept for a while so that a reconnecting stream can replay
+    what it missed from its ``Last-Event-ID``.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="events",
+        # Covered by the leading column of event_user_idx.
+        db_index=False,
+    )
+    type = models.CharField(max_length=50)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "id"], name="event_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.type} #{self.pk} for user {self.user_id}"
+
+    def as_message(self):
+        return {"id": self.pk, "type": self.type, "data": self.data}
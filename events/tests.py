@@ -0,0 +1,205 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from borrowings.models import Borrowing
+from events.brokers import LAGGED, LocalBroker, get_broker
+from events.feed import channel_for
+from events.models import Event
+
+STREAM_URL = reverse("events:stream")
+
+
+def sample_book():
+    return Book.objects.create(
+        title="Book", author="Author", cover="HARD",
+        inventory=3, daily_fee=Decimal("1.00"),
+    )
+
+
+class EventPublishingTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="reader@mail.com", password="<PASSWORD>"
+        )
+        self.book = sample_book()
+
+    def test_borrow_and_return_are_recorded_and_pushed(self):
+        with patch("events.feed.get_broker") as get_broker_mock, \
+                self.captureOnCommitCallbacks(execute=True):
+            borrowing = Borrowing.objects.create(
+                user=self.user,
+                book=self.book,
+                expected_return_date=timezone.now().date()
+                + timedelta(days=2),
+            )
+            borrowing.actual_return_date = timezone.now().date()
+            borrowing.save()
+
+        events = list(Event.objects.order_by("id"))
+        self.assertEqual(
+            [event.type for event in events],
+            ["borrowing.created", "borrowing.returned"],
+        )
+        self.assertEqual(events[1].data["id"], borrowing.id)
+        publish = get_broker_mock.return_value.publish
+        self.assertEqual(publish.call_count, 2)
+        channel, message = publish.call_args.args
+        self.assertEqual(channel, channel_for(self.user.id))
+        self.assertEqual(message["id"], events[1].id)
+        self.assertEqual(message["type"], "borrowing.returned")
+
+
+class SubscriptionTest(TestCase):
+    @override_settings(EVENTS_QUEUE_SIZE=2)
+    async def test_slow_subscriber_is_told_it_lagged(self):
+        broker = LocalBroker()
+        subscription = broker.subscribe("user:1")
+        for index in range(3):
+            subscription.put({"id": index})
+
+        self.assertIs(await subscription.get(1), LAGGED)
+        self.assertIsNone(await subscription.get(0.01))
+
+        subscription.put({"id": 3})
+        self.assertEqual(await subscription.get(1), {"id": 3})
+        subscription.close()
+        self.assertEqual(broker.subscribers, {})
+
+
+class EventStreamTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="reader@mail.com", password="<PASSWORD>"
+        )
+        self.events = [
+            Event.objects.create(
+                user=self.user, type="payment.created", data={"id": pk}
+            )
+            for pk in (1, 2)
+        ]
+        self.headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(self.user)}"
+        }
+
+    async def open_stream(self, **headers):
+        res = await self.async_client.get(
+            STREAM_URL, headers={**self.headers, **headers}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        chunks = aiter(res.streaming_content)
+        self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+        return chunks
+
+    async def test_requires_authentication(self):
+        res = await self.async_client.get(STREAM_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": {
+            **settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"],
+            "user_read": "1/min",
+        },
+    })
+    async def test_reconnects_are_throttled(self):
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+        await self.open_stream()
+
+        res = await self.async_client.get(STREAM_URL, headers=self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res["Retry-After"], "60")
+
+    async def test_resumes_after_last_event_id(self):
+        chunks = await self.open_stream(
+            **{"Last-Event-ID": str(self.events[0].id)}
+        )
+
+        self.assertEqual(
+            await anext(chunks),
+            f"id: {self.events[1].id}\nevent: payment.created\n"
+            f'data: {{"id": 2}}\n\n'.encode(),
+        )
+
+    async def test_pushes_published_events(self):
+        chunks = await self.open_stream()
+
+        get_broker().publish(channel_for(self.user.id), {
+            "id": self.events[1].id + 1,
+            "type": "payment.paid",
+            "data": {"id": 2, "status": "PAID"},
+        })
+
+        self.assertEqual(
+            await anext(chunks),
+            f"id: {self.events[1].id + 1}\nevent: payment.paid\n"
+            f'data: {{"id": 2, "status": "PAID"}}\n\n'.encode(),
+        )
+
+    @override_settings(EVENTS_HEARTBEAT=0.01)
+    async def test_sends_heartbeats_when_idle(self):
+        chunks = await self.open_stream()
+
+        self.assertEqual(await anext(chunks), b": heartbeat\n\n")
+
+    @override_settings(EVENTS_HEARTBEAT=0.01)
+    async def test_local_broker_catches_up_from_the_table(self):
+        chunks = await self.open_stream()
+        await anext(chunks)
+
+        event = await Event.objects.acreate(
+            user=self.user, type="payment.paid", data={"id": 3}
+        )
+
+        self.assertEqual(
+            await anext(chunks),
+            f"id: {event.id}\nevent: payment.paid\n"
+            f'data: {{"id": 3}}\n\n'.encode(),
+        )
+
+    async def test_lower_id_committed_later_is_pushed(self):
+        chunks = await self.open_stream()
+        channel = channel_for(self.user.id)
+
+        for event_id in (10, 5):
+            get_broker().publish(channel, {
+                "id": event_id, "type": "payment.paid", "data": {},
+            })
+
+        self.assertEqual(
+            [await anext(chunks) for _ in range(2)],
+            [
+                b"id: 10\nevent: payment.paid\ndata: {}\n\n",
+                b"id: 5\nevent: payment.paid\ndata: {}\n\n",
+            ],
+        )
+
+    @override_settings(EVENTS_HEARTBEAT=0.01)
+    async def test_catch_up_replays_recent_events_below_the_highest(self):
+        chunks = await self.open_stream()
+        await anext(chunks)
+
+        await Event.objects.acreate(
+            id=20, user=self.user, type="payment.paid", data={"id": 20}
+        )
+        self.assertTrue((await anext(chunks)).startswith(b"id: 20\n"))
+        # Its transaction took id 15 first but committed after id 20.
+        await Event.objects.acreate(
+            id=15, user=self.user, type="payment.paid", data={"id": 15}
+        )
+
+        self.assertTrue((await anext(chunks)).startswith(b"id: 15\n"))
+        self.assertEqual(await anext(chunks), b": heartbeat\n\n")
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from events.views import stream
+
+app_name = "events"
+
+urlpatterns = [
+    path("stream/", stream, name="stream"),
+]
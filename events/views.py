@@ -0,0 +1,84 @@
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+
+from events.feed import event_stream
+
+
+async def authenticate(request):
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        user_auth = await authentication_class().aauthenticate(request)
+        if user_auth is not None:
+            return user_auth[0]
+    return None
+
+
+def throttle_wait(request):
+    """Seconds until the throttles admit ``request``, or None if they do."""
+    durations = [
+        throttle.wait()
+        for throttle in (
+            throttle_class()
+            for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES
+        )
+        if not throttle.allow_request(request, None)
+    ]
+    if not durations:
+        return None
+    return max(duration or 0 for duration in durations)
+
+
+def last_event_id(request):
+    value = request.headers.get(
+        "Last-Event-ID", request.GET.get("last_event_id", "")
+    )
+    return int(value) if value.isdigit() else None
+
+
+async def stream(request):
+    """Server-sent events of the user's borrowings and payments.
+
+    Each event is ``borrowing.created``, ``borrowing.returned``,
+    ``payment.created``, ``payment.session_ready`` or ``payment.paid``
+    with the object's id and new state as JSON data. Reconnecting
+    clients resume after their ``Last-Event-ID`` header (or
+    ``last_event_id`` parameter). Serve it over ASGI: a WSGI worker
+    would be held for the whole connection.
+    """
+    if request.method != "GET":
+        return JsonResponse(
+            {"detail": f'Method "{request.method}" not allowed.'},
+            status=status.HTTP_405_METHOD_NOT_ALLOWED,
+        )
+    try:
+        user = await authenticate(request)
+    except AuthenticationFailed as exc:
+        return JsonResponse(
+            {"detail": exc.detail}, status=status.HTTP_401_UNAUTHORIZED
+        )
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+    # The throttles read the user from the request, as from DRF's.
+    request.user = user
+    wait = throttle_wait(request)
+    if wait is not None:
+        response = JsonResponse(
+            {"detail": "Request was throttled."},
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+        response["Retry-After"] = str(wait)
+        return response
+
+    response = StreamingHttpResponse(
+        event_stream(user.pk, last_event_id(request)),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # Keeps nginx from buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
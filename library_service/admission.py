@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from collections import deque
+from functools import partial
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class ConcurrencyLimiter:
+    """Admits ``limit`` holders at once and queues ``queue_size`` more.
+
+    A released slot passes straight to the longest waiting caller,
+    whether it waits in a thread (``acquire``) or on an event loop
+    (``aacquire``), so queued requests are served in arrival order and
+    newcomers cannot overtake them.
+    """
+
+    def __init__(self, limit, queue_size):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.active = 0
+        self.queue = deque()
+
+    def enqueue(self, grant):
+        """Take a free slot (True), queue ``grant`` (None) or refuse."""
+        with self.lock:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if len(self.queue) >= self.queue_size:
+                return False
+            self.queue.append(grant)
+            return None
+
+    def withdraw(self, grant):
+        """Leave the queue; False if a slot was granted in the meantime."""
+        with self.lock:
+            try:
+                self.queue.remove(grant)
+            except ValueError:
+                return False
+            return True
+
+    def acquire(self, timeout):
+        """Return True once a slot is held, False if refused in time."""
+        event = threading.Event()
+        admitted = self.enqueue(event.set)
+        if admitted is not None:
+            return admitted
+        if event.wait(timeout):
+            return True
+        return not self.withdraw(event.set)
+
+    async def aacquire(self, timeout):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        grant = partial(loop.call_soon_threadsafe, _resolve, future)
+        admitted = self.enqueue(grant)
+        if admitted is not None:
+            return admitted
+        try:
+            await asyncio.wait_for(future, timeout)
+        except TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            if not self.withdraw(grant):
+                self.release()
+            raise
+        return not self.withdraw(grant)
+
+    def release(self):
+        with self.lock:
+            if not self.queue:
+                self.active -= 1
+                return
+            grant = self.queue.popleft()
+        grant()
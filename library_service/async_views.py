@@ -0,0 +1,114 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+
+class AsyncReadMixin:
+    async_renderer_classes = (JSONRenderer,)
+
+    @classmethod
+    def as_async_view(cls, action):
+        """Async-native ``list`` or ``retrieve`` for ASGI deployments.
+
+        Returns a plain Django async view running the viewset's
+        authentication, permissions, throttles, queryset, pagination and
+        serializers, with every query going through the async ORM, so a
+        slow client does not hold a worker thread. Authentication classes
+        must provide ``aauthenticate`` and the paginator
+        ``apaginate_queryset``.
+        """
+        async def view(request, *args, **kwargs):
+            self = cls(
+                action=action,
+                args=args,
+                kwargs=kwargs,
+                format_kwarg=None,
+                renderer_classes=cls.async_renderer_classes,
+                http_method_names=["get", "head"],
+            )
+            handler = getattr(self, f"a{action}")
+            self.get = self.head = handler
+            self.request = request = Request(
+                request,
+                authenticators=self.get_authenticators(),
+                negotiator=self.get_content_negotiator(),
+            )
+            self.headers = self.default_response_headers
+            try:
+                request.accepted_renderer, request.accepted_media_type = (
+                    self.perform_content_negotiation(request)
+                )
+                await self.aperform_authentication(request)
+                self.check_permissions(request)
+                self.check_throttles(request)
+                if request.method.lower() not in self.http_method_names:
+                    self.http_method_not_allowed(request)
+                response = await handler(request, *args, **kwargs)
+            except Exception as exc:
+                response = self.handle_exception(exc)
+            return self.render_async_response(request, response)
+
+        view.__name__ = f"{cls.__name__}_{action}_async"
+        view.csrf_exempt = True
+        return view
+
+    async def aperform_authentication(self, request):
+        # Mirrors Request._authenticate, which DRF would otherwise run
+        # synchronously on first access to request.user.
+        request._authenticator = None
+        try:
+            for authenticator in request.authenticators:
+                user_auth = await authenticator.aauthenticate(request)
+                if user_auth is not None:
+                    request._authenticator = authenticator
+                    request.user, request.auth = user_auth
+                    return
+        except APIException:
+            request.user, request.auth = AnonymousUser(), None
+            raise
+        request.user, request.auth = AnonymousUser(), None
+
+    def render_async_response(self, request, response):
+        # A rendered HttpResponse, as Django would otherwise render a DRF
+        # Response on a worker thread.
+        response = self.finalize_response(request, response)
+        rendered = HttpResponse(
+            response.rendered_content,
+            status=response.status_code,
+            content_type=response["Content-Type"],
+        )
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.paginator.apaginate_queryset(
+            queryset, request, view=self
+        )
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(
+            [instance async for instance in queryset], many=True
+        )
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(self.get_serializer(instance).data)
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (queryset.model.DoesNotExist, TypeError, ValueError):
+            raise Http404
+        self.check_object_permissions(self.request, instance)
+        return instance
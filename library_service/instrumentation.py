@@ -0,0 +1,134 @@
+import ipaddress
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+current_recorder = ContextVar("current_recorder", default=None)
+
+
+class QueryRecorder:
+    """Database execute wrapper collecting statistics for one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_sql = None
+        self.slowest_duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            self.statements[sql] += 1
+            if duration >= self.slowest_duration:
+                self.slowest_duration = duration
+                self.slowest_sql = sql
+
+    def duplicates(self, threshold):
+        """SQL run ``threshold`` or more times with different parameters."""
+        return {
+            sql: count
+            for sql, count in self.statements.items()
+            if count >= threshold
+        }
+
+
+def record_queries(execute, sql, params, many, context):
+    """Execute wrapper reporting to the current request's recorder.
+
+    The recorder is looked up in a context variable, which follows an
+    async request into the threads its queries run on.
+    """
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder():
+    """Route the queries of this thread's connections to ``record_queries``."""
+    for connection in connections.all():
+        if record_queries not in connection.execute_wrappers:
+            connection.execute_wrappers.append(record_queries)
+
+
+class MetricsRegistry:
+    """Process-wide per-view counters rendered in Prometheus text format."""
+
+    counters = (
+        ("requests_total", "Requests handled"),
+        ("db_queries_total", "SQL queries executed"),
+        ("db_seconds_total", "Time spent in SQL queries"),
+        ("duplicate_query_requests_total", "Requests with repeated queries"),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(lambda: defaultdict(float))
+
+    def observe(self, labels, recorder, has_duplicates):
+        with self._lock:
+            values = self._values[labels]
+            values["requests_total"] += 1
+            values["db_queries_total"] += recorder.count
+            values["db_seconds_total"] += recorder.duration
+            values["duplicate_query_requests_total"] += bool(has_duplicates)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        with self._lock:
+            snapshot = {
+                labels: dict(values) for labels, values in self._values.items()
+            }
+        lines = []
+        for name, description in self.counters:
+            metric = f"library_{name}"
+            lines.append(f"# HELP {metric} {description}.")
+            lines.append(f"# TYPE {metric} counter")
+            for (view, action), values in sorted(snapshot.items()):
+                lines.append(
+                    f'{metric}{{view="{view}",action="{action}"}} '
+                    f"{values.get(name, 0):g}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def metrics_allowed(request):
+    """Staff sessions and clients in METRICS_ALLOWED_NETWORKS only."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_staff:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network)
+        for network in settings.METRICS_ALLOWED_NETWORKS
+    )
+
+
+def metrics_view(request):
+    if not settings.QUERY_INSTRUMENTATION:
+        return HttpResponse(status=404)
+    if not metrics_allowed(request):
+        return HttpResponse(status=403)
+    return HttpResponse(
+        metrics.render(), content_type="text/plain; version=0.0.4"
+    )
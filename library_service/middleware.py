@@ -0,0 +1,174 @@
+import json
+import logging
+import re
+import time
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from rest_framework import status
+
+from library_service.admission import ConcurrencyLimiter
+from library_service.instrumentation import (
+    QueryRecorder,
+    current_recorder,
+    install_query_recorder,
+    metrics,
+)
+
+logger = logging.getLogger("library_service.queries")
+
+
+class QueryInstrumentationMiddleware:
+    """Count and time SQL queries per view action.
+
+    Adds a ``Server-Timing`` header, logs one JSON line per request and
+    feeds the metrics endpoint. Works in both WSGI and ASGI handlers;
+    async views record the queries they run through the async ORM.
+    Removed from the middleware chain entirely unless
+    ``QUERY_INSTRUMENTATION`` is enabled.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.duplicate_threshold = settings.QUERY_DUPLICATE_THRESHOLD
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        install_query_recorder()
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.report(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        # Async ORM queries run on the request's thread-sensitive worker
+        # thread, whose connections need the wrapper.
+        await sync_to_async(install_query_recorder)()
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.report(request, response, recorder, started)
+
+    def report(self, request, response, recorder, started):
+        total = time.perf_counter() - started
+        view, action = self.view_labels(request)
+        duplicates = recorder.duplicates(self.duplicate_threshold)
+        metrics.observe((view, action), recorder, duplicates)
+
+        response["Server-Timing"] = ", ".join((
+            f'db;dur={recorder.duration * 1000:.2f};'
+            f'desc="{recorder.count} queries"',
+            f"app;dur={total * 1000:.2f}",
+        ))
+
+        log = logger.warning if duplicates else logger.info
+        log(json.dumps({
+            "view": view,
+            "action": action,
+            "method": request.method,
+            "status": response.status_code,
+            "queries": recorder.count,
+            "db_ms": round(recorder.duration * 1000, 3),
+            "total_ms": round(total * 1000, 3),
+            "slowest_ms": round(recorder.slowest_duration * 1000, 3),
+            "slowest_sql": recorder.slowest_sql,
+            "duplicates": duplicates,
+        }))
+        return response
+
+    @staticmethod
+    def view_labels(request):
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unresolved", request.method.lower()
+        actions = getattr(match.func, "actions", None) or {}
+        action = actions.get(request.method.lower(), request.method.lower())
+        return match.view_name, action
+
+
+class AdmissionControlMiddleware:
+    """Shed load once the process has too many requests in flight.
+
+    At most ``ADMISSION_MAX_CONCURRENCY`` requests run at once; up to
+    ``ADMISSION_QUEUE_SIZE`` more wait ``ADMISSION_QUEUE_TIMEOUT`` seconds
+    for a slot, and the rest are answered 503 with ``Retry-After`` right
+    away, before queueing turns into latency for everyone. Works in both
+    WSGI and ASGI handlers, so async views keep running on the event loop.
+    Paths matching ``ADMISSION_EXEMPT_PATHS`` (long polls, which mostly
+    wait) are never limited.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.ADMISSION_MAX_CONCURRENCY:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.limiter = ConcurrencyLimiter(
+            settings.ADMISSION_MAX_CONCURRENCY, settings.ADMISSION_QUEUE_SIZE
+        )
+        self.timeout = settings.ADMISSION_QUEUE_TIMEOUT
+        self.exempt_paths = [
+            re.compile(pattern) for pattern in settings.ADMISSION_EXEMPT_PATHS
+        ]
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.is_exempt(request):
+            return self.get_response(request)
+        if not self.limiter.acquire(self.timeout):
+            return self.overloaded()
+        try:
+            return self.get_response(request)
+        finally:
+            self.limiter.release()
+
+    async def __acall__(self, request):
+        if self.is_exempt(request):
+            return await self.get_response(request)
+        if not await self.limiter.aacquire(self.timeout):
+            return self.overloaded()
+        try:
+            return await self.get_response(request)
+        finally:
+            self.limiter.release()
+
+    def is_exempt(self, request):
+        return any(
+            pattern.match(request.path_info) for pattern in self.exempt_paths
+        )
+
+    @staticmethod
+    def overloaded():
+        response = JsonResponse(
+            {"detail": "Server is overloaded, try again later."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+        response["Retry-After"] = str(settings.ADMISSION_RETRY_AFTER)
+        return response
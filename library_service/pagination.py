@@ -0,0 +1,100 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class LibraryCursorPagination(CursorPagination):
+    """Keyset pagination with an opaque cursor and a capped page size.
+
+    ``paginate_queryset`` is split around its only query so that
+    ``apaginate_queryset`` can fetch the page with the async ORM.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+    ordering = "-id"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        window = self.page_window(queryset, request, view)
+        if window is None:
+            return None
+        return self.set_page(list(window))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        window = self.page_window(queryset, request, view)
+        if window is None:
+            return None
+        return self.set_page([item async for item in window])
+
+    def page_window(self, queryset, request, view=None):
+        """Return the queryset slice holding the page and one row more."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, position = 0, False, None
+        else:
+            offset, reverse, position = self.cursor
+        self.window = offset, reverse, position
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if position is not None:
+            order = self.ordering[0]
+            if self.cursor.reverse != order.startswith("-"):
+                lookup = "__lt"
+            else:
+                lookup = "__gt"
+            queryset = queryset.filter(
+                **{order.lstrip("-") + lookup: position}
+            )
+
+        return queryset[offset:offset + self.page_size + 1]
+
+    def set_page(self, results):
+        """Keep one page of the ``page_window`` rows and set the links."""
+        offset, reverse, position = self.window
+        self.page = results[:self.page_size]
+
+        has_following = len(results) > len(self.page)
+        following = None
+        if has_following:
+            following = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None or offset > 0
+            self.has_previous = has_following
+            self.next_position = position
+            self.previous_position = following
+        else:
+            self.has_next = has_following
+            self.has_previous = position is not None or offset > 0
+            self.next_position = following
+            self.previous_position = position
+
+        if (self.has_previous or self.has_next) \
+                and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class BookCursorPagination(LibraryCursorPagination):
+    ordering = "id"
+
+
+class BorrowingCursorPagination(LibraryCursorPagination):
+    # Borrowing ids grow together with borrow_date (auto_now_add), so the
+    # unique primary key gives the same order without ties on the date.
+    ordering = "-id"
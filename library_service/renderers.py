@@ -0,0 +1,63 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINE_SEPARATORS = (
+    (b"\xe2\x80\xa8", b"\\u2028"),
+    (b"\xe2\x80\xa9", b"\\u2029"),
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer output, encoded with orjson when it is installed.
+
+    The bytes match JSONRenderer's for compact, non-ASCII-escaped output
+    of anything but floats, which orjson formats differently (1e-05 comes
+    out as 0.00001), so use it only for responses without them. Indented
+    output, the other settings and values orjson rejects fall back to
+    JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii \
+                or not self.compact or self.get_indent(
+                    accepted_media_type, renderer_context or {}
+                ) is not None:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                # Dates and times go through DRF's encoder, which trims
+                # microseconds and writes UTC as "Z".
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+        return ret
+
+
+class ListRendererMixin:
+    def get_renderers(self):
+        """Render ``list`` actions with ORJSONRenderer.
+
+        Meant for viewsets whose list serializer is a CompiledListSerializer
+        without float fields.
+        """
+        renderers = super().get_renderers()
+        if self.action != "list":
+            return renderers
+        return [
+            ORJSONRenderer() if type(renderer) is JSONRenderer else renderer
+            for renderer in renderers
+        ]
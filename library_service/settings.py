@@ -13,6 +13,7 @@ import os
 from pathlib import Path
 
 import dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 dotenv.load_dotenv()
 
@@ -45,6 +46,9 @@ INSTALLED_APPS = [
     'borrowings',
     'books',
     'payments',
+    'events',
+    'reports',
+    'benchmarks',
     'rest_framework',
     'rest_framework_simplejwt',
     'drf_spectacular',
@@ -52,6 +56,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'library_service.middleware.AdmissionControlMiddleware',
+    'library_service.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,14 +90,134 @@ WSGI_APPLICATION = 'library_service.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+#
+# DATABASE_PROFILE selects one of:
+#   sqlite      local development defaults.
+#   sqlite-wal  single-node installs: WAL journal so readers do not block
+#               the writer, fsync at checkpoints only, a busy timeout and
+#               memory-mapped reads.
+#   postgres    PostgreSQL (requires psycopg) with persistent, health
+#               checked connections or, with DATABASE_POOL=true, a psycopg
+#               connection pool (requires psycopg-pool).
+
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'sqlite')
+
+DATABASE_CONN_MAX_AGE = int(os.environ.get('DATABASE_CONN_MAX_AGE', 60))
+
+DATABASE_POOL = os.environ.get('DATABASE_POOL', 'false').lower() == 'true'
+
+SQLITE_DATABASE = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+}
+
+DATABASE_PROFILES = {
+    'sqlite': SQLITE_DATABASE,
+    'sqlite-wal': {
+        **SQLITE_DATABASE,
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'OPTIONS': {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size={};'
+                'PRAGMA temp_store=MEMORY;'
+                'PRAGMA cache_size=-{}'
+            ).format(
+                int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+                int(os.environ.get('SQLITE_CACHE_KIB', 64 * 1024)),
+            ),
+            # Seconds a connection waits for the write lock.
+            'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5)),
+            # Take the write lock at BEGIN, where the busy timeout applies,
+            # instead of failing on a read-to-write upgrade.
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('POSTGRES_DB', 'library_service'),
+        'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        # Django refuses persistent connections together with a pool.
+        'CONN_MAX_AGE': 0 if DATABASE_POOL else DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 10)),
+                'timeout': float(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+            },
+        } if DATABASE_POOL else {},
+    },
+}
+
+if DATABASE_PROFILE not in DATABASE_PROFILES:
+    raise ImproperlyConfigured(
+        f'DATABASE_PROFILE must be one of: {", ".join(DATABASE_PROFILES)}.'
+    )
 
 DATABASES = {
+    'default': DATABASE_PROFILES[DATABASE_PROFILE],
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+# Number of server processes, as gunicorn reads it.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Cached catalog pages are invalidated through a version counter kept in
+# this cache, so every process must share it: locmem (per process) only
+# fits a single worker; use 'file' on one host or 'redis' otherwise.
+CATALOG_CACHE_BACKEND = os.environ.get('CATALOG_CACHE_BACKEND', 'locmem')
+
+if CATALOG_CACHE_BACKEND == 'locmem' and WEB_CONCURRENCY > 1:
+    raise ImproperlyConfigured(
+        'CATALOG_CACHE_BACKEND must be shared by the workers when '
+        'WEB_CONCURRENCY > 1; use file or redis.'
+    )
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': CACHE_BACKENDS[CATALOG_CACHE_BACKEND],
+        # A unique name for locmem, a directory for file, a redis:// URL.
+        'LOCATION': os.environ.get('CATALOG_CACHE_LOCATION', 'catalog'),
+    },
 }
 
+CATALOG_CACHE_ALIAS = 'catalog'
+
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 300))
+
+# Throttle buckets need atomic increments: use 'locmem' (per process) or
+# 'redis' (shared by every process), not 'file'.
+THROTTLE_CACHE_BACKEND = os.environ.get('THROTTLE_CACHE_BACKEND', 'locmem')
+
+CACHES['throttle'] = {
+    'BACKEND': CACHE_BACKENDS[THROTTLE_CACHE_BACKEND],
+    'LOCATION': os.environ.get('THROTTLE_CACHE_LOCATION', 'throttle'),
+    # locmem culls at 300 keys by default, which would refill the buckets
+    # of busy clients early.
+    'OPTIONS': (
+        {'MAX_ENTRIES': 100000} if THROTTLE_CACHE_BACKEND == 'locmem' else {}
+    ),
+}
+
+THROTTLE_CACHE_ALIAS = 'throttle'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -140,16 +266,141 @@ STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY')
 
 STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
 
+STRIPE_API_BASE = os.environ.get('STRIPE_API_BASE', 'https://api.stripe.com')
+
+STRIPE_TIMEOUT = float(os.environ.get('STRIPE_TIMEOUT', 10))
+
+STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_THROTTLE_CLASSES': (
+        'library_service.throttling.AnonTokenBucketThrottle',
+        'library_service.throttling.UserTokenBucketThrottle',
+    ),
+    # Token buckets per client IP (anon) or user, holding a period's worth
+    # of tokens. An empty variable turns the scope off.
+    'DEFAULT_THROTTLE_RATES': {
+        'anon_read': os.environ.get('THROTTLE_ANON_READ', '300/min') or None,
+        'anon_write': os.environ.get('THROTTLE_ANON_WRITE', '30/min') or None,
+        'user_read': os.environ.get('THROTTLE_USER_READ', '1200/min') or None,
+        'user_write': (
+            os.environ.get('THROTTLE_USER_WRITE', '240/min') or None
+        ),
+    },
+    # Reverse proxies in front of the app. The client IP throttles key on
+    # is read that many hops from the end of X-Forwarded-For, or from
+    # REMOTE_ADDR when 0; clients cannot pick their own buckets.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+    'PAGE_SIZE': int(os.environ.get('PAGINATION_PAGE_SIZE', 20)),
+}
+
+PAGINATION_MAX_PAGE_SIZE = int(os.environ.get('PAGINATION_MAX_PAGE_SIZE', 100))
+
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'user.serializers.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'user.serializers.TokenRefreshSerializer',
 }
 
+# Seconds a returned copy stays reserved for the next hold in line.
+HOLD_RESERVATION_TTL = int(os.environ.get('HOLD_RESERVATION_TTL', 48 * 3600))
+
+# Longest a hold long-poll may wait, and how often it re-reads the hold to
+# see changes made by other processes.
+HOLD_LONG_POLL_TIMEOUT = float(os.environ.get('HOLD_LONG_POLL_TIMEOUT', 30))
+
+HOLD_LONG_POLL_INTERVAL = float(os.environ.get('HOLD_LONG_POLL_INTERVAL', 2))
+
+# Admission control: at most ADMISSION_MAX_CONCURRENCY requests run at once
+# per process and ADMISSION_QUEUE_SIZE more wait up to
+# ADMISSION_QUEUE_TIMEOUT seconds for a slot; the rest get 503 with
+# Retry-After. 0 turns it off. Long polls are exempt: they mostly wait.
+ADMISSION_MAX_CONCURRENCY = int(
+    os.environ.get('ADMISSION_MAX_CONCURRENCY', 64)
+)
+
+ADMISSION_QUEUE_SIZE = int(os.environ.get('ADMISSION_QUEUE_SIZE', 128))
+
+ADMISSION_QUEUE_TIMEOUT = float(
+    os.environ.get('ADMISSION_QUEUE_TIMEOUT', 0.5)
+)
+
+ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', 1))
+
+ADMISSION_EXEMPT_PATHS = [r'^/borrowings/holds/\d+/watch/$']
+
+# Server-sent event streams. 'local' delivers events within one process
+# (streams poll the event table every heartbeat for the rest); 'redis'
+# relays them to every process through EVENTS_BROKER_URL.
+EVENTS_BROKER = os.environ.get('EVENTS_BROKER', 'local')
+
+EVENTS_BROKER_URL = os.environ.get('EVENTS_BROKER_URL', 'redis://localhost')
+
+EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', 15))
+
+# Messages a slow stream may fall behind before it is switched to catching
+# up from the event table.
+EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+
+EVENTS_REPLAY_BATCH = 500
+
+# Event ids are assigned before commit, so a user's events can commit out
+# of id order. Streams catch up on events this many seconds old as well.
+EVENTS_REORDER_WINDOW = float(os.environ.get('EVENTS_REORDER_WINDOW', 10))
+
+EVENTS_RETRY_MS = 3000
+
+EVENTS_RETENTION_HOURS = float(os.environ.get('EVENTS_RETENTION_HOURS', 24))
+
+# Per-process cache of the users behind JWTs. A change made in another
+# process is seen here once the entry expires.
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 60))
+
+# Per-request SQL instrumentation (Server-Timing header, query log lines and
+# the /metrics/ endpoint). The middleware unloads itself when disabled.
+QUERY_INSTRUMENTATION = (
+    os.environ.get('QUERY_INSTRUMENTATION', 'false').lower() == 'true'
+)
+
+# The same SQL run this many times in one request is reported as N+1.
+QUERY_DUPLICATE_THRESHOLD = int(os.environ.get('QUERY_DUPLICATE_THRESHOLD', 3))
+
+# /metrics/ answers staff sessions and scrapers connecting from these
+# networks (comma-separated CIDRs); REMOTE_ADDR is the direct peer.
+METRICS_ALLOWED_NETWORKS = os.environ.get(
+    'METRICS_ALLOWED_NETWORKS', '127.0.0.0/8,::1/128'
+).split(',')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'library_service.queries': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Pagination classes are set per view; PAGE_SIZE above is their default.
+SILENCED_SYSTEM_CHECKS = ['rest_framework.W001']
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Library Service API',
     'DESCRIPTION': 'Borrow books, pay for borrow etc.',
     'VERSION': '1.0.0',
     'SERVE_INCLUDE_SCHEMA': False,
+    'ENUM_NAME_OVERRIDES': {
+        'HoldStatusEnum': 'borrowings.models.Hold.StatusChoices',
+        'StatusEnum': 'payments.models.Payment.StatusChoices',
+    },
 }
\ No newline at end of file
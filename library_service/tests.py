@@ -0,0 +1,382 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from borrowings.serializers import BorrowingDetailSerializer
+from library_service.admission import ConcurrencyLimiter
+from library_service.instrumentation import QueryRecorder, metrics
+from library_service.middleware import (
+    AdmissionControlMiddleware,
+    QueryInstrumentationMiddleware,
+)
+from library_service.renderers import ORJSONRenderer, orjson
+from library_service.serializers import values_plan, values_rows
+from payments.models import Payment
+from payments.serializers import PaymentListSerializer
+
+BOOK_URL = reverse("books:book-list")
+USER_URL = reverse("users:create")
+METRICS_URL = reverse("metrics")
+
+
+@override_settings(QUERY_INSTRUMENTATION=True)
+class QueryInstrumentationTest(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.api_client = APIClient()
+        Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            cover="Hard",
+            inventory=2,
+            daily_fee=0.3
+        )
+
+    def test_server_timing_header(self):
+        res = self.api_client.get(BOOK_URL)
+
+        self.assertIn('desc="1 queries"', res["Server-Timing"])
+
+    def test_log_line_names_view_action(self):
+        with self.assertLogs("library_service.queries", "INFO") as logs:
+            self.api_client.get(BOOK_URL)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "books:book-list")
+        self.assertEqual(record["action"], "list")
+        self.assertEqual(record["queries"], 1)
+        self.assertEqual(record["duplicates"], {})
+
+    def test_metrics_endpoint(self):
+        self.api_client.get(BOOK_URL)
+        self.api_client.get(BOOK_URL)
+
+        res = self.api_client.get(METRICS_URL)
+
+        self.assertIn(
+            'library_requests_total{view="books:book-list",action="list"} 2',
+            res.content.decode()
+        )
+
+    def test_metrics_endpoint_is_internal(self):
+        res = self.client.get(METRICS_URL, REMOTE_ADDR="203.0.113.5")
+        self.assertEqual(res.status_code, 403)
+
+        self.client.force_login(get_user_model().objects.create_user(
+            email="admin@test.com", password="testpass123", is_staff=True
+        ))
+        res = self.client.get(METRICS_URL, REMOTE_ADDR="203.0.113.5")
+        self.assertEqual(res.status_code, 200)
+
+    async def test_async_handler(self):
+        async def get_response(request):
+            await Book.objects.acount()
+            return HttpResponse()
+
+        middleware = QueryInstrumentationMiddleware(get_response)
+        with self.assertLogs("library_service.queries", "INFO"):
+            res = await middleware(RequestFactory().get(BOOK_URL))
+
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertIn('desc="1 queries"', res["Server-Timing"])
+
+
+class QueryRecorderTest(TestCase):
+    def test_repeated_statements_are_duplicates(self):
+        def execute(sql, params, many, context):
+            return None
+
+        recorder = QueryRecorder()
+        for pk in range(3):
+            recorder(execute, "SELECT * FROM book WHERE id = %s", (pk,),
+                     False, {})
+        recorder(execute, "SELECT 1", (), False, {})
+
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(
+            recorder.duplicates(3), {"SELECT * FROM book WHERE id = %s": 3}
+        )
+
+
+class DisabledInstrumentationTest(TestCase):
+    def test_disabled_by_default(self):
+        res = self.client.get(BOOK_URL)
+
+        self.assertNotIn("Server-Timing", res)
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 404)
+
+
+class SQLiteProfileTest(TestCase):
+    def test_wal_profile_pragmas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database = {
+                **settings.DATABASE_PROFILES["sqlite-wal"],
+                "NAME": os.path.join(directory, "profile.sqlite3"),
+            }
+            wrapper = ConnectionHandler({"default": database})["default"]
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone(), ("wal",))
+                    cursor.execute("PRAGMA synchronous")
+                    self.assertEqual(cursor.fetchone(), (1,))
+                self.assertEqual(wrapper.transaction_mode, "IMMEDIATE")
+            finally:
+                wrapper.close()
+
+
+class CompiledListSerializerTest(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(email="test@mail.com")
+        book = Book.objects.create(
+            title="Caf\u00e9 \u2028 \"quoted\"", author="Author",
+            cover="HARD", inventory=2, daily_fee=Decimal("0.30"),
+        )
+        borrowing = Borrowing.objects.create(
+            user=user, book=book,
+            expected_return_date=timezone.now().date() + timedelta(days=2),
+        )
+        Payment.objects.create(
+            user=user, borrowing=borrowing, money_to_pay=Decimal("1.5")
+        )
+        Payment.objects.create(user=user, money_to_pay=Decimal("2"))
+
+    def test_output_matches_model_serializer(self):
+        queryset = Payment.objects.order_by("id")
+        expected = JSONRenderer().render(ListSerializer(
+            queryset, child=PaymentListSerializer()
+        ).data)
+
+        data = PaymentListSerializer(
+            values_rows(queryset, PaymentListSerializer), many=True
+        ).data
+
+        self.assertEqual(ORJSONRenderer().render(data), expected)
+        self.assertIsNone(data[1]["book"])
+
+    def test_nested_serializers_are_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            values_plan(BorrowingDetailSerializer)
+
+
+@skipUnless(orjson, "orjson is not installed")
+class ORJSONRendererTest(TestCase):
+    def test_matches_json_renderer(self):
+        data = {
+            "text": "\u00e9 \u2028 \u2029 \x01 \"",
+            "when": datetime(
+                2024, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc
+            ),
+            "day": datetime(2024, 1, 2).date(),
+            "items": [1, None, True, {"fee": "0.30"}],
+        }
+
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_indented_output_falls_back(self):
+        renderer = ORJSONRenderer()
+
+        self.assertEqual(
+            renderer.render({"a": 1}, "application/json; indent=2"),
+            JSONRenderer().render({"a": 1}, "application/json; indent=2"),
+        )
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    "DEFAULT_THROTTLE_RATES": {
+        "anon_read": "2/min",
+        "anon_write": "1/min",
+        "user_read": "3/min",
+        "user_write": None,
+    },
+})
+class TokenBucketThrottleTest(TestCase):
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+        self.api_client = APIClient()
+
+    def test_anonymous_reads_are_limited_per_ip(self):
+        for _ in range(2):
+            self.assertEqual(self.api_client.get(BOOK_URL).status_code, 200)
+
+        res = self.api_client.get(BOOK_URL)
+        other_ip = self.api_client.get(BOOK_URL, REMOTE_ADDR="10.0.0.2")
+
+        self.assertEqual(res.status_code, 429)
+        self.assertEqual(res["Retry-After"], "30")
+        self.assertEqual(other_ip.status_code, 200)
+
+    def test_forwarded_for_header_does_not_pick_the_bucket(self):
+        statuses = [
+            self.api_client.get(
+                BOOK_URL, HTTP_X_FORWARDED_FOR=f"203.0.113.{index}"
+            ).status_code
+            for index in range(3)
+        ]
+
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_reads_and_writes_have_separate_budgets(self):
+        for _ in range(2):
+            self.api_client.get(BOOK_URL)
+
+        first = self.api_client.post(USER_URL, {})
+        second = self.api_client.post(USER_URL, {})
+
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(second.status_code, 429)
+
+    def test_users_have_their_own_buckets(self):
+        for _ in range(2):
+            self.api_client.get(BOOK_URL)
+        self.api_client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="reader@test.com", password="testpass123"
+            )
+        )
+
+        statuses = [self.api_client.get(BOOK_URL).status_code for _ in "abcd"]
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    def test_bucket_refills_over_time(self):
+        now = 1_000_000_000_000
+        with patch("library_service.throttling.time.time_ns") as time_ns:
+            time_ns.return_value = now
+            for _ in range(2):
+                self.api_client.get(BOOK_URL)
+            rejected = self.api_client.get(BOOK_URL)
+            # Half a minute brings back one of the two tokens.
+            time_ns.return_value = now + 30 * 10 ** 9
+            refilled = self.api_client.get(BOOK_URL)
+            empty = self.api_client.get(BOOK_URL)
+
+        self.assertEqual(
+            [rejected.status_code, refilled.status_code, empty.status_code],
+            [429, 200, 429],
+        )
+
+
+class ConcurrencyLimiterTest(TestCase):
+    def test_refuses_when_slots_and_queue_are_taken(self):
+        limiter = ConcurrencyLimiter(1, 0)
+
+        self.assertTrue(limiter.acquire(0))
+        self.assertFalse(limiter.acquire(1))
+        limiter.release()
+        self.assertTrue(limiter.acquire(0))
+
+    def test_queued_waiter_times_out(self):
+        limiter = ConcurrencyLimiter(1, 1)
+        limiter.acquire(0)
+
+        self.assertFalse(limiter.acquire(0.01))
+        self.assertEqual(len(limiter.queue), 0)
+
+    def test_release_hands_slot_to_waiting_thread(self):
+        limiter = ConcurrencyLimiter(1, 1)
+        limiter.acquire(0)
+        results = []
+        waiter = threading.Thread(
+            target=lambda: results.append(limiter.acquire(5))
+        )
+        waiter.start()
+        while not limiter.queue:
+            pass
+
+        limiter.release()
+        waiter.join()
+
+        self.assertEqual(results, [True])
+        self.assertEqual(limiter.active, 1)
+
+    def test_release_hands_slot_to_waiting_coroutine(self):
+        limiter = ConcurrencyLimiter(1, 1)
+        limiter.acquire(0)
+
+        async def wait_and_release():
+            waiting = asyncio.ensure_future(limiter.aacquire(5))
+            while not limiter.queue:
+                await asyncio.sleep(0)
+            limiter.release()
+            return await waiting
+
+        self.assertTrue(asyncio.run(wait_and_release()))
+        self.assertEqual(limiter.active, 1)
+
+
+@override_settings(ADMISSION_MAX_CONCURRENCY=1, ADMISSION_QUEUE_SIZE=0)
+class AdmissionControlMiddlewareTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_overloaded_requests_get_503(self):
+        middleware = AdmissionControlMiddleware(lambda request: HttpResponse())
+        middleware.limiter.acquire(0)
+
+        res = middleware(self.factory.get(BOOK_URL))
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res["Retry-After"], "1")
+
+    def test_slot_is_released_after_response(self):
+        middleware = AdmissionControlMiddleware(lambda request: HttpResponse())
+
+        statuses = [
+            middleware(self.factory.get(BOOK_URL)).status_code
+            for _ in range(3)
+        ]
+
+        self.assertEqual(statuses, [200, 200, 200])
+        self.assertEqual(middleware.limiter.active, 0)
+
+    def test_long_polls_are_exempt(self):
+        middleware = AdmissionControlMiddleware(lambda request: HttpResponse())
+        middleware.limiter.acquire(0)
+
+        res = middleware(self.factory.get(
+            reverse("borrowings:hold-watch", args=[1])
+        ))
+
+        self.assertEqual(res.status_code, 200)
+
+    async def test_async_handler(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = AdmissionControlMiddleware(get_response)
+        admitted = await middleware(self.factory.get(BOOK_URL))
+        middleware.limiter.acquire(0)
+        shed = await middleware(self.factory.get(BOOK_URL))
+
+        self.assertEqual([admitted.status_code, shed.status_code], [200, 503])
+
+    @override_settings(ADMISSION_MAX_CONCURRENCY=0)
+    def test_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            AdmissionControlMiddleware(lambda request: HttpResponse())
@@ -0,0 +1,119 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """``"<tokens>/<period>"`` to (tokens, seconds), as DRF parses rates."""
+    tokens, period = rate.split("/")
+    return int(tokens), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket per client and scope, kept in THROTTLE_CACHE_ALIAS.
+
+    A bucket holds the tokens its rate grants per period and refills
+    continuously. It is stored as the single integer at which it will be
+    full again (the generic cell rate algorithm), so a request costs an
+    atomic increment and a touch, not the read-modify-write of a request
+    history that grows with the rate as in DRF's SimpleRateThrottle.
+
+    Safe methods spend from ``<prefix>_read`` and the others from
+    ``<prefix>_write`` in DEFAULT_THROTTLE_RATES; a rate of None turns
+    the scope off.
+    """
+
+    scope_prefix = None
+
+    def get_scope(self, request):
+        access = "read" if request.method in SAFE_METHODS else "write"
+        return f"{self.scope_prefix}_{access}"
+
+    def get_ident_key(self, request):
+        """The client's bucket name, or None when this throttle skips it."""
+        raise NotImplementedError
+
+    def get_rate(self, scope):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f"No default throttle rate set for {scope!r} scope"
+            )
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        ident = self.get_ident_key(request)
+        if ident is None:
+            return True
+        scope = self.get_scope(request)
+        rate = self.get_rate(scope)
+        if rate is None:
+            return True
+
+        tokens, period = parse_rate(rate)
+        # Microseconds, so that fast rates keep a non-zero interval; wall
+        # clock, so that processes sharing the cache agree on it.
+        interval = period * 1_000_000 // tokens
+        now = time.time_ns() // 1000
+        key = f"throttle:{scope}:{ident}"
+        timeout = period + 1
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+
+        try:
+            full_at = cache.incr(key, interval)
+        except ValueError:
+            full_at = None
+        if full_at is None or full_at - interval < now:
+            # Unknown or idle clients have a full bucket. Racing requests
+            # may both land here; the later write wins and at most one
+            # token goes unspent.
+            cache.set(key, now + interval, timeout)
+            return True
+
+        wait = full_at - now - period * 1_000_000
+        if wait > 0:
+            # Rejected requests spend nothing, so a client that keeps
+            # retrying is not locked out for longer.
+            try:
+                cache.decr(key, interval)
+            except ValueError:
+                pass
+            self.retry_after = math.ceil(wait / 1_000_000)
+            return False
+
+        cache.touch(key, timeout)
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """Buckets per client IP for unauthenticated requests."""
+
+    scope_prefix = "anon"
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Buckets per user for authenticated requests."""
+
+    scope_prefix = "user"
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
@@ -18,12 +18,17 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularSwaggerView, SpectacularAPIView
 
+from library_service.instrumentation import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("users/", include("user.urls")),
     path("borrowings/", include("borrowings.urls")),
     path("books/", include("books.urls")),
     path("payments/", include("payments.urls")),
+    path("events/", include("events.urls")),
+    path("reports/", include("reports.urls")),
+    path("metrics/", metrics_view, name="metrics"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/schema/swagger-ui/",
@@ -0,0 +1,40 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+
+class Waiters:
+    """Coroutines waiting on a key, woken from any thread of the process.
+
+    A wake-up is a hint, not a message: waiters re-read the state they
+    wait on, which also covers changes made by other processes once
+    ``wait`` times out.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = defaultdict(set)
+
+    async def wait(self, key, timeout):
+        """Return True if woken before ``timeout`` seconds, else False."""
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        with self.lock:
+            self.events[key].add(entry)
+        try:
+            await asyncio.wait_for(entry[1].wait(), timeout)
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            with self.lock:
+                self.events[key].discard(entry)
+                if not self.events[key]:
+                    del self.events[key]
+
+    def notify(self, *keys):
+        with self.lock:
+            entries = [
+                entry for key in keys for entry in self.events.get(key, ())
+            ]
+        for loop, event in entries:
+            loop.call_soon_threadsafe(event.set)
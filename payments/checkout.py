@@ -0,0 +1,150 @@
+import hashlib
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from events.feed import payment_event, publish
+from payments.models import CheckoutJob, Payment
+from payments.stripe_helper import (
+    _line_item,
+    calculate_fine,
+    calculate_total,
+    create_checkout_session,
+    create_stripe_client,
+)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = timedelta(seconds=5)
+BACKOFF_MAX = timedelta(minutes=30)
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def return_idempotency_key(borrowings):
+    """Key identifying the payment owed for returning ``borrowings``.
+
+    ``return:<borrowing id>`` for a single return and
+    ``bulk-return:<user id>:<digest of borrowing ids>`` for bulk returns.
+    """
+    ids = sorted(borrowing.pk for borrowing in borrowings)
+    if len(ids) == 1:
+        return f"return:{ids[0]}"
+    digest = hashlib.sha1(",".join(map(str, ids)).encode()).hexdigest()
+    return f"bulk-return:{borrowings[0].user_id}:{digest}"
+
+
+def enqueue_checkout(borrowings, request):
+    """Create the pending payment for ``borrowings`` and queue its session.
+
+    Call inside the transaction that returns the borrowings. Calling it
+    again for the same borrowings returns the existing payment.
+    """
+    amounts = [calculate_total(borrowing) for borrowing in borrowings]
+    payment, created = Payment.objects.get_or_create(
+        idempotency_key=return_idempotency_key(borrowings),
+        defaults={
+            "status": Payment.StatusChoices.PENDING,
+            "type": Payment.TypeChoices.PAYMENT,
+            "money_to_pay": sum(amounts),
+            "fine_amount": sum(
+                calculate_fine(borrowing) for borrowing in borrowings
+            ),
+            "borrowing": borrowings[0] if len(borrowings) == 1 else None,
+            "user_id": borrowings[0].user_id,
+        },
+    )
+    if created:
+        publish([payment_event(
+            "created",
+            payment.pk,
+            payment.user_id,
+            status=payment.status,
+            type=payment.type,
+            money_to_pay=payment.money_to_pay,
+        )])
+        CheckoutJob.objects.create(
+            payment=payment,
+            line_items=[
+                _line_item(borrowing, amount)
+                for borrowing, amount in zip(borrowings, amounts)
+            ],
+            success_url=request.build_absolute_uri(
+                reverse("payments:payment-success", kwargs={"pk": payment.pk})
+            ),
+            cancel_url=request.build_absolute_uri(
+                reverse("payments:payment-cancel", kwargs={"pk": payment.pk})
+            ),
+        )
+    return payment
+
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def claim_due_jobs(batch_size=BATCH_SIZE):
+    """Lease a batch of due jobs so parallel workers skip them."""
+    now = timezone.now()
+    due = CheckoutJob.objects.filter(
+        status=CheckoutJob.StatusChoices.PENDING,
+        next_attempt_at__lte=now,
+    ).order_by("next_attempt_at", "id")
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        jobs = list(due.select_related("payment")[:batch_size])
+        CheckoutJob.objects.filter(
+            id__in=[job.id for job in jobs]
+        ).update(next_attempt_at=now + CLAIM_LEASE)
+    return jobs
+
+
+def _mark_done(job, session):
+    with transaction.atomic():
+        Payment.objects.filter(pk=job.payment_id).update(
+            session_url=session.url, session_id=session.id
+        )
+        publish([payment_event(
+            "session_ready",
+            job.payment_id,
+            job.payment.user_id,
+            status=job.payment.status,
+            session_url=session.url,
+        )])
+        CheckoutJob.objects.filter(pk=job.pk).update(
+            status=CheckoutJob.StatusChoices.DONE,
+            completed_at=timezone.now(),
+            last_error="",
+        )
+
+
+def _mark_failed(job, error):
+    job.attempts += 1
+    job.last_error = str(error)
+    if job.attempts >= MAX_ATTEMPTS:
+        job.status = CheckoutJob.StatusChoices.FAILED
+    else:
+        job.next_attempt_at = timezone.now() + backoff(job.attempts)
+    job.save(
+        update_fields=["attempts", "last_error", "status", "next_attempt_at"]
+    )
+
+
+def process_checkout_jobs(client=None, batch_size=BATCH_SIZE):
+    """Create Stripe sessions for one batch of due jobs.
+
+    Returns the number of payments that received a session.
+    """
+    client = client or create_stripe_client()
+    created = 0
+    for job in claim_due_jobs(batch_size):
+        try:
+            session = create_checkout_session(job, client)
+        except Exception as error:
+            _mark_failed(job, error)
+        else:
+            _mark_done(job, session)
+            created += 1
+    return created
@@ -0,0 +1,114 @@
+import hashlib
+import hmac
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import stripe
+
+
+def sign_webhook(payload, secret, timestamp=None):
+    """``Stripe-Signature`` header value for a webhook ``payload``."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signature = hmac.new(
+        secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def checkout_event(session_id, event_id, type="checkout.session.completed"):
+    """Webhook body for a paid checkout session."""
+    return json.dumps({
+        "id": event_id,
+        "object": "event",
+        "type": type,
+        "data": {"object": {
+            "id": session_id,
+            "object": "checkout.session",
+            "payment_status": "paid",
+        }},
+    })
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != "/v1/checkout/sessions":
+            return self.reply(404, {"error": {
+                "type": "invalid_request_error",
+                "message": f"Unrecognized request URL (POST: {self.path})",
+            }})
+        length = int(self.headers.get("Content-Length") or 0)
+        params = dict(parse_qsl(self.rfile.read(length).decode()))
+        key = self.headers.get("Idempotency-Key")
+        self.reply(200, self.server.create_session(params, key))
+
+    def reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeStripeServer(ThreadingHTTPServer):
+    """Minimal in-process stand-in for the Stripe checkout API.
+
+    Sessions are replayed for a repeated ``Idempotency-Key`` the way Stripe
+    does. Use as a context manager to point the ``stripe`` module at it::
+
+        with FakeStripeServer() as server:
+            ...
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), FakeStripeHandler)
+        self.sessions = {}
+        self.requests = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._previous = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def create_session(self, params, key):
+        with self._lock:
+            self.requests += 1
+            if key in self.sessions:
+                return self.sessions[key]
+            session_id = f"cs_test_{next(self._ids)}"
+            session = {
+                "id": session_id,
+                "object": "checkout.session",
+                "mode": params.get("mode"),
+                "status": "open",
+                "payment_status": "unpaid",
+                "success_url": params.get("success_url"),
+                "cancel_url": params.get("cancel_url"),
+                "url": f"{self.url}/pay/{session_id}",
+            }
+            self.sessions[key or session_id] = session
+            return session
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        self._previous = stripe.api_base, stripe.api_key
+        stripe.api_base = self.url
+        stripe.api_key = stripe.api_key or "sk_test_fake"
+        return self
+
+    def __exit__(self, *exc_info):
+        stripe.api_base, stripe.api_key = self._previous
+        self.shutdown()
+        self.server_close()
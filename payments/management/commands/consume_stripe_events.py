@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.webhooks import BATCH_SIZE, apply_stripe_events
+
+
+class Command(BaseCommand):
+    help = "Apply queued Stripe webhook events to their payments."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Maximum number of events applied in one transaction.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the queue instead of exiting when it is empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep between polls when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        events = paid = 0
+        while True:
+            applied, updated = apply_stripe_events(options["batch_size"])
+            events += applied
+            paid += updated
+            if applied:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(f"Applied {events} events, {paid} payments paid.")
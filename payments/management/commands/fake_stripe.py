@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from payments.fake_stripe import FakeStripeServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a local fake of the Stripe checkout API. Point "
+        "STRIPE_API_BASE at the printed address to work offline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=12111)
+
+    def handle(self, *args, **options):
+        server = FakeStripeServer(options["host"], options["port"])
+        self.stdout.write(f"Fake Stripe API listening on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.checkout import BATCH_SIZE, process_checkout_jobs
+from payments.stripe_helper import create_stripe_client
+
+
+class Command(BaseCommand):
+    help = "Create Stripe checkout sessions for queued payments."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Maximum number of jobs claimed at once.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the queue instead of exiting when it is empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep between polls when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        client = create_stripe_client()
+        total = 0
+        while True:
+            created = process_checkout_jobs(
+                client=client, batch_size=options["batch_size"]
+            )
+            total += created
+            if created:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(f"Created {total} checkout sessions.")
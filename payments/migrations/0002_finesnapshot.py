@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 04:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('borrowings', '0003_borrowing_access_indexes'),
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FineSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('overdue_days', models.PositiveIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('computed_on', models.DateField()),
+                ('borrowing', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fine_snapshot', to='borrowings.borrowing')),
+            ],
+        ),
+    ]
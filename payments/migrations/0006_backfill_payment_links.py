@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.db import migrations, transaction
+
+CHUNK_SIZE = 1000
+
+
+def parse_key(key):
+    """Return ``(borrowing_id, user_id)`` encoded in an idempotency key."""
+    kind, _, rest = key.partition(":")
+    if kind == "return" and rest.isdigit():
+        return int(rest), None
+    if kind == "bulk-return":
+        user_id = rest.partition(":")[0]
+        if user_id.isdigit():
+            return None, int(user_id)
+    return None, None
+
+
+def backfill_payment_links(apps, schema_editor):
+    Payment = apps.get_model("payments", "Payment")
+    Borrowing = apps.get_model("borrowings", "Borrowing")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    pending = Payment.objects.filter(
+        user__isnull=True, idempotency_key__isnull=False
+    ).order_by("id").only("id", "idempotency_key")
+
+    last_id = 0
+    while True:
+        payments = list(pending.filter(id__gt=last_id)[:CHUNK_SIZE])
+        if not payments:
+            break
+        last_id = payments[-1].id
+        parsed = {
+            payment.id: parse_key(payment.idempotency_key)
+            for payment in payments
+        }
+        owners = dict(Borrowing.objects.filter(
+            id__in={pk for pk, _ in parsed.values() if pk}
+        ).values_list("id", "user_id"))
+        users = set(User.objects.filter(
+            id__in={pk for _, pk in parsed.values() if pk}
+        ).values_list("id", flat=True))
+
+        for payment in payments:
+            borrowing_id, user_id = parsed[payment.id]
+            if borrowing_id in owners:
+                payment.borrowing_id = borrowing_id
+                payment.user_id = owners[borrowing_id]
+            elif user_id in users:
+                payment.user_id = user_id
+        with transaction.atomic(using=schema_editor.connection.alias):
+            Payment.objects.bulk_update(payments, ["borrowing", "user"])
+
+
+class Migration(migrations.Migration):
+    # Commit chunk by chunk instead of holding one long transaction.
+    atomic = False
+
+    dependencies = [
+        ('payments', '0005_payment_borrowing_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_payment_links, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 05:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_payment_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='fine_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0009_stripeevent_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='fine_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='money_to_pay',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from datetime import date
 from decimal import Decimal
 
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class Payment(models.Model):
@@ -22,9 +24,42 @@ class Payment(models.Model):
         choices=TypeChoices.choices,
         max_length=20,
     )
-    session_url = models.URLField()
-    session_id = models.CharField(max_length=255)
-    money_to_pay = models.DecimalField(max_digits=5, decimal_places=2)
+    session_url = models.URLField(blank=True)
+    session_id = models.CharField(max_length=255, blank=True, db_index=True)
+    idempotency_key = models.CharField(
+        max_length=100,
+        unique=True,
+        null=True,
+        blank=True,
+    )
+    money_to_pay = models.DecimalField(max_digits=10, decimal_places=2)
+    # The late-return fine included in money_to_pay.
+    fine_amount = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0
+    )
+    borrowing = models.ForeignKey(
+        "borrowings.Borrowing",
+        on_delete=models.SET_NULL,
+        related_name="payments",
+        null=True,
+        blank=True,
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="payments",
+        null=True,
+        blank=True,
+        # Covered by the leading column of payment_user_idx.
+        db_index=False,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-id"], name="payment_user_idx"),
+        ]
 
     def calculate_money_to_pay(
             self,
@@ -46,4 +81,83 @@ class Payment(models.Model):
             overdue_days = (actual_return_date-expected_return_date).days
             fine = overdue_days * daily_fee * self.FINE_MULTIPLIER
             return fine.quantize(Decimal("0.01"))
-        return Decimal("0.00")
\ No newline at end of file
+        return Decimal("0.00")
+
+
+class CheckoutJob(models.Model):
+    """Stripe checkout session waiting to be created for a payment."""
+
+    class StatusChoices(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    payment = models.OneToOneField(
+        Payment,
+        on_delete=models.CASCADE,
+        related_name="checkout_job",
+    )
+    line_items = models.JSONField()
+    success_url = models.URLField(max_length=500)
+    cancel_url = models.URLField(max_length=500)
+    status = models.CharField(
+        max_length=10,
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"],
+                name="checkout_job_due_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.status} checkout for payment #{self.payment_id}"
+
+
+class StripeEvent(models.Model):
+    """Verified Stripe webhook event waiting to be applied to its payment."""
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    session_id = models.CharField(max_length=255)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # Set while the event waits for its payment's session id.
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["id"],
+                name="stripe_event_pending_idx",
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.event_id}"
+
+
+class FineSnapshot(models.Model):
+    """Fine accrued so far by an active overdue borrowing."""
+
+    borrowing = models.OneToOneField(
+        "borrowings.Borrowing",
+        on_delete=models.CASCADE,
+        related_name="fine_snapshot",
+    )
+    overdue_days = models.PositiveIntegerField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    computed_on = models.DateField()
+
+    def __str__(self):
+        return f"{self.amount} fine for borrowing #{self.borrowing_id}"
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from library_service.export import ExportQuerySerializer
+from library_service.serializers import CompiledListSerializer
 from payments.models import Payment
 
 
@@ -12,11 +14,18 @@ class PaymentSerializer(serializers.ModelSerializer):
             "type",
             "session_url",
             "session_id",
-            "money_to_pay"
+            "money_to_pay",
+            "borrowing",
+            "user",
         )
+        read_only_fields = ("user",)
 
 
 class PaymentListSerializer(PaymentSerializer):
+    book = serializers.CharField(
+        source="borrowing.book.title", read_only=True, default=None
+    )
+
     class Meta(PaymentSerializer.Meta):
         model = Payment
         fields = (
@@ -24,4 +33,13 @@ class PaymentListSerializer(PaymentSerializer):
             "status",
             "type",
             "money_to_pay",
+            "borrowing",
+            "book",
         )
+        list_serializer_class = CompiledListSerializer
+
+
+class PaymentExportQuerySerializer(ExportQuerySerializer):
+    status = serializers.ChoiceField(
+        choices=Payment.StatusChoices.choices, required=False
+    )
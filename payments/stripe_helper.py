@@ -1,18 +1,18 @@
-from django.urls import reverse
-
+import requests
 import stripe
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.utils import timezone
 
 from payments.models import Payment
 
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
+stripe.api_base = settings.STRIPE_API_BASE
+
 
-def create_stripe_session(borrowing, request):
-    book = borrowing.book
-    daily_fee = book.daily_fee
-    expected_return_date = borrowing.expected_return_date
+def calculate_total(borrowing):
+    daily_fee = borrowing.book.daily_fee
     actual_return_date = borrowing.actual_return_date
 
     money_to_pay = Payment().calculate_money_to_pay(
@@ -21,41 +21,60 @@ def create_stripe_session(borrowing, request):
         daily_fee=daily_fee,
     )
 
-    fine = Payment().calculate_fine(
-        expected_return_date=expected_return_date,
-        actual_return_date=actual_return_date or timezone.now(),
-        daily_fee=daily_fee,
+    return money_to_pay + calculate_fine(borrowing)
+
+
+def calculate_fine(borrowing):
+    return Payment().calculate_fine(
+        expected_return_date=borrowing.expected_return_date,
+        actual_return_date=borrowing.actual_return_date or timezone.now(),
+        daily_fee=borrowing.book.daily_fee,
     )
 
-    total_money_to_pay = money_to_pay + fine
-
-    session = stripe.checkout.Session.create(
-        payment_method_types=["card"],
-        line_items=[{
-            "price_data": {
-                "currency": "usd",
-                "product_data": {
-                    "name": f"Borrowing of {book.title}",
-                },
-                "unit_amount": int(total_money_to_pay * 100),
+
+def _line_item(borrowing, amount):
+    return {
+        "price_data": {
+            "currency": "usd",
+            "product_data": {
+                "name": f"Borrowing of {borrowing.book.title}",
             },
-            "quantity": 1,
-        }],
-        mode="payment",
-        success_url=request.build_absolute_uri(
-            reverse("payments:payment-success", kwargs={"pk": 0})
-        ),
-        cancel_url=request.build_absolute_uri(reverse(
-            "payments:payment-cancel", kwargs={"pk": 0})
+            "unit_amount": int(amount * 100),
+        },
+        "quantity": 1,
+    }
+
+
+def create_stripe_client():
+    """Stripe client keeping its connections alive between calls.
+
+    Its HTTP client is its own, so no other Stripe call in the process is
+    affected.
+    """
+    if not stripe.api_key:
+        raise ImproperlyConfigured("STRIPE_SECRET_KEY is not set.")
+    return stripe.StripeClient(
+        stripe.api_key,
+        base_addresses={"api": stripe.api_base},
+        http_client=stripe.RequestsClient(
+            timeout=settings.STRIPE_TIMEOUT, session=requests.Session()
         ),
     )
 
-    payment = Payment.objects.create(
-        status=Payment.StatusChoices.PENDING,
-        type=Payment.TypeChoices.PAYMENT,
-        session_url=session.url,
-        session_id=session.id,
-        money_to_pay=total_money_to_pay,
-    )
 
-    return session.url, session.id
\ No newline at end of file
+def create_checkout_session(job, client):
+    """Create the Stripe session for a queued ``CheckoutJob``.
+
+    The payment's idempotency key is forwarded to Stripe, so retrying a
+    job whose response was lost returns the session created the first time.
+    """
+    return client.v1.checkout.sessions.create(
+        params={
+            "payment_method_types": ["card"],
+            "line_items": job.line_items,
+            "mode": "payment",
+            "success_url": job.success_url,
+            "cancel_url": job.cancel_url,
+        },
+        options={"idempotency_key": job.payment.idempotency_key},
+    )
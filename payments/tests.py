@@ -0,0 +1,506 @@
+import json
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import patch
+
+import stripe
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.checkout import (
+    MAX_ATTEMPTS,
+    enqueue_checkout,
+    process_checkout_jobs,
+)
+from payments.fake_stripe import (
+    FakeStripeServer,
+    checkout_event,
+    sign_webhook,
+)
+from payments import pricing
+from payments.stripe_helper import create_stripe_client
+from payments.models import CheckoutJob, Payment, StripeEvent
+from payments.webhooks import UNMATCHED_MAX_AGE, apply_stripe_events
+
+PAYMENT_URL = reverse("payments:payment-list")
+WEBHOOK_URL = reverse("payments:stripe-webhook")
+WEBHOOK_SECRET = "whsec_test"
+
+
+class CheckoutJobTest(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().post("/")
+        self.user = get_user_model().objects.create_user(
+            email="test@mail.com",
+            password="<PASSWORD>",
+        )
+        self.book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            cover="Hard",
+            inventory=2,
+            daily_fee=Decimal("1.50"),
+        )
+        self.borrowing = Borrowing.objects.create(
+            book=self.book,
+            user=self.user,
+            expected_return_date=timezone.now().date() + timedelta(days=2),
+        )
+        self.borrowing.actual_return_date = timezone.now().date()
+        self.borrowing.save()
+
+    def test_enqueue_is_idempotent(self):
+        first = enqueue_checkout([self.borrowing], self.request)
+        second = enqueue_checkout([self.borrowing], self.request)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first.borrowing, self.borrowing)
+        self.assertEqual(first.user, self.user)
+        self.assertEqual(Payment.objects.count(), 1)
+        self.assertEqual(CheckoutJob.objects.count(), 1)
+
+    def test_worker_creates_session_through_fake_stripe(self):
+        payment = enqueue_checkout([self.borrowing], self.request)
+
+        with FakeStripeServer() as server:
+            created = process_checkout_jobs()
+
+        self.assertEqual(created, 1)
+        self.assertIsNone(stripe.default_http_client)
+        payment.refresh_from_db()
+        self.assertTrue(payment.session_id.startswith("cs_test_"))
+        self.assertTrue(payment.session_url.startswith(server.url))
+        self.assertEqual(
+            payment.checkout_job.status, CheckoutJob.StatusChoices.DONE
+        )
+        self.assertEqual(
+            server.sessions[payment.idempotency_key]["success_url"],
+            payment.checkout_job.success_url,
+        )
+
+    def test_retried_job_reuses_stripe_session(self):
+        payment = enqueue_checkout([self.borrowing], self.request)
+
+        with FakeStripeServer() as server:
+            process_checkout_jobs()
+            session_id = Payment.objects.get().session_id
+            CheckoutJob.objects.update(
+                status=CheckoutJob.StatusChoices.PENDING,
+                next_attempt_at=timezone.now(),
+            )
+            process_checkout_jobs()
+
+        payment.refresh_from_db()
+        self.assertEqual(server.requests, 2)
+        self.assertEqual(len(server.sessions), 1)
+        self.assertEqual(payment.session_id, session_id)
+
+    def test_failed_job_backs_off_then_gives_up(self):
+        enqueue_checkout([self.borrowing], self.request)
+        error = stripe.APIConnectionError("Stripe is unreachable")
+
+        with patch("stripe.api_key", "sk_test_fake"):
+            client = create_stripe_client()
+        sessions = client.v1.checkout.sessions
+
+        with patch.object(sessions, "create", side_effect=error):
+            self.assertEqual(process_checkout_jobs(client), 0)
+            job = CheckoutJob.objects.get()
+            self.assertEqual(job.attempts, 1)
+            self.assertGreater(job.next_attempt_at, timezone.now())
+
+            CheckoutJob.objects.update(
+                attempts=MAX_ATTEMPTS - 1, next_attempt_at=timezone.now()
+            )
+            process_checkout_jobs(client)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, CheckoutJob.StatusChoices.FAILED)
+        self.assertEqual(Payment.objects.get().session_url, "")
+
+    def test_command_drains_queue(self):
+        enqueue_checkout([self.borrowing], self.request)
+        out = StringIO()
+
+        with FakeStripeServer():
+            call_command("process_checkout_jobs", stdout=out)
+
+        self.assertIn("Created 1 checkout sessions.", out.getvalue())
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class StripeWebhookTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.payments = [
+            Payment.objects.create(
+                status=Payment.StatusChoices.PENDING,
+                type=Payment.TypeChoices.PAYMENT,
+                session_id=f"cs_test_{index}",
+                money_to_pay=Decimal("3.00"),
+            )
+            for index in range(5)
+        ]
+
+    def post_event(self, payload, secret=WEBHOOK_SECRET):
+        return self.client.generic(
+            "POST",
+            WEBHOOK_URL,
+            payload,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=sign_webhook(payload, secret),
+        )
+
+    def test_signed_event_is_queued_once(self):
+        payload = checkout_event("cs_test_0", "evt_1")
+
+        first = self.post_event(payload)
+        second = self.post_event(payload)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(StripeEvent.objects.count(), 1)
+        self.assertEqual(
+            Payment.objects.get(session_id="cs_test_0").status,
+            Payment.StatusChoices.PENDING,
+        )
+
+    def test_bad_signature_is_rejected(self):
+        res = self.post_event(
+            checkout_event("cs_test_0", "evt_1"), secret="whsec_other"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_irrelevant_event_is_acknowledged(self):
+        res = self.post_event(checkout_event(
+            "cs_test_0", "evt_1", type="checkout.session.expired"
+        ))
+
+        self.assertEqual(res.data, {"queued": False})
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_consumer_applies_batch_in_constant_queries(self):
+        for index, payment in enumerate(self.payments):
+            self.post_event(checkout_event(payment.session_id, f"evt_{index}"))
+        self.post_event(checkout_event("cs_test_0", "evt_replayed"))
+        self.post_event(checkout_event("cs_unknown", "evt_unknown"))
+
+        with self.assertNumQueries(10):
+            events, paid = apply_stripe_events()
+
+        self.assertEqual((events, paid), (6, 5))
+        self.assertFalse(
+            Payment.objects.filter(
+                status=Payment.StatusChoices.PENDING
+            ).exists()
+        )
+        self.assertEqual(apply_stripe_events(), (0, 0))
+
+    def test_event_before_session_id_is_retried(self):
+        self.post_event(checkout_event("cs_late", "evt_1"))
+
+        self.assertEqual(apply_stripe_events(), (0, 0))
+        Payment.objects.filter(pk=self.payments[0].pk).update(
+            session_id="cs_late"
+        )
+        StripeEvent.objects.update(next_attempt_at=timezone.now())
+
+        self.assertEqual(apply_stripe_events(), (1, 1))
+        self.assertEqual(
+            Payment.objects.get(session_id="cs_late").status,
+            Payment.StatusChoices.PAID,
+        )
+
+    def test_unmatched_event_is_dropped_after_max_age(self):
+        self.post_event(checkout_event("cs_unknown", "evt_1"))
+        StripeEvent.objects.update(
+            received_at=timezone.now() - UNMATCHED_MAX_AGE * 2
+        )
+
+        self.assertEqual(apply_stripe_events(), (1, 0))
+        self.assertIsNotNone(StripeEvent.objects.get().processed_at)
+
+    def test_success_page_does_not_mark_payment_paid(self):
+        user = get_user_model().objects.create_superuser(
+            email="admin@mail.com", password="<PASSWORD>"
+        )
+        self.client.force_authenticate(user=user)
+        payment = self.payments[0]
+
+        res = self.client.get(
+            reverse("payments:payment-success", kwargs={"pk": payment.pk})
+        )
+
+        self.assertEqual(res.data["status"], Payment.StatusChoices.PENDING)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.StatusChoices.PENDING)
+
+    def test_command_reports_applied_events(self):
+        self.post_event(checkout_event("cs_test_1", "evt_1"))
+        out = StringIO()
+
+        call_command("consume_stripe_events", stdout=out)
+
+        self.assertIn("Applied 1 events, 1 payments paid.", out.getvalue())
+
+
+class PaymentListTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@mail.com", password="<PASSWORD>"
+        )
+        self.other = get_user_model().objects.create_user(
+            email="other@mail.com", password="<PASSWORD>"
+        )
+        book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            cover="Hard",
+            inventory=10,
+            daily_fee=Decimal("1.50"),
+        )
+        self.borrowings = [
+            Borrowing.objects.create(
+                book=book,
+                user=user,
+                expected_return_date=timezone.now().date() + timedelta(days=2),
+            )
+            for user in (self.user, self.user, self.user, self.other)
+        ]
+        for borrowing in self.borrowings:
+            Payment.objects.create(
+                status=Payment.StatusChoices.PENDING,
+                type=Payment.TypeChoices.PAYMENT,
+                money_to_pay=Decimal("3.00"),
+                borrowing=borrowing,
+                user=borrowing.user,
+                idempotency_key=f"return:{borrowing.pk}",
+            )
+        self.client.force_authenticate(user=self.user)
+
+    def test_user_sees_own_payments_in_one_query(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(PAYMENT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["borrowing"] for item in res.data],
+            [borrowing.pk for borrowing in reversed(self.borrowings[:3])]
+        )
+        self.assertEqual(res.data[0]["book"], "Test Book")
+
+    def test_users_cannot_write_payments(self):
+        payment = Payment.objects.filter(user=self.user).first()
+        detail_url = reverse("payments:payment-detail", args=[payment.pk])
+
+        patched = self.client.patch(
+            detail_url, {"status": Payment.StatusChoices.PAID}
+        )
+        created = self.client.post(PAYMENT_URL, {
+            "status": Payment.StatusChoices.PAID,
+            "type": Payment.TypeChoices.PAYMENT,
+            "money_to_pay": "0.01",
+            "borrowing": self.borrowings[3].pk,
+        })
+
+        self.assertEqual(
+            (patched.status_code, created.status_code),
+            (status.HTTP_405_METHOD_NOT_ALLOWED,) * 2,
+        )
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.StatusChoices.PENDING)
+
+    def test_export_rejects_malformed_filters(self):
+        admin = get_user_model().objects.create_superuser(
+            email="admin@mail.com", password="<PASSWORD>"
+        )
+        self.client.force_authenticate(user=admin)
+
+        res = self.client.get(
+            reverse("payments:payment-export"),
+            {"user_id": "abc", "status": "LOST"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(sorted(res.data), ["status", "user_id"])
+
+    def test_admin_exports_filtered_payments(self):
+        admin = get_user_model().objects.create_superuser(
+            email="admin@mail.com", password="<PASSWORD>"
+        )
+        self.client.force_authenticate(user=admin)
+
+        res = self.client.get(
+            reverse("payments:payment-export"),
+            {"export_format": "ndjson", "user_id": self.user.pk},
+        )
+
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        records = [
+            json.loads(line)
+            for line in b"".join(res.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [record["borrowing_id"] for record in records],
+            [borrowing.pk for borrowing in self.borrowings[:3]]
+        )
+        self.assertEqual(records[0]["money_to_pay"], "3.00")
+
+    def test_export_requires_admin(self):
+        res = self.client.get(reverse("payments:payment-export"))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_backfill_links_payments_from_idempotency_keys(self):
+        backfill = import_module(
+            "payments.migrations.0006_backfill_payment_links"
+        )
+        bulk = Payment.objects.create(
+            status=Payment.StatusChoices.PENDING,
+            type=Payment.TypeChoices.PAYMENT,
+            money_to_pay=Decimal("6.00"),
+            idempotency_key=f"bulk-return:{self.other.pk}:abc",
+        )
+        legacy = Payment.objects.create(
+            status=Payment.StatusChoices.PAID,
+            type=Payment.TypeChoices.PAYMENT,
+            money_to_pay=Decimal("1.00"),
+        )
+        Payment.objects.update(borrowing=None, user=None)
+
+        backfill.backfill_payment_links(
+            apps, SimpleNamespace(connection=connection)
+        )
+
+        for borrowing in self.borrowings:
+            payment = Payment.objects.get(
+                idempotency_key=f"return:{borrowing.pk}"
+            )
+            self.assertEqual(payment.borrowing, borrowing)
+            self.assertEqual(payment.user, borrowing.user)
+        bulk.refresh_from_db()
+        legacy.refresh_from_db()
+        self.assertEqual((bulk.borrowing, bulk.user), (None, self.other))
+        self.assertEqual((legacy.borrowing, legacy.user), (None, None))
+
+
+class PricingPropertyTest(TestCase):
+    cases = 300
+    as_of = date(2031, 1, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(20240101)
+        cls.loans = []
+        for _ in range(cls.cases):
+            borrowed = date(2020, 1, 1) + timedelta(days=rng.randint(0, 3650))
+            returned = borrowed + timedelta(days=rng.randint(0, 120))
+            cls.loans.append((
+                borrowed,
+                borrowed + timedelta(days=rng.randint(1, 60)),
+                returned if rng.random() < 0.8 else None,
+                Decimal(rng.randint(1, 99999)).scaleb(-2),
+            ))
+
+    def expected(self):
+        payment = Payment()
+        for borrowed, expected, returned, fee in self.loans:
+            end = returned or self.as_of
+            rental = payment.calculate_money_to_pay(borrowed, end, fee)
+            fine = payment.calculate_fine(expected, end, fee)
+            yield str(rental), str(fine), str(rental + fine)
+
+    def assertMatchesScalar(self, charges):
+        actual = [
+            tuple(str(pricing.from_cents(cents)) for cents in row)
+            for row in zip(charges.rental, charges.fine, charges.total)
+        ]
+        self.assertEqual(actual, list(self.expected()))
+
+    def price(self, use_numpy):
+        borrowed, expected, returned, fees = zip(*self.loans)
+        return pricing.price_loans(
+            borrowed,
+            expected,
+            returned,
+            [pricing.to_cents(fee) for fee in fees],
+            as_of=self.as_of,
+            use_numpy=use_numpy,
+        )
+
+    def test_python_backend_matches_scalar_methods(self):
+        self.assertMatchesScalar(self.price(use_numpy=False))
+
+    @skipUnless(pricing.np is not None, "numpy is not installed")
+    def test_numpy_backend_matches_scalar_methods(self):
+        self.assertMatchesScalar(self.price(use_numpy=True))
+
+    def test_sql_expressions_match_scalar_methods(self):
+        user = get_user_model().objects.create_user(email="bulk@mail.com")
+        books = Book.objects.bulk_create(
+            Book(
+                title=f"Book {index}",
+                author="Author",
+                cover="Soft",
+                inventory=1,
+                daily_fee=fee,
+            )
+            for index, (*_, fee) in enumerate(self.loans)
+        )
+        borrowings = Borrowing.objects.bulk_create(
+            Borrowing(
+                book=book,
+                user=user,
+                expected_return_date=self.as_of,
+            )
+            for book in books
+        )
+        for borrowing, (borrowed, expected, returned, _) in zip(
+            borrowings, self.loans
+        ):
+            borrowing.borrow_date = borrowed
+            borrowing.expected_return_date = expected
+            borrowing.actual_return_date = returned
+        Borrowing.objects.bulk_update(
+            borrowings,
+            ["borrow_date", "expected_return_date", "actual_return_date"],
+        )
+        queryset = Borrowing.objects.filter(user=user).order_by("id")
+
+        rows = queryset.annotate(
+            **pricing.charge_annotations(self.as_of)
+        ).values_list("rental_cents", "fine_cents")
+        rental, fine = zip(*rows)
+        self.assertMatchesScalar(pricing.LoanCharges(
+            rental, fine, [a + b for a, b in zip(rental, fine)]
+        ))
+        self.assertMatchesScalar(
+            pricing.price_borrowings(queryset, as_of=self.as_of)
+        )
+        self.assertMatchesScalar(
+            pricing.price_borrowings(queryset, as_of=self.as_of, chunk_size=2)
+        )
+        empty = pricing.price_borrowings(queryset.none())
+        self.assertEqual(len(empty.total), 0)
+
+    def test_to_cents_rejects_fractional_cents(self):
+        self.assertEqual(pricing.to_cents(Decimal("12.30")), 1230)
+        with self.assertRaises(ValueError):
+            pricing.to_cents(Decimal("0.125"))
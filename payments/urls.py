@@ -1,3 +1,4 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
 from payments import views
@@ -8,4 +9,6 @@ router.register("payments", views.PaymentViewSet)
 
 app_name = "payments"
 
-urlpatterns = router.urls
+urlpatterns = [
+    path("webhook/", views.stripe_webhook, name="stripe-webhook"),
+] + router.urls
@@ -1,29 +1,64 @@
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+import json
+
+import stripe
+from django.conf import settings
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiParameter,
+    OpenApiResponse,
+)
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action
+from rest_framework.decorators import (
+    action,
+    api_view,
+    authentication_classes,
+    permission_classes,
+    throttle_classes,
+)
 from rest_framework.response import Response
 
+from library_service.export import (
+    export_response,
+    filter_date_range,
+)
+from library_service.renderers import ListRendererMixin
+from library_service.serializers import values_rows
 from payments.models import Payment
-from payments.serializers import PaymentSerializer, PaymentListSerializer
+from payments.serializers import (
+    PaymentSerializer,
+    PaymentListSerializer,
+    PaymentExportQuerySerializer,
+)
+from payments.webhooks import record_event
+
+EXPORT_COLUMNS = (
+    "id",
+    "status",
+    "type",
+    "money_to_pay",
+    "borrowing_id",
+    "user_id",
+    "session_id",
+    "created_at",
+)
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(ListRendererMixin, viewsets.ReadOnlyModelViewSet):
+    # Payments are created by returns and marked paid by the verified
+    # Stripe webhook only, so the API never writes them.
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
-    @extend_schema(
-        summary="Create a new payment",
-        description="Creates a new payment for the authenticated user.",
-        responses={201: PaymentSerializer},
-    )
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
-
     def get_queryset(self):
-        if self.request.user.is_superuser:
-            return self.queryset.all()
-        return self.queryset.filter(user=self.request.user)
+        queryset = self.queryset.select_related("borrowing__book")
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(user=self.request.user)
+        queryset = queryset.order_by("-id")
+        if self.action == "list":
+            queryset = values_rows(queryset, PaymentListSerializer)
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -31,11 +66,12 @@ class PaymentViewSet(viewsets.ModelViewSet):
         return PaymentSerializer
 
     @extend_schema(
-        summary="Mark payment as successful",
-        description="Marks the payment as successfully processed."
-                    " Changes the status to 'PAID'.",
+        summary="Payment success page",
+        description="Landing page after Stripe checkout. Reports the payment"
+                    " status; the payment is marked 'PAID' only by the"
+                    " signed Stripe webhook.",
         responses={200: OpenApiResponse(
-            description="Payment was successfully processed."
+            description="Current payment status."
         )}
     )
     @action(
@@ -44,10 +80,12 @@ class PaymentViewSet(viewsets.ModelViewSet):
     )
     def success(self, request, pk=None):
         payment = self.get_object()
-        payment.status = Payment.StatusChoices.PAID
-        payment.save()
+        if payment.status == Payment.StatusChoices.PAID:
+            message = "Payment was successfully processed."
+        else:
+            message = "Payment is being confirmed."
         return Response(
-            {"message": "Payment was successfully processed."},
+            {"message": message, "status": payment.status},
             status=status.HTTP_200_OK
         )
 
@@ -66,3 +104,83 @@ class PaymentViewSet(viewsets.ModelViewSet):
             {"message": "Payment was canceled."},
             status=status.HTTP_200_OK
         )
+
+
+    @extend_schema(
+        summary="Export payments",
+        description="Streams payments as CSV or NDJSON (admins only),"
+                    " optionally filtered by user, status and creation date.",
+        parameters=[
+            OpenApiParameter("export_format", str, enum=["csv", "ndjson"]),
+            OpenApiParameter("user_id", int),
+            OpenApiParameter("status", str, enum=Payment.StatusChoices.values),
+            OpenApiParameter("date_from", OpenApiTypes.DATE),
+            OpenApiParameter("date_to", OpenApiTypes.DATE),
+        ],
+        responses={200: OpenApiResponse(description="Exported payments")},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def export(self, request):
+        params = PaymentExportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        queryset = filter_date_range(
+            self.get_queryset().select_related(None),
+            "created_at__date",
+            params.validated_data,
+        )
+        if "user_id" in params.validated_data:
+            queryset = queryset.filter(
+                user_id=params.validated_data["user_id"]
+            )
+        if "status" in params.validated_data:
+            queryset = queryset.filter(
+                status=params.validated_data["status"]
+            )
+
+        return export_response(
+            queryset.order_by("id"),
+            EXPORT_COLUMNS,
+            params.validated_data["export_format"],
+            "payments",
+        )
+
+@extend_schema(
+    summary="Stripe webhook",
+    description="Receives signed Stripe events and queues completed"
+                " checkouts for the consume_stripe_events command.",
+    request=None,
+    responses={
+        200: OpenApiResponse(description="Event accepted"),
+        400: OpenApiResponse(description="Invalid payload or signature"),
+        503: OpenApiResponse(description="No webhook secret configured"),
+    },
+)
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+@throttle_classes([])
+def stripe_webhook(request):
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        return Response(
+            {"detail": "Stripe webhooks are not configured."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    try:
+        payload = request.body.decode()
+        stripe.WebhookSignature.verify_header(
+            payload,
+            request.headers.get("Stripe-Signature", ""),
+            settings.STRIPE_WEBHOOK_SECRET,
+        )
+        event = json.loads(payload)
+    except (ValueError, stripe.SignatureVerificationError):
+        return Response(
+            {"detail": "Invalid payload or signature."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response({"queued": record_event(event)}, status=status.HTTP_200_OK)
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from events.feed import payment_event, publish
+from payments.models import Payment, StripeEvent
+from reports.rollups import count_payments
+
+BATCH_SIZE = 1000
+# An event can arrive before the checkout worker has stored its session
+# id on the payment; it is retried until it is this old, then dropped.
+UNMATCHED_RETRY = timedelta(seconds=30)
+UNMATCHED_MAX_AGE = timedelta(days=1)
+PAID_EVENTS = (
+    "checkout.session.completed",
+    "checkout.session.async_payment_succeeded",
+)
+
+
+def record_event(event):
+    """Queue a verified event; a redelivered event id is ignored.
+
+    Returns ``False`` for event types that need no action.
+    """
+    session = event["data"]["object"]
+    if event["type"] not in PAID_EVENTS:
+        return False
+    if event["type"] == "checkout.session.completed" and (
+        session.get("payment_status") != "paid"
+    ):
+        # Delayed payment methods report success in a later event.
+        return False
+    StripeEvent.objects.bulk_create(
+        [StripeEvent(
+            event_id=event["id"],
+            type=event["type"],
+            session_id=session["id"],
+        )],
+        ignore_conflicts=True,
+    )
+    return True
+
+
+def apply_stripe_events(batch_size=BATCH_SIZE):
+    """Mark the payments of one batch of due events as paid.
+
+    The whole batch costs a fixed number of queries however many events
+    it holds. Events whose session matches no payment yet are put back
+    for UNMATCHED_RETRY. Returns ``(events, payments)`` counts, where
+    ``events`` excludes the events put back.
+    """
+    now = timezone.now()
+    pending = StripeEvent.objects.filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now),
+        processed_at__isnull=True,
+    ).order_by("id")
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        events = list(pending.values_list(
+            "id", "session_id", "received_at"
+        )[:batch_size])
+        if not events:
+            return 0, 0
+        payments = list(Payment.objects.select_for_update().filter(
+            session_id__in={session_id for _, session_id, _ in events},
+        ).values_list(
+            "id", "user_id", "money_to_pay", "fine_amount", "session_id",
+            "status",
+        ))
+        matched = {payment[4] for payment in payments}
+        payments = [
+            payment for payment in payments
+            if payment[5] == Payment.StatusChoices.PENDING
+        ]
+        paid = Payment.objects.filter(
+            id__in=[payment[0] for payment in payments]
+        ).update(status=Payment.StatusChoices.PAID, paid_at=now)
+        publish([
+            payment_event(
+                "paid", pk, user_id, status=Payment.StatusChoices.PAID
+            )
+            for pk, user_id, *_ in payments
+        ])
+        count_payments(
+            timezone.localdate(now),
+            [(amount, fines) for _, _, amount, fines, *_ in payments],
+        )
+
+        done, retried = [], []
+        for pk, session_id, received_at in events:
+            if session_id in matched or (
+                received_at < now - UNMATCHED_MAX_AGE
+            ):
+                done.append(pk)
+            else:
+                retried.append(pk)
+        StripeEvent.objects.filter(id__in=done).update(processed_at=now)
+        if retried:
+            StripeEvent.objects.filter(id__in=retried).update(
+                next_attempt_at=now + UNMATCHED_RETRY
+            )
+    return len(done), paid
@@ -0,0 +1,80 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+from borrowings.models import Borrowing
+from payments.models import Payment
+from reports.models import DailyCirculation, DailyRevenue
+from reports.rollups import increment
+
+CHUNK_SIZE = 10000
+
+
+def id_ranges(queryset, chunk_size):
+    """Yield ``(after, last)`` primary key bounds of chunk-sized slices."""
+    after = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=after).order_by("pk").values_list(
+                "pk", flat=True
+            )[:chunk_size]
+        )
+        if not ids:
+            return
+        yield after, ids[-1]
+        after = ids[-1]
+
+
+def rebuild_reports(chunk_size=CHUNK_SIZE):
+    """Recompute the rollup tables from borrowings and payments.
+
+    Source rows are aggregated one primary key range at a time, so
+    memory use and statement size stay bounded. The rebuild is one
+    transaction: readers see the old rollups until it commits.
+    """
+    with transaction.atomic():
+        DailyCirculation.objects.all().delete()
+        DailyRevenue.objects.all().delete()
+
+        for after, last in id_ranges(Borrowing.objects, chunk_size):
+            borrowings = Borrowing.objects.filter(pk__gt=after, pk__lte=last)
+            deltas = defaultdict(Counter)
+            for row in borrowings.values("borrow_date", "book_id").annotate(
+                loans=Count("pk")
+            ).order_by():
+                deltas[(row["borrow_date"], row["book_id"])]["loans"] += (
+                    row["loans"]
+                )
+            for row in borrowings.filter(
+                actual_return_date__isnull=False
+            ).values("actual_return_date", "book_id").annotate(
+                returns=Count("pk"),
+                late_returns=Count("pk", filter=Q(
+                    actual_return_date__gt=F("expected_return_date")
+                )),
+            ).order_by():
+                delta = deltas[(row["actual_return_date"], row["book_id"])]
+                delta["returns"] += row["returns"]
+                delta["late_returns"] += row["late_returns"]
+            increment(DailyCirculation, ("date", "book_id"), deltas)
+
+        paid = Payment.objects.filter(status=Payment.StatusChoices.PAID)
+        for after, last in id_ranges(paid, chunk_size):
+            rows = paid.filter(pk__gt=after, pk__lte=last).annotate(
+                # Payments paid before paid_at existed count on creation.
+                day=TruncDate(Coalesce("paid_at", "created_at"))
+            ).values("day").annotate(
+                payments=Count("pk"),
+                amount=Sum("money_to_pay"),
+                fines=Sum("fine_amount"),
+            ).order_by()
+            increment(DailyRevenue, ("date",), {
+                (row["day"],): {
+                    "payments": row["payments"],
+                    "amount": row["amount"],
+                    "fines": row["fines"],
+                }
+                for row in rows
+            })
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from reports.backfill import CHUNK_SIZE, rebuild_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the daily circulation and revenue rollups from the "
+        "borrowings and payments tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Source rows aggregated per query.",
+        )
+
+    def handle(self, *args, **options):
+        rebuild_reports(chunk_size=options["chunk_size"])
+        self.stdout.write("Reports rebuilt.")
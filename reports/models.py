@@ -0,0 +1,37 @@
+from django.db import models
+
+from books.models import Book
+
+
+class DailyCirculation(models.Model):
+    """Loans and returns of one book on one day."""
+
+    date = models.DateField()
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="daily_circulation"
+    )
+    loans = models.PositiveIntegerField(default=0)
+    returns = models.PositiveIntegerField(default=0)
+    late_returns = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "book"], name="daily_circulation_key"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.book} on {self.date}"
+
+
+class DailyRevenue(models.Model):
+    """Payments received on one day; ``fines`` is part of ``amount``."""
+
+    date = models.DateField(unique=True)
+    payments = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    fines = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"Revenue on {self.date}"
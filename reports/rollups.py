@@ -0,0 +1,67 @@
+from collections import Counter, defaultdict
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.db.models import F, Q
+
+from reports.models import DailyCirculation, DailyRevenue
+
+# Keys looked up per statement; SQLite refuses expressions nested deeper
+# than 1000, which one OR of a few thousand keys exceeds.
+LOOKUP_BATCH = 500
+
+
+def increment(model, key_fields, deltas):
+    """Add ``deltas``, ``{key: {field: amount}}``, to rollup rows.
+
+    Missing rows are created first, then every row is incremented in
+    place, so concurrent writers never lose each other's counts. Costs
+    three statements per LOOKUP_BATCH keys.
+    """
+    fields = sorted({field for delta in deltas.values() for field in delta})
+    keys = iter(deltas)
+    while batch := list(islice(keys, LOOKUP_BATCH)):
+        model.objects.bulk_create(
+            [model(**dict(zip(key_fields, key))) for key in batch],
+            ignore_conflicts=True,
+        )
+        rows = list(model.objects.filter(reduce(or_, (
+            Q(**dict(zip(key_fields, key))) for key in batch
+        ))).only("pk", *key_fields))
+        for row in rows:
+            delta = deltas[tuple(getattr(row, field) for field in key_fields)]
+            for field in fields:
+                setattr(row, field, F(field) + delta.get(field, 0))
+        model.objects.bulk_update(rows, fields)
+
+
+def count_loans(borrowings):
+    loans = Counter(
+        (borrowing.borrow_date, borrowing.book_id)
+        for borrowing in borrowings
+    )
+    increment(DailyCirculation, ("date", "book_id"), {
+        key: {"loans": count} for key, count in loans.items()
+    })
+
+
+def count_returns(borrowings):
+    deltas = defaultdict(Counter)
+    for borrowing in borrowings:
+        delta = deltas[(borrowing.actual_return_date, borrowing.book_id)]
+        delta["returns"] += 1
+        if borrowing.actual_return_date > borrowing.expected_return_date:
+            delta["late_returns"] += 1
+    increment(DailyCirculation, ("date", "book_id"), deltas)
+
+
+def count_payments(date, payments):
+    """Count ``(money_to_pay, fine_amount)`` pairs paid on ``date``."""
+    if not payments:
+        return
+    increment(DailyRevenue, ("date",), {(date,): {
+        "payments": len(payments),
+        "amount": sum(amount for amount, _ in payments),
+        "fines": sum(fines for _, fines in payments),
+    }})
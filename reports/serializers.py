@@ -0,0 +1,37 @@
+from rest_framework import serializers
+
+PERIODS = ("day", "month", "year")
+
+
+class ReportQuerySerializer(serializers.Serializer):
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    period = serializers.ChoiceField(choices=PERIODS, default="month")
+
+
+class TopBooksQuerySerializer(serializers.Serializer):
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class TopBookSerializer(serializers.Serializer):
+    book = serializers.IntegerField()
+    title = serializers.CharField()
+    loans = serializers.IntegerField()
+
+
+class OverdueRateSerializer(serializers.Serializer):
+    period = serializers.DateField(help_text="First day of the period.")
+    returns = serializers.IntegerField()
+    late_returns = serializers.IntegerField()
+    overdue_rate = serializers.FloatField(
+        allow_null=True, help_text="Share of returns that came back late."
+    )
+
+
+class RevenueSerializer(serializers.Serializer):
+    period = serializers.DateField(help_text="First day of the period.")
+    payments = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    fines = serializers.DecimalField(max_digits=12, decimal_places=2)
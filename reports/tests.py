@@ -0,0 +1,219 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment, StripeEvent
+from payments.webhooks import apply_stripe_events
+from reports.backfill import rebuild_reports
+from reports.models import DailyCirculation, DailyRevenue
+from reports.rollups import increment
+
+
+def sample_book(title):
+    return Book.objects.create(
+        title=title, author="Author", cover="HARD",
+        inventory=5, daily_fee=Decimal("1.00"),
+    )
+
+
+class RollupTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="reader@mail.com", password="<PASSWORD>"
+        )
+        self.book = sample_book("Book")
+        self.today = timezone.now().date()
+
+    def borrow(self, days=2):
+        return Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=self.today + timedelta(days=days),
+        )
+
+    def snapshot(self):
+        return (
+            list(DailyCirculation.objects.order_by("date", "book").values(
+                "date", "book", "loans", "returns", "late_returns"
+            )),
+            list(DailyRevenue.objects.order_by("date").values(
+                "date", "payments", "amount", "fines"
+            )),
+        )
+
+    def test_borrow_and_return_update_the_rollup(self):
+        first = self.borrow()
+        self.borrow()
+        first.actual_return_date = self.today
+        first.save()
+
+        rollup = DailyCirculation.objects.get(
+            date=self.today, book=self.book
+        )
+        self.assertEqual(
+            (rollup.loans, rollup.returns, rollup.late_returns), (2, 1, 0)
+        )
+
+    def test_paid_payments_update_revenue(self):
+        payment = Payment.objects.create(
+            status=Payment.StatusChoices.PENDING,
+            type=Payment.TypeChoices.PAYMENT,
+            money_to_pay=Decimal("12.50"),
+            fine_amount=Decimal("2.50"),
+            session_id="cs_test_1",
+            user=self.user,
+        )
+        StripeEvent.objects.create(
+            event_id="evt_1",
+            type="checkout.session.completed",
+            session_id="cs_test_1",
+        )
+
+        apply_stripe_events()
+
+        payment.refresh_from_db()
+        self.assertIsNotNone(payment.paid_at)
+        revenue = DailyRevenue.objects.get()
+        self.assertEqual(revenue.payments, 1)
+        self.assertEqual(revenue.amount, Decimal("12.50"))
+        self.assertEqual(revenue.fines, Decimal("2.50"))
+
+    def test_rebuild_matches_incremental_rollups(self):
+        for borrowing in [self.borrow(), self.borrow(days=5), self.borrow()]:
+            borrowing.actual_return_date = self.today
+            borrowing.save()
+        # Rewrite history: one loan came back a week late.
+        late = Borrowing.objects.order_by("id").first()
+        Borrowing.objects.filter(pk=late.pk).update(
+            expected_return_date=self.today - timedelta(days=7),
+            borrow_date=self.today - timedelta(days=10),
+        )
+        Payment.objects.create(
+            status=Payment.StatusChoices.PAID,
+            type=Payment.TypeChoices.PAYMENT,
+            money_to_pay=Decimal("3.00"),
+        )
+
+        rebuild_reports(chunk_size=2)
+
+        circulation, revenue = self.snapshot()
+        self.assertEqual(circulation, [
+            {
+                "date": self.today - timedelta(days=10), "book": self.book.id,
+                "loans": 1, "returns": 0, "late_returns": 0,
+            },
+            {
+                "date": self.today, "book": self.book.id,
+                "loans": 2, "returns": 3, "late_returns": 1,
+            },
+        ])
+        self.assertEqual(revenue, [{
+            "date": self.today,
+            "payments": 1,
+            "amount": Decimal("3.00"),
+            "fines": Decimal("0.00"),
+        }])
+        rebuild_reports()
+        self.assertEqual(self.snapshot(), (circulation, revenue))
+
+    def test_increment_many_keys(self):
+        days = [self.today - timedelta(days=day) for day in range(1200)]
+        deltas = {(day, self.book.id): {"loans": 1} for day in days}
+
+        increment(DailyCirculation, ("date", "book_id"), deltas)
+        increment(DailyCirculation, ("date", "book_id"), deltas)
+
+        self.assertEqual(
+            set(DailyCirculation.objects.values_list("loans", flat=True)),
+            {2},
+        )
+        self.assertEqual(DailyCirculation.objects.count(), 1200)
+
+
+class ReportEndpointTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            email="admin@mail.com", password="<PASSWORD>", is_staff=True
+        ))
+        popular, rare = sample_book("Popular"), sample_book("Rare")
+        DailyCirculation.objects.bulk_create([
+            DailyCirculation(
+                date=date(2026, 1, 5), book=popular,
+                loans=3, returns=2, late_returns=1,
+            ),
+            DailyCirculation(
+                date=date(2026, 1, 20), book=rare,
+                loans=1, returns=2, late_returns=0,
+            ),
+            DailyCirculation(
+                date=date(2026, 2, 3), book=popular,
+                loans=2, returns=4, late_returns=3,
+            ),
+        ])
+        DailyRevenue.objects.bulk_create([
+            DailyRevenue(
+                date=date(2026, 1, 5), payments=2,
+                amount=Decimal("10.00"), fines=Decimal("1.00"),
+            ),
+            DailyRevenue(
+                date=date(2026, 1, 9), payments=1,
+                amount=Decimal("4.50"), fines=Decimal("0.00"),
+            ),
+        ])
+        self.popular, self.rare = popular, rare
+
+    def test_reports_are_admin_only(self):
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            email="reader@mail.com", password="<PASSWORD>"
+        ))
+
+        res = self.client.get(reverse("reports:revenue"))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_top_books(self):
+        res = self.client.get(
+            reverse("reports:top-books"), {"date_to": "2026-01-31"}
+        )
+
+        self.assertEqual(res.json(), [
+            {"book": self.popular.id, "title": "Popular", "loans": 3},
+            {"book": self.rare.id, "title": "Rare", "loans": 1},
+        ])
+
+    def test_overdue_rates_by_month(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(reverse("reports:overdue"))
+
+        self.assertEqual(res.json(), [
+            {
+                "period": "2026-01-01", "returns": 4,
+                "late_returns": 1, "overdue_rate": 0.25,
+            },
+            {
+                "period": "2026-02-01", "returns": 4,
+                "late_returns": 3, "overdue_rate": 0.75,
+            },
+        ])
+
+    def test_revenue_by_day(self):
+        res = self.client.get(
+            reverse("reports:revenue"),
+            {"period": "day", "date_from": "2026-01-06"},
+        )
+
+        self.assertEqual(res.json(), [{
+            "period": "2026-01-09",
+            "payments": 1,
+            "amount": "4.50",
+            "fines": "0.00",
+        }])
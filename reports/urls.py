@@ -0,0 +1,23 @@
+from django.urls import path
+
+from reports.views import ReportViewSet
+
+app_name = "reports"
+
+urlpatterns = [
+    path(
+        "top-books/",
+        ReportViewSet.as_view({"get": "top_books"}),
+        name="top-books",
+    ),
+    path(
+        "overdue/",
+        ReportViewSet.as_view({"get": "overdue"}),
+        name="overdue",
+    ),
+    path(
+        "revenue/",
+        ReportViewSet.as_view({"get": "revenue"}),
+        name="revenue",
+    ),
+]
@@ -0,0 +1,86 @@
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncYear
+from drf_spectacular.utils import extend_schema
+from rest_framework import permissions, viewsets
+from rest_framework.response import Response
+
+from library_service.export import filter_date_range
+from reports.models import DailyCirculation, DailyRevenue
+from reports.serializers import (
+    OverdueRateSerializer,
+    ReportQuerySerializer,
+    RevenueSerializer,
+    TopBookSerializer,
+    TopBooksQuerySerializer,
+)
+
+PERIOD_FUNCTIONS = {
+    "day": F,
+    "month": TruncMonth,
+    "year": TruncYear,
+}
+
+
+class ReportViewSet(viewsets.GenericViewSet):
+    """Read-only reports served from the daily rollup tables."""
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get_params(self, serializer_class):
+        params = serializer_class(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data
+
+    def rollup(self, queryset, params):
+        """``queryset`` in the date range, grouped by period."""
+        return filter_date_range(queryset, "date", params).annotate(
+            period=PERIOD_FUNCTIONS[params["period"]]("date")
+        ).values("period").order_by("period")
+
+    @extend_schema(
+        summary="Most borrowed books",
+        description="Books with the most loans in the date range.",
+        parameters=[TopBooksQuerySerializer],
+        responses={200: TopBookSerializer(many=True)},
+    )
+    def top_books(self, request):
+        params = self.get_params(TopBooksQuerySerializer)
+        rows = filter_date_range(
+            DailyCirculation.objects.all(), "date", params
+        ).values("book").annotate(
+            title=F("book__title"), loans=Sum("loans")
+        ).order_by("-loans", "book")[:params["limit"]]
+        return Response(TopBookSerializer(rows, many=True).data)
+
+    @extend_schema(
+        summary="Overdue rates",
+        description="Returns and late returns per period.",
+        parameters=[ReportQuerySerializer],
+        responses={200: OverdueRateSerializer(many=True)},
+    )
+    def overdue(self, request):
+        params = self.get_params(ReportQuerySerializer)
+        rows = list(self.rollup(
+            DailyCirculation.objects.filter(returns__gt=0), params
+        ).annotate(
+            returns=Sum("returns"), late_returns=Sum("late_returns")
+        ))
+        for row in rows:
+            row["overdue_rate"] = row["late_returns"] / row["returns"]
+        return Response(OverdueRateSerializer(rows, many=True).data)
+
+    @extend_schema(
+        summary="Revenue",
+        description="Payments received per period, with the late-return "
+                    "fines they included.",
+        parameters=[ReportQuerySerializer],
+        responses={200: RevenueSerializer(many=True)},
+    )
+    def revenue(self, request):
+        params = self.get_params(ReportQuerySerializer)
+        rows = self.rollup(DailyRevenue.objects.all(), params).annotate(
+            payments=Sum("payments"),
+            amount=Sum("amount"),
+            fines=Sum("fines"),
+        )
+        return Response(RevenueSerializer(rows, many=True).data)
@@ -0,0 +1,156 @@
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from user.cache import user_cache
+
+VERSION_CLAIM = "ver"
+PRIVILEGE_CLAIMS = ("is_staff", "is_superuser")
+
+
+def add_user_claims(token, user):
+    """Sign the user's token version and privileges into ``token``."""
+    token[VERSION_CLAIM] = user.token_version
+    for claim in PRIVILEGE_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def check_token_version(user, validated_token):
+    # Tokens issued before the claim existed carry no version; they match
+    # users whose tokens have never been revoked.
+    if validated_token.get(VERSION_CLAIM, 0) != user.token_version:
+        raise AuthenticationFailed(
+            _("Token has been revoked"), code="token_revoked"
+        )
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """simplejwt authentication with an async counterpart for ASGI views."""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        user = self.user_model.objects.filter(
+            **self.get_user_lookup(validated_token)
+        ).first()
+        return self.check_user(user, validated_token)
+
+    async def aget_user(self, validated_token):
+        user = await self.user_model.objects.filter(
+            **self.get_user_lookup(validated_token)
+        ).afirst()
+        return self.check_user(user, validated_token)
+
+    def get_user_lookup(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+        return {api_settings.USER_ID_FIELD: user_id}
+
+    def check_user(self, user, validated_token):
+        if user is None:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+
+        check_token_version(user, validated_token)
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."),
+                code="password_changed",
+            )
+
+        return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that skips the user query on most requests.
+
+    User rows are kept in the process-wide ``user_cache``, and every
+    request gets its own instance built from the cached row. Staff and
+    superuser flags are taken from the token's signed claims; changing
+    them through ``User.save()`` revokes the user's tokens.
+    """
+
+    def get_user(self, validated_token):
+        lookup = self.get_user_lookup(validated_token)
+        key = self.get_cache_key(lookup)
+        row = user_cache.get(key)
+        if row is None:
+            row = self.get_user_rows(lookup).first()
+            if row is not None:
+                user_cache.set(key, row)
+        return self.check_user(self.user_from_row(row), validated_token)
+
+    async def aget_user(self, validated_token):
+        lookup = self.get_user_lookup(validated_token)
+        key = self.get_cache_key(lookup)
+        row = user_cache.get(key)
+        if row is None:
+            row = await self.get_user_rows(lookup).afirst()
+            if row is not None:
+                user_cache.set(key, row)
+        return self.check_user(self.user_from_row(row), validated_token)
+
+    def get_cache_key(self, lookup):
+        # Entries are invalidated by primary key; a lookup by any other
+        # field is cached under its own value and expires with the TTL.
+        (field, value), = lookup.items()
+        if field in ("pk", self.user_model._meta.pk.attname):
+            return value
+        return field, value
+
+    @property
+    def user_fields(self):
+        return [
+            field.attname for field in self.user_model._meta.concrete_fields
+        ]
+
+    def get_user_rows(self, lookup):
+        return self.user_model.objects.filter(**lookup).values_list(
+            *self.user_fields
+        )
+
+    def user_from_row(self, row):
+        if row is None:
+            return None
+        return self.user_model.from_db(None, self.user_fields, row)
+
+    def check_user(self, user, validated_token):
+        user = super().check_user(user, validated_token)
+        for claim in PRIVILEGE_CLAIMS:
+            if claim in validated_token:
+                setattr(user, claim, validated_token[claim])
+        return user
+
+
+class JWTAuthenticationScheme(SimpleJWTScheme):
+    target_class = JWTAuthentication
+    match_subclasses = True
@@ -37,16 +37,70 @@ class UserManager(BaseUserManager):
         return self._create_user(email, password, **extra_fields)
 
 
+PRIVILEGE_FIELDS = ("is_staff", "is_superuser")
+
+
 class User(AbstractBaseUser):
     email = models.EmailField(_("email address"), unique=True)
     first_name = models.CharField(_("first_name"), max_length=50)
     last_name = models.CharField(_("last_name"), max_length=50)
     is_superuser = models.BooleanField(_("superuser"), default=False)
     is_staff = models.BooleanField(_("is_staff"), default=False)
+    # Carried in issued JWTs; tokens with an older version are rejected.
+    token_version = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = 'email'
 
     objects = UserManager()
 
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.email
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._saved_privileges = user.get_privileges()
+        return user
+
+    def get_privileges(self):
+        loaded = self.__dict__
+        if not all(field in loaded for field in PRIVILEGE_FIELDS):
+            return None
+        return tuple(loaded[field] for field in PRIVILEGE_FIELDS)
+
+    def save(self, *args, **kwargs):
+        """Save the user, revoking their tokens if privileges changed.
+
+        Issued tokens carry signed privilege claims, so a demoted user
+        would otherwise keep them until the access token expires.
+        Updates through ``QuerySet.update()`` bypass this.
+        """
+        privileges = self.get_privileges()
+        update_fields = kwargs.get("update_fields")
+        if (
+            privileges != getattr(self, "_saved_privileges", privileges)
+            and (
+                update_fields is None
+                or set(PRIVILEGE_FIELDS) & set(update_fields)
+            )
+        ):
+            self.token_version += 1
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "token_version"}
+        super().save(*args, **kwargs)
+        self._saved_privileges = privileges
+
+    def change_password(self, raw_password):
+        """Set and save a new password, revoking the tokens issued so far.
+
+        ``set_password`` alone keeps them valid: Django also calls it to
+        upgrade a password's hash on login.
+        """
+        self.set_password(raw_password)
+        self.token_version += 1
+        self.save(update_fields=["password", "token_version"])
+
+    def revoke_tokens(self):
+        """Reject every access and refresh token issued so far."""
+        self.token_version += 1
+        self.save(update_fields=["token_version"])
\ No newline at end of file
@@ -1,6 +1,16 @@
 from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import (
+    TokenObtainPairSerializerExtension,
+    TokenRefreshSerializerExtension,
+)
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
 
+from user.authentication import add_user_claims, check_token_version
 from user.models import User
 
 
@@ -10,6 +20,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = (
             "id",
             "email",
+            "password",
             "first_name",
             "last_name",
             "is_staff"
@@ -17,15 +28,51 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ("is_staff",)
         extra_kwargs = {"password": {"write_only": True, "min_length": 7}}
 
-        def create(self, validated_data):
-            """Create a new user with encrypted password and return it."""
-            return get_user_model().objects.create_user(**validated_data)
-
-        def update(self, instance, validated_data):
-            """Update a user, set the password correctly and return it."""
-            password = validated_data.pop("password", None)
-            user = super().update(instance, validated_data)
-            if password:
-                user.set_password(password)
-                user.save()
-            return user
+    def create(self, validated_data):
+        """Create a new user with encrypted password and return it."""
+        return get_user_model().objects.create_user(**validated_data)
+
+    def update(self, instance, validated_data):
+        """Update a user, set the password correctly and return it."""
+        password = validated_data.pop("password", None)
+        user = super().update(instance, validated_data)
+        if password:
+            user.change_password(password)
+        return user
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Refresh that re-checks the user and re-signs their current claims."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = get_user_model().objects.filter(
+            **{
+                jwt_settings.USER_ID_FIELD:
+                    refresh.get(jwt_settings.USER_ID_CLAIM)
+            }
+        ).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+        check_token_version(user, refresh)
+
+        data = super().validate(attrs)
+        access = AccessToken(data["access"], verify=False)
+        data["access"] = str(add_user_claims(access, user))
+        return data
+
+
+class TokenObtainPairSerializerSchema(TokenObtainPairSerializerExtension):
+    target_class = TokenObtainPairSerializer
+
+
+class TokenRefreshSerializerSchema(TokenRefreshSerializerExtension):
+    target_class = TokenRefreshSerializer
@@ -1,3 +1,154 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.cache import UserCache, user_cache
+
+ME_URL = reverse("users:manage")
+TOKEN_URL = reverse("users:token_obtain_pair")
+REFRESH_URL = reverse("users:token_refresh")
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="reader@test.com", password="testpass123"
+        )
+        self.tokens = self.obtain_tokens()
+
+    def obtain_tokens(self, password="testpass123"):
+        response = self.client.post(
+            TOKEN_URL, {"email": self.user.email, "password": password}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def get_me(self, access):
+        return self.client.get(
+            ME_URL, HTTP_AUTHORIZATION=f"Bearer {access}"
+        )
+
+    def test_user_is_loaded_once_per_process(self):
+        with self.assertNumQueries(1):
+            self.get_me(self.tokens["access"])
+        with self.assertNumQueries(0):
+            response = self.get_me(self.tokens["access"])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"], self.user.email)
+
+    def test_update_through_me_invalidates_cached_user(self):
+        self.get_me(self.tokens["access"])
+
+        self.client.patch(
+            ME_URL,
+            {"first_name": "Ada"},
+            HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}",
+        )
+        response = self.get_me(self.tokens["access"])
+
+        self.assertEqual(response.data["first_name"], "Ada")
+
+    def test_privileges_come_from_the_signed_claims(self):
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_staff=True
+        )
+
+        response = self.get_me(self.tokens["access"])
+        self.assertFalse(response.data["is_staff"])
+
+        refreshed = self.client.post(
+            REFRESH_URL, {"refresh": self.tokens["refresh"]}
+        )
+        response = self.get_me(refreshed.data["access"])
+        self.assertTrue(response.data["is_staff"])
+
+    def test_demotion_revokes_issued_tokens(self):
+        self.user.is_staff = True
+        self.user.save()
+        tokens = self.obtain_tokens()
+        response = self.get_me(tokens["access"])
+        self.assertTrue(response.data["is_staff"])
+
+        self.user.is_staff = False
+        self.user.save()
+
+        response = self.get_me(tokens["access"])
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data["detail"].code, "token_revoked")
+
+    def test_profile_update_keeps_tokens_valid(self):
+        self.user.first_name = "Ada"
+        self.user.save()
+
+        response = self.get_me(self.tokens["access"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_password_change_revokes_issued_tokens(self):
+        response = self.client.patch(
+            ME_URL,
+            {"password": "newpass456"},
+            HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("password", response.data)
+
+        response = self.get_me(self.tokens["access"])
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data["detail"].code, "token_revoked")
+        response = self.client.post(
+            REFRESH_URL, {"refresh": self.tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        tokens = self.obtain_tokens("newpass456")
+        response = self.get_me(tokens["access"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_password_hash_upgrade_keeps_tokens_valid(self):
+        self.user.password = make_password(
+            "testpass123", hasher="pbkdf2_sha1"
+        )
+        self.user.save()
+
+        tokens = self.obtain_tokens()
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        self.assertEqual(self.user.token_version, 0)
+        response = self.get_me(tokens["access"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_revoke_tokens(self):
+        self.user.revoke_tokens()
+
+        response = self.get_me(self.tokens["access"])
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class UserCacheTest(TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = UserCache(maxsize=2, ttl=60)
+        cache.set(1, "first")
+        cache.set(2, "second")
+        cache.get(1)
+        cache.set(3, "third")
+
+        self.assertEqual(cache.get(1), "first")
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(3), "third")
 
-# Create your tests here.
+    def test_entries_expire(self):
+        cache = UserCache(maxsize=2, ttl=60)
+        with patch("user.cache.time.monotonic", return_value=100):
+            cache.set(1, "first")
+        with patch("user.cache.time.monotonic", return_value=161):
+            self.assertIsNone(cache.get(1))